@@ -0,0 +1,178 @@
+import io
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from besser.agent.exceptions.logger import logger
+
+from governance.engine.events import ArchiveEvent
+from governance.engine.snapshot import SnapshotPickler, SnapshotUnpickler, model_references
+
+
+def archive_path() -> str | None:
+    return os.environ.get("ENGINE_ARCHIVE_PATH") or None
+
+def archive_grace_period() -> float:
+    return float(os.environ.get("ARCHIVE_GRACE_PERIOD", 3600))
+
+def archive_interval() -> float:
+    return float(os.environ.get("ARCHIVE_INTERVAL", 60))
+
+
+class ArchivePickler(SnapshotPickler):
+    # Members stay in the Interaction, an archived collaboration only keeps their name
+    def persistent_id(self, obj):
+        from governance.engine.semantics.runtime_metamodel import DynamicIndividual
+        if isinstance(obj, DynamicIndividual):
+            return "member", obj.name
+        return super().persistent_id(obj)
+
+
+class ArchiveUnpickler(SnapshotUnpickler):
+    def __init__(self, file, references: dict[tuple, object], interaction):
+        super().__init__(file, references)
+        self._interaction = interaction
+
+    def persistent_load(self, key):
+        if key[0] == "member":
+            return self._interaction.get_or_create_dynamic_individual(key[1])
+        return super().persistent_load(key)
+
+
+class CollaborationArchive:
+    # On-disk store of the decided collaborations, indexed by collaboration id and by the name of the decided policies.
+    # Archived collaborations are loaded back on lookup only, the few last ones are kept in memory.
+    def __init__(self, path: str, grace_period: float = 3600.0, platform=None, cached: int = 128):
+        self._path: str = path
+        self._grace_period: float = grace_period
+        self._platform = platform
+        self._cached: int = cached
+        self._loaded: OrderedDict[int, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self._archived: int = 0
+        self._loads: int = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS collaborations (id INTEGER PRIMARY KEY, decided_at REAL, record BLOB);
+            CREATE TABLE IF NOT EXISTS decisions (collab_id INTEGER, policy TEXT, accepted INTEGER, decided_at REAL);
+            CREATE INDEX IF NOT EXISTS decisions_by_policy ON decisions (policy, decided_at);
+        """)
+        self._connection.commit()
+
+    @property
+    def grace_period(self):
+        return self._grace_period
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._connection.execute("SELECT COUNT(*) FROM collaborations").fetchone()[0]
+        return {"archived": self._archived,
+                "loads": self._loads,
+                "entries": count}
+
+    def store(self, collabs: list, decisions: dict, model) -> set[int]:
+        # decisions : collaboration id -> its decisions. Returns the ids of the archived collaborations.
+        references = model_references(model or [], self._platform)
+        rows = []
+        decision_rows = []
+        for collab in collabs:
+            buffer = io.BytesIO()
+            try:
+                ArchivePickler(buffer, references | {("interaction",): collab._interaction}).dump(
+                    (collab, decisions[collab._id]))
+            except Exception as e:
+                logger.warning(f"Collaboration {collab._id} could not be archived: {e}")
+                continue
+            rows.append((collab._id, collab._is_decided._timestamp, zlib.compress(buffer.getvalue(), 1)))
+            for decision in decisions[collab._id]:
+                decision_rows.append((collab._id, decision._rule.name, int(bool(decision._accepted)),
+                                      decision._timestamp))
+        with self._lock:
+            with self._connection:
+                self._connection.executemany("INSERT OR REPLACE INTO collaborations VALUES (?, ?, ?)", rows)
+                self._connection.executemany("INSERT INTO decisions VALUES (?, ?, ?, ?)", decision_rows)
+            self._archived += len(rows)
+        return {row[0] for row in rows}
+
+    def load(self, collab_id: int, interaction, model) -> tuple | None:
+        # (collaboration, decisions) or None when it was never archived
+        with self._lock:
+            loaded = self._loaded.get(collab_id)
+            if loaded is not None:
+                self._loaded.move_to_end(collab_id)
+                return loaded
+            row = self._connection.execute("SELECT record FROM collaborations WHERE id = ?", (collab_id,)).fetchone()
+        if row is None:
+            return None
+        references = model_references(model or [], self._platform) | {("interaction",): interaction}
+        try:
+            loaded = ArchiveUnpickler(io.BytesIO(zlib.decompress(row[0])), references, interaction).load()
+        except Exception as e:
+            logger.warning(f"Archived collaboration {collab_id} could not be loaded: {e}")
+            return None
+        with self._lock:
+            self._loads += 1
+            self._loaded[collab_id] = loaded
+            while len(self._loaded) > self._cached:
+                self._loaded.popitem(last=False)
+        return loaded
+
+    def latest_decision_of(self, policy_name: str) -> int | None:
+        # Id of the collaboration decided last with this policy
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT collab_id FROM decisions WHERE policy = ? ORDER BY decided_at DESC LIMIT 1",
+                (policy_name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def archived(self, collab_ids) -> set[int]:
+        ids = list(collab_ids)
+        found = set()
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                found.update(row[0] for row in self._connection.execute(
+                    f"SELECT id FROM collaborations WHERE id IN ({placeholders})", chunk))
+        return found
+
+    def clear(self):
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM collaborations")
+                self._connection.execute("DELETE FROM decisions")
+            self._loaded.clear()
+
+    def archive_body(self, session):
+        interaction = session.get("interactions")
+        archived = interaction.archive_decided(time.time() - self._grace_period, session.get("policies"))
+        if archived > 0:
+            logger.info(f"{archived} decided collaborations archived to {self._path}")
+
+    def start(self, agent, interval: float):
+        def run():
+            while True:
+                time.sleep(interval)
+                agent.receive_event(ArchiveEvent())
+        threading.Thread(target=run, name="collaboration-archive", daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+_archive: CollaborationArchive | None = None
+
+def configure_archive(archive: CollaborationArchive | None):
+    global _archive
+    _archive = archive
+
+def collaboration_archive() -> CollaborationArchive | None:
+    # Archive of this engine, shared by the successive Interactions (see decision_engine.py)
+    return _archive
@@ -0,0 +1,16 @@
+import argparse
+import os
+
+from governance.engine.policy_artifact import compile_policy_file
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='Governance Policy Compiler',
+        description='Compile a governance DSL file into a binary artifact the engine can load with -P.')
+    parser.add_argument('policy',
+                        help='Governance DSL file to compile')
+    parser.add_argument('-o', '--output',
+                        help='Path of the artifact (defaults to the policy path with the .govc extension)')
+    args = parser.parse_args()
+    artifact_path = compile_policy_file(args.policy, args.output)
+    print(f"Compiled {args.policy} into {artifact_path} ({os.path.getsize(artifact_path)} bytes)")
@@ -0,0 +1,107 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class DeadlineScheduler:
+    # Min-heap of pending DeadlineEvents, a single thread sleeps until the earliest one expires and only then
+    # hands it to the agent. Cancelled entries are skipped lazily when they reach the top of the heap.
+    def __init__(self):
+        self._heap: list[tuple] = []
+        self._sequence = itertools.count()
+        self._cancelled: set[int] = set()
+        self._by_collab: dict[int, set[int]] = dict()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closed: bool = False
+
+    @property
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._heap) - len(self._cancelled)
+
+    def pending_for(self, collab_id: int) -> int:
+        with self._condition:
+            return len(self._by_collab.get(collab_id, ()))
+
+    def events(self) -> list:
+        with self._condition:
+            return [entry[2] for entry in sorted(self._heap) if entry[1] not in self._cancelled]
+
+    def schedule(self, agent, event):
+        with self._condition:
+            if self._closed:
+                return
+            sequence = next(self._sequence)
+            heapq.heappush(self._heap, (event._timestamp, sequence, event, agent))
+            self._by_collab.setdefault(event.collab._id, set()).add(sequence)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="deadline-scheduler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, collab_id: int) -> int:
+        with self._condition:
+            sequences = self._by_collab.pop(collab_id, set())
+            self._cancelled.update(sequences)
+            self._condition.notify()
+            return len(sequences)
+
+    def retain(self, keep):
+        # keep(event) -> bool, used to migrate the pending deadlines on a policy reload
+        with self._condition:
+            kept = []
+            for entry in self._heap:
+                if entry[1] in self._cancelled:
+                    continue
+                if keep(entry[2]):
+                    kept.append(entry)
+                else:
+                    self._forget(entry)
+            heapq.heapify(kept)
+            self._heap = kept
+            self._cancelled.clear()
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._heap.clear()
+            self._cancelled.clear()
+            self._by_collab.clear()
+            self._condition.notify()
+
+    def _forget(self, entry):
+        collab_id = entry[2].collab._id
+        sequences = self._by_collab.get(collab_id)
+        if sequences is not None:
+            sequences.discard(entry[1])
+            if len(sequences) == 0:
+                del self._by_collab[collab_id]
+
+    def _next_due(self):
+        # Blocks until a deadline expires, returns None once closed
+        with self._condition:
+            while not self._closed:
+                while len(self._heap) > 0 and self._heap[0][1] in self._cancelled:
+                    self._cancelled.discard(heapq.heappop(self._heap)[1])
+                if len(self._heap) == 0:
+                    self._condition.wait()
+                    continue
+                wait = self._heap[0][0] - time.time()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                entry = heapq.heappop(self._heap)
+                self._forget(entry)
+                return entry
+            return None
+
+    def _run(self):
+        while True:
+            entry = self._next_due()
+            if entry is None:
+                return
+            timestamp, sequence, event, agent = entry
+            agent.receive_event(event)
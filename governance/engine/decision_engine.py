@@ -1,4 +1,5 @@
 import argparse
+import atexit
 import logging
 import os
 import subprocess
@@ -13,13 +14,23 @@ from besser.agent.library.transition.events.gitlab_webhooks_events import MergeR
     MergeRequestOpened, MergeRequestUnapproved, MergeRequestApproval, MergeRequestUpdated
 
 from governance.engine.events import DeadlineEvent, VoteEvent, CollaborationProposalEvent, UserRegistrationEvent, \
-    UpdatePolicyEvent, DecideEvent
-from governance.engine.parsing import parse_text
+    UpdatePolicyEvent, DecideEvent, LabelsResolvedEvent, LabelEvent, SnapshotEvent, ArchiveEvent
+from governance.engine.archive import CollaborationArchive, configure_archive, archive_path, archive_grace_period, \
+    archive_interval
+from governance.engine.delivery_cache import DeliveryCache, webhook_entrypoint
+from governance.engine.event_journal import EventJournal, journal_path, fsync_interval
+from governance.engine.github_client import AsyncGitHubClient, AsyncGitHubPlatform
+from governance.engine.response_cache import CachedPlatform, response_cache
+from governance.engine.policy_artifact import is_artifact, read_artifact, read_metadata
+from governance.engine.semantics.columnar_ballot import ballot_box_class
 from governance.engine.semantics.helpers import get_all_individuals, get_all_roles
+from governance.engine.semantics.policy_index import PolicyIndex
 from governance.engine.semantics.runtime_metamodel import Interaction
+from governance.engine.sharding import ShardedExecutor, engine_shards
+from governance.engine.snapshot import Snapshotter, snapshot_path, snapshot_interval
 from governance.engine.state_bodies import individual_body, vote_body, collab_bodybuilder, \
     decide_bodybuilder, gh_webhooks_bodybuilder, update_policy_body, init_body, read_policy_bodybuilder, \
-    gl_webhooks_bodybuilder, deadline_body
+    gl_webhooks_bodybuilder, deadline_body, labels_bodybuilder, label_body
 from governance.engine.testing.hooks import add_testing_hooks
 from governance.engine.testing.platform_mock import PlatformMock
 
@@ -32,6 +43,12 @@ def setup(testing: bool, playground: bool, init_policy_path: str) -> Agent:
     if not testing and not playground:
         websocket_platform = agent.use_websocket_platform(use_ui=(not playground))
     gh_platform = agent.use_github_platform()
+    # Redelivered webhooks are dropped by the entrypoint, before the agent receives them
+    gh_platform._post_entrypoint = webhook_entrypoint(gh_platform, DeliveryCache.from_environment())
+    actions_platform = CachedPlatform(gh_platform, response_cache)
+    if not testing and os.environ.get("ENGINE_ASYNC_GITHUB") == "True":
+        # Webhooks are still received by the agent's platform, API calls go through the pooled client
+        actions_platform = AsyncGitHubPlatform(AsyncGitHubClient(os.environ.get("GITHUB_TOKEN")))
     # gl_platform = agent.use_gitlab_platform()
 
 
@@ -44,50 +61,138 @@ def setup(testing: bool, playground: bool, init_policy_path: str) -> Agent:
     update_policy = agent.new_state('update')
     individual_state = agent.new_state('individual')
     collab_state = agent.new_state('collab')
+    labels_state = agent.new_state('labels')
+    label_state = agent.new_state('label')
     vote_state = agent.new_state('vote')
     deadline_state = agent.new_state('deadline')
     decide_state = agent.new_state('decide')
 
 
     # STATES BODIES' LINKING
-    init.set_body(init_body)
-    read_policy.set_body(read_policy_bodybuilder(agent))
+    init_state_body = init_body
+    read_policy_body = read_policy_bodybuilder(agent)
+    init.set_body(init_state_body)
+    read_policy.set_body(read_policy_body)
 
     test_platform = PlatformMock(agent)
-    gh_webhooks.set_body(gh_webhooks_bodybuilder(agent, test_platform if testing else gh_platform))
+    gh_webhooks.set_body(gh_webhooks_bodybuilder(agent, test_platform if testing else actions_platform))
     # gl_webhooks.set_body(gl_webhooks_bodybuilder(agent, test_platform if testing else gl_platform))
 
-    update_policy.set_body(update_policy_body)
-    individual_state.set_body(individual_body)
-    collab_state.set_body(collab_bodybuilder(agent))
-    vote_state.set_body(vote_body)
-    deadline_state.set_body(deadline_body)
-    decide_state.set_body(decide_bodybuilder(agent))
+    collab_body = collab_bodybuilder(agent)
+    labels_body = labels_bodybuilder(agent)
+    decide_body = decide_bodybuilder(agent)
+    state_bodies = {
+        update_policy: update_policy_body,
+        individual_state: individual_body,
+        collab_state: collab_body,
+        labels_state: labels_body,
+        label_state: label_body,
+        vote_state: vote_body,
+        deadline_state: deadline_body,
+        decide_state: decide_body,
+    }
+
+    # EVENT JOURNAL AND SNAPSHOTS OF THE RUNTIME STATE
+    journal = None
+    if journal_path() is not None:
+        journal = EventJournal(journal_path(), fsync_interval(), test_platform if testing else actions_platform)
+        atexit.register(journal.close)
+    snapshots = None
+    if snapshot_path() is not None:
+        snapshots = Snapshotter(snapshot_path(), snapshot_interval(), test_platform if testing else actions_platform,
+                                journal)
+        # Policies received as a file or a webhook are installed by the update body, not by read_policy
+        state_bodies[update_policy] = snapshots.restoring(update_policy_body)
+
+    # SHARDED EXECUTION : collaboration bodies run on workers partitioned by collaboration id
+    executor = None
+    if engine_shards() > 1:
+        executor = ShardedExecutor(engine_shards())
+        state_bodies[update_policy] = executor.synchronized(state_bodies[update_policy])
+        state_bodies[collab_state] = executor.sharded(collab_body, lambda e: e._id)
+        state_bodies[labels_state] = executor.sharded(labels_body, lambda e: e.collab_id)
+        state_bodies[label_state] = executor.sharded(label_body, lambda e: e.collab_id)
+        state_bodies[vote_state] = executor.sharded(vote_body, lambda e: e.pull_request_id)
+        state_bodies[deadline_state] = executor.sharded(deadline_body, lambda e: e.collab._id)
+        state_bodies[decide_state] = executor.sharded(decide_body, lambda e: e.collab._id)
+
+    # EVENT JOURNAL : engine events are written before their body runs, and replayed on startup
+    if journal is not None:
+        for state in (update_policy, individual_state, collab_state, labels_state, label_state, vote_state,
+                      deadline_state, decide_state):
+            state_bodies[state] = journal.journaled(state_bodies[state])
+        # Replayed after the snapshot is restored, on the unwrapped bodies (no journaling, no sharding).
+        # The first upload is journaled before the replay and replayed last, so its policies stay installed
+        replayed_bodies = {UpdatePolicyEvent: update_policy_body, UserRegistrationEvent: individual_body,
+                           CollaborationProposalEvent: collab_body, LabelsResolvedEvent: labels_body,
+                           LabelEvent: label_body, VoteEvent: vote_body, DeadlineEvent: deadline_body,
+                           DecideEvent: decide_body}
+        state_bodies[update_policy] = journal.replaying(state_bodies[update_policy], replayed_bodies,
+                                                        compact=snapshots is None)
+    for state, body in state_bodies.items():
+        state.set_body(body)
 
     # ADDITIONAL HOOKS AND FEATURES FOR TESTING
     if testing:
-        add_testing_hooks(agent, idle, test_platform)
+        add_testing_hooks(agent, idle, test_platform, executor)
 
     # MANAGING INITIAL POLICY AS PARAM
 
     if init_policy_path is not None:
-        with open(init_policy_path, "r") as file:
-            data = file.read()
-            def init_playground(session: Session):
-                session.set("interactions", Interaction())
-                model = parse_text(data)
-                session.set("policies", model)
-                interact = session.get("interactions")
-
-                individuals = set()
-                for policy in model:
-                    individuals = individuals.union(get_all_individuals(policy))
-                roles = set()
-                for policy in model:
-                    roles = roles.union(get_all_roles(policy))
-                interact.register_individuals(individuals)
-                interact.register_roles(roles)
-            init.set_body(init_playground)
+        if is_artifact(init_policy_path):
+            # Precompiled policies are loaded without the grammar
+            def load_policies():
+                return read_artifact(init_policy_path)
+        else:
+            with open(init_policy_path, "r") as file:
+                data = file.read()
+            def load_policies():
+                from governance.engine.parsing import parse_text
+                return parse_text(data)
+
+        def init_playground(session: Session):
+            session.set("interactions", Interaction())
+            model = load_policies()
+            session.set("policies", model)
+            session.set("policy_index", PolicyIndex(model))
+            interact = session.get("interactions")
+
+            individuals = set()
+            for policy in model:
+                individuals = individuals.union(get_all_individuals(policy))
+            roles = set()
+            for policy in model:
+                roles = roles.union(get_all_roles(policy))
+            interact.register_individuals(individuals)
+            interact.register_roles(roles)
+        init_state_body = init_playground
+        init.set_body(init_state_body)
+
+    # ARCHIVAL OF THE DECIDED COLLABORATIONS, shared by every Interaction of this engine
+    if archive_path() is not None:
+        archive = CollaborationArchive(archive_path(), archive_grace_period(),
+                                       test_platform if testing else actions_platform)
+        configure_archive(archive)
+        atexit.register(archive.close)
+        archive_state = agent.new_state('archive')
+        archive_state.set_body(archive.archive_body if executor is None
+                               else executor.synchronized(archive.archive_body))
+        idle.when_event(ArchiveEvent()).go_to(archive_state)
+        archive_state.go_to(idle)
+        archive.start(agent, archive_interval())
+
+    # SNAPSHOTS OF THE RUNTIME STATE : restored with the first policies, saved periodically and at exit
+    if snapshots is not None:
+        snapshot_state = agent.new_state('snapshot')
+        snapshot_state.set_body(snapshots.snapshot_body if executor is None
+                                else executor.synchronized(snapshots.snapshot_body))
+        init_state_body = snapshots.restoring(init_state_body)
+        init.set_body(init_state_body)
+        idle.when_event(SnapshotEvent()).go_to(snapshot_state)
+        snapshot_state.go_to(idle)
+        snapshots.start(agent)
+    if journal is not None:
+        init.set_body(journal.replaying(init_state_body, replayed_bodies, compact=snapshots is None))
 
     # TRANSITIONS DEFINITION
 
@@ -107,6 +212,16 @@ def setup(testing: bool, playground: bool, init_policy_path: str) -> Agent:
     idle.when_event(PullRequestOpened()).go_to(gh_webhooks)
     idle.when_event(IssuesOpened()).go_to(gh_webhooks)
     idle.when_event(GitHubEvent("pull_request_review","submitted", None)).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("pull_request","labeled", None)).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("pull_request","unlabeled", None)).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("issues","labeled", None)).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("issues","unlabeled", None)).go_to(gh_webhooks)
+    idle.when_event(Push()).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("status","", None)).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("check_suite","completed", None)).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("check_suite","requested", None)).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("check_suite","rerequested", None)).go_to(gh_webhooks)
+    idle.when_event(GitHubEvent("pull_request","synchronize", None)).go_to(gh_webhooks)
     # idle.when_event(MergeRequestUpdated()).go_to(gl_webhooks)
     # idle.when_event(MergeRequestOpened()).go_to(gl_webhooks)
     # idle.when_event(MergeRequestApproval()).go_to(gl_webhooks)
@@ -119,6 +234,8 @@ def setup(testing: bool, playground: bool, init_policy_path: str) -> Agent:
     idle.when_event(UpdatePolicyEvent()).go_to(update_policy)
     idle.when_event(UserRegistrationEvent()).go_to(individual_state)
     idle.when_event(CollaborationProposalEvent()).go_to(collab_state)
+    idle.when_event(LabelsResolvedEvent()).go_to(labels_state)
+    idle.when_event(LabelEvent()).go_to(label_state)
 
 
     # when event managed go back to idle
@@ -128,6 +245,8 @@ def setup(testing: bool, playground: bool, init_policy_path: str) -> Agent:
     update_policy.go_to(idle)
     individual_state.go_to(idle)
     collab_state.go_to(idle)
+    labels_state.go_to(idle)
+    label_state.go_to(idle)
     vote_state.go_to(idle)
     deadline_state.go_to(idle)
     decide_state.go_to(idle)
@@ -147,12 +266,50 @@ if __name__ == '__main__':
     group.add_argument('-p', '--playground', action='store_true',
                         help='Start the engine in Playground mode')
     parser.add_argument('-P', '--Policy',
-                        help='Start the engine with base policy')
+                        help='Start the engine with base policy (DSL file or artifact built by compile_policy.py)')
+    parser.add_argument('--policy-cache',
+                        help='Directory used to persist parsed policy models across restarts')
+    parser.add_argument('--delivery-cache',
+                        help='File keeping the ids of handled webhook deliveries across restarts')
+    parser.add_argument('--async-github', action='store_true',
+                        help='Call the GitHub API through a pooled async client authenticated with GITHUB_TOKEN, '
+                             'merge/close/label actions are queued')
+    parser.add_argument('--shards', type=int,
+                        help='Number of workers processing collaborations in parallel (default: 1, no sharding)')
+    parser.add_argument('--snapshot',
+                        help='File the runtime state is saved to (every ENGINE_SNAPSHOT_INTERVAL seconds and at exit) '
+                             'and restored from on startup')
+    parser.add_argument('--journal',
+                        help='Append-only journal of the engine events, replayed on startup after the snapshot')
+    parser.add_argument('--archive',
+                        help='SQLite database decided collaborations are moved to after ARCHIVE_GRACE_PERIOD seconds')
+    parser.add_argument('--ballot-backend', choices=['object', 'columnar'],
+                        help='Storage of the ballot boxes, columnar requires numpy (default: object)')
     args = parser.parse_args()
     os.environ["ENGINE_TESTING"] = str(args.test)
+    os.environ["ENGINE_ASYNC_GITHUB"] = str(args.async_github)
+    if args.policy_cache is not None:
+        os.environ["POLICY_CACHE_DIR"] = args.policy_cache
+    if args.delivery_cache is not None:
+        os.environ["DELIVERY_CACHE_PATH"] = args.delivery_cache
+    if args.shards is not None:
+        os.environ["ENGINE_SHARDS"] = str(args.shards)
+    if args.snapshot is not None:
+        os.environ["ENGINE_SNAPSHOT_PATH"] = args.snapshot
+    if args.journal is not None:
+        os.environ["ENGINE_JOURNAL_PATH"] = args.journal
+    if args.archive is not None:
+        os.environ["ENGINE_ARCHIVE_PATH"] = args.archive
+    if args.ballot_backend is not None:
+        os.environ["BALLOT_BACKEND"] = args.ballot_backend
+    ballot_box_class()  # fail before starting when the backend is not available
     os.environ["ENGINE_PLAYGROUND"] = str(args.playground)
     policy_file = str(args.Policy) if args.Policy is not None else None
     if args.playground:
-        os.environ["PLAYGROUND_POLICY"] = policy_file
+        source_file = policy_file
+        if policy_file is not None and is_artifact(policy_file):
+            # Role changes are written back to the DSL file the artifact was compiled from
+            source_file = read_metadata(policy_file).get("source_path") or policy_file
+        os.environ["PLAYGROUND_POLICY"] = source_file
     agent = setup(args.test, args.playground, policy_file)
     agent.run()
\ No newline at end of file
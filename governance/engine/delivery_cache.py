@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from aiohttp import web
+from aiohttp.web_request import Request
+from besser.agent.exceptions.logger import logger
+from besser.agent.library.transition.events.github_webhooks_events import GitHubEvent
+from gidgethub import sansio
+
+
+class DeliveryCache:
+    # Idempotency cache of webhook delivery ids, bounded in size and age.
+    # With a path, ids are also appended to a file so that redeliveries are still dropped after a restart.
+    def __init__(self, max_entries: int = 50000, ttl: float = 24 * 3600, path: str = None):
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._max_entries: int = max_entries
+        self._ttl: float = ttl
+        self._path: str = path
+        self._lock = threading.RLock()
+        self._lookups: int = 0
+        self._hits: int = 0
+        self._drops: int = 0
+        self._evictions: int = 0
+        self._file = None
+        self._written: int = 0
+        if path is not None:
+            self._load()
+
+    @classmethod
+    def from_environment(cls) -> 'DeliveryCache':
+        return cls(path=os.environ.get("DELIVERY_CACHE_PATH") or None,
+                   ttl=float(os.environ.get("DELIVERY_CACHE_TTL", 24 * 3600)))
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def drops(self):
+        # Deliveries the entrypoint did not hand to the agent
+        return self._drops
+
+    @property
+    def lookups(self):
+        return self._lookups
+
+    def stats(self) -> dict:
+        return {"lookups": self._lookups,
+                "hits": self._hits,
+                "drops": self._drops,
+                "evictions": self._evictions,
+                "entries": len(self._entries)}
+
+    def is_duplicate(self, delivery_id: str) -> bool:
+        # Records the delivery on its first sight
+        with self._lock:
+            return self.seen(delivery_id) or not self.record(delivery_id)
+
+    def seen(self, delivery_id: str) -> bool:
+        with self._lock:
+            self._lookups += 1
+            self._expire(time.time())
+            if delivery_id in self._entries:
+                self._hits += 1
+                return True
+            return False
+
+    def record(self, delivery_id: str) -> bool:
+        # False when the delivery was recorded meanwhile (a redelivery received concurrently)
+        now = time.time()
+        with self._lock:
+            if delivery_id in self._entries:
+                self._hits += 1
+                return False
+            self._entries[delivery_id] = now
+            self._persist(delivery_id, now)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            return True
+
+    def drop(self, delivery_id: str, event: str):
+        with self._lock:
+            self._drops += 1
+        logger.info(f"Dropping duplicated webhook delivery {delivery_id} ({event})")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _expire(self, now: float):
+        while len(self._entries) > 0:
+            delivery_id, seen_at = next(iter(self._entries.items()))
+            if now - seen_at <= self._ttl:
+                break
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _load(self):
+        now = time.time()
+        if os.path.isfile(self._path):
+            with open(self._path, "r") as file:
+                for line in file:
+                    delivery_id, _, seen_at = line.rstrip("\n").partition("\t")
+                    try:
+                        seen_at = float(seen_at)
+                    except ValueError:
+                        continue
+                    if now - seen_at <= self._ttl:
+                        self._entries[delivery_id] = seen_at
+                        self._entries.move_to_end(delivery_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        self._compact()
+
+    def _compact(self):
+        # Rewrites the file with the live entries only
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self._file is not None:
+            self._file.close()
+        temporary = self._path + ".tmp"
+        with open(temporary, "w") as file:
+            for delivery_id, seen_at in self._entries.items():
+                file.write(f"{delivery_id}\t{seen_at}\n")
+        os.replace(temporary, self._path)
+        self._written = len(self._entries)
+        self._file = open(self._path, "a")
+
+    def _persist(self, delivery_id: str, seen_at: float):
+        if self._file is None:
+            return
+        try:
+            self._file.write(f"{delivery_id}\t{seen_at}\n")
+            self._file.flush()
+            self._written += 1
+            if self._written > 2 * self._max_entries:
+                self._compact()
+        except OSError as e:
+            logger.warning(f"Could not persist webhook delivery {delivery_id}: {e}")
+
+
+def webhook_entrypoint(platform, deliveries: DeliveryCache = None):
+    # Replaces the webhook entrypoint of the GitHubPlatform, the events it builds do not keep the delivery id
+    # and payloads without an action (push, status) are rejected.
+    # A redelivery is dropped on its X-GitHub-Delivery header, before the payload is parsed.
+    # Ids are recorded once the signature is validated, unsigned requests do not fill the cache.
+    async def post_entrypoint(request: Request) -> web.Response:
+        delivery_id = request.headers.get("x-github-delivery")
+        if deliveries is not None and delivery_id and deliveries.seen(delivery_id):
+            deliveries.drop(delivery_id, request.headers.get("x-github-event"))
+            return web.Response(status=200)
+        body = await request.read()
+        event = sansio.Event.from_http(request.headers, body, secret=platform._secret)
+        if deliveries is not None and delivery_id and not deliveries.record(delivery_id):
+            deliveries.drop(delivery_id, event.event)
+            return web.Response(status=200)
+        if event.event == 'gollum':
+            for page in event.data['pages']:
+                platform._agent.receive_event(GitHubEvent('gollum', page['action'], page))
+        else:
+            platform._agent.receive_event(GitHubEvent(event.event, event.data.get('action') or '', event.data))
+        return web.Response(status=200)
+    return post_entrypoint
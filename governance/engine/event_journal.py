@@ -0,0 +1,330 @@
+import io
+import os
+import pickle
+import struct
+import threading
+import time
+import traceback
+from collections import Counter
+
+from besser.agent.core.session import Session
+from besser.agent.exceptions.logger import logger
+
+from governance.engine.events import CollaborationProposalEvent, DecideEvent, DeadlineEvent, LabelsResolvedEvent
+from governance.engine.sharding import EventSession
+from governance.engine.snapshot import SnapshotPickler, SnapshotUnpickler, model_references
+from governance.engine.semantics.runtime_metamodel import Collaboration, Interaction
+from metamodel import StatusEnum
+
+MAGIC = b"GVJ1"
+HEADER = struct.Struct(">4sQ")  # magic, generation
+RECORD = struct.Struct(">Iq")  # payload length, collaboration id (-1 when the event has none)
+
+
+def journal_path() -> str | None:
+    return os.environ.get("ENGINE_JOURNAL_PATH") or None
+
+def fsync_interval() -> float:
+    return float(os.environ.get("JOURNAL_FSYNC_INTERVAL", 0.05))
+
+def collab_id_of(event) -> int | None:
+    collab = getattr(event, "collab", None)
+    if collab is not None:
+        return collab._id
+    for attribute in ("_id", "_pull_request_id", "_collab_id"):
+        if isinstance(getattr(event, attribute, None), int):
+            return getattr(event, attribute)
+    return None
+
+
+class JournalPickler(SnapshotPickler):
+    # Collaborations are part of the runtime state, events only keep their id
+    def persistent_id(self, obj):
+        if isinstance(obj, Collaboration):
+            return "collab", obj._id
+        return super().persistent_id(obj)
+
+
+class JournalUnpickler(SnapshotUnpickler):
+    def __init__(self, file, references: dict[tuple, object], interaction: Interaction):
+        super().__init__(file, references)
+        self._interaction = interaction
+
+    def persistent_load(self, key):
+        if key[0] == "collab":
+            return self._interaction.collaborations.get(key[1])
+        return super().persistent_load(key)
+
+
+class ReplayPlatform:
+    # Platform of the collaborations while the journal is replayed : reads are served, actions were already done
+    def __init__(self, platform):
+        self._platform = platform
+
+    @property
+    def replaying(self):
+        return True
+
+    def put(self, url: str, data=None):
+        return None
+
+    def patch(self, url: str, data=None):
+        return None
+
+    def post(self, url: str, data=None):
+        return None
+
+    def set_label(self, issue, label: str):
+        return None
+
+    def __getattr__(self, name):
+        return getattr(self._platform, name)
+
+
+class EventJournal:
+    # Append-only journal of the engine events, each one is written before its state body runs.
+    # Records are length prefixed, fsyncs are batched every fsync_interval seconds by a background thread.
+    # The position of a snapshot (generation, offset) tells where its replay starts, compaction starts a new generation.
+    def __init__(self, path: str, fsync_interval: float = 0.05, platform=None):
+        self._path: str = path
+        self._fsync_interval: float = fsync_interval
+        self._platform = platform
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed: bool = False
+        self._replayed: bool = False
+        self._references: tuple[object, dict] | None = None
+        self._appended: int = 0
+        self._fsyncs: int = 0
+        self._generation, end = self._open()
+        self._file = open(self._path, "r+b")
+        self._file.seek(end)
+        self._file.truncate()
+        self._thread = threading.Thread(target=self._sync, name="event-journal", daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def position(self) -> tuple[int, int]:
+        with self._lock:
+            return self._generation, self._file.tell()
+
+    def stats(self) -> dict:
+        return {"appended": self._appended,
+                "fsyncs": self._fsyncs,
+                "generation": self._generation}
+
+    def _open(self) -> tuple[int, int]:
+        # Returns the generation and the end of the last complete record, a torn write is dropped
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.isfile(self._path) or os.path.getsize(self._path) < HEADER.size:
+            with open(self._path, "wb") as file:
+                file.write(HEADER.pack(MAGIC, 0))
+            return 0, HEADER.size
+        with open(self._path, "rb") as file:
+            magic, generation = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self._path} is not an event journal")
+            end = HEADER.size
+            for end, _, _ in self._scan(file):
+                pass
+        return generation, end
+
+    @staticmethod
+    def _scan(file):
+        # Yields (end offset, collaboration id, payload) of the complete records from the current position
+        while True:
+            head = file.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return
+            length, collab_id = RECORD.unpack(head)
+            payload = file.read(length)
+            if len(payload) < length:
+                return
+            yield file.tell(), (None if collab_id < 0 else collab_id), payload
+
+    def _references_for(self, model) -> dict:
+        if self._references is None or self._references[0] is not model:
+            self._references = (model, model_references(model or [], self._platform))
+        return self._references[1]
+
+    def append(self, event, model) -> int:
+        buffer = io.BytesIO()
+        JournalPickler(buffer, self._references_for(model)).dump(event)
+        payload = buffer.getvalue()
+        collab_id = collab_id_of(event)
+        with self._lock:
+            self._file.write(RECORD.pack(len(payload), -1 if collab_id is None else collab_id))
+            self._file.write(payload)
+            self._file.flush()
+            self._appended += 1
+            offset = self._file.tell()
+        self._dirty.set()
+        return offset
+
+    def journaled(self, body):
+        # Wraps a state body : the event is in the journal before the body runs
+        def journaled_body(session: Session):
+            self.append(session.event, session.get("policies"))
+            body(session)
+        return journaled_body
+
+    def records(self, start: int):
+        with open(self._path, "rb") as file:
+            file.seek(max(start, HEADER.size))
+            yield from self._scan(file)
+
+    def replay(self, session: Session, bodies: dict, position: tuple[int, int] | None = None) -> int:
+        # Runs the bodies of the events written after position, with outbound actions suppressed.
+        # Records already in the snapshot may be replayed again (after a compaction), the bodies ignore them.
+        from governance.engine.state_bodies import is_stale
+        generation, start = position if position is not None else (None, HEADER.size)
+        if generation != self._generation:
+            start = HEADER.size
+        with self._lock:
+            end = self._file.tell()
+        interaction: Interaction = session.get("interactions")
+        archive = getattr(interaction, "_archive", None)
+        agent = session._agent
+        replay_platform = ReplayPlatform(self._platform)
+        references = model_references(session.get("policies") or [], replay_platform)
+        started = time.perf_counter()
+        replayed = 0
+        # Events sent by the replayed bodies were journaled themselves and are dropped,
+        # the ones coming from other threads (webhooks, deadlines) wait for the end of the replay
+        replay_thread = threading.current_thread()
+        dropped, held = [], []
+        replayed_deadlines, replayed_decisions = set(), Counter()
+
+        def receive_event(event):
+            (dropped if threading.current_thread() is replay_thread else held).append(event)
+        agent.receive_event = receive_event
+        for collab in interaction.collaborations.values():
+            if collab._platform is self._platform:
+                collab._platform = replay_platform
+        try:
+            for offset, collab_id, payload in self.records(start):
+                if offset > end:
+                    break
+                try:
+                    event = JournalUnpickler(io.BytesIO(payload), references, interaction).load()
+                except Exception as e:
+                    logger.warning(f"Journal record at {offset} skipped: {e}")
+                    continue
+                body = bodies.get(type(event))
+                if body is None or (hasattr(event, "collab") and event.collab is None):
+                    continue
+                if isinstance(event, CollaborationProposalEvent) and (
+                        collab_id in interaction.collaborations or
+                        (archive is not None and len(archive.archived({collab_id})) > 0)):
+                    # Already in the snapshot, or decided and archived since
+                    continue
+                if isinstance(event, DeadlineEvent):
+                    replayed_deadlines.add((event.collab._id, event.policy))
+                elif isinstance(event, DecideEvent):
+                    replayed_decisions[(event.collab._id, event.policy)] += 1
+                try:
+                    body(EventSession(session, event))
+                except Exception as e:
+                    # As on a shard : the failing event is lost, the replay goes on with the next ones
+                    logger.error(f"Error replaying the journal record at {offset}: {e}")
+                    logger.error(traceback.format_exc())
+                    continue
+                replayed += 1
+        finally:
+            del agent.receive_event
+            for collab in interaction.collaborations.values():
+                if collab._platform is replay_platform:
+                    collab._platform = self._platform
+        # Deadlines scheduled again by the replay that already expired in the journal
+        interaction.deadlines.retain(lambda event: (event.collab._id, event.policy) not in replayed_deadlines)
+        for event in dropped:
+            if isinstance(event, DecideEvent):
+                interaction.delivered(event)
+                key = (event.collab._id, event.policy)
+                if replayed_decisions[key] > 0:
+                    replayed_decisions[key] -= 1
+                elif not is_stale(event.collab, event.policy):
+                    # Posted before the previous process stopped, but never decided
+                    interaction.post(agent, event)
+        for event in held:
+            if not (isinstance(event, DeadlineEvent) and (event.collab._id, event.policy) in replayed_deadlines):
+                agent.receive_event(event)
+        for collab_id in interaction.awaiting_labels():
+            # The resolution was lost with the previous process, as in Interaction.resume()
+            collab = interaction.collaborations.get(collab_id)
+            labels = set(collab.scope.element.labels) if collab is not None else set()
+            agent.receive_event(LabelsResolvedEvent(collab_id, labels))
+        logger.info(f"Replayed {replayed} journaled events in {time.perf_counter() - started:.2f}s")
+        return replayed
+
+    def replaying(self, body, bodies: dict, compact: bool = False):
+        # Wraps the bodies installing the policies (init with a base policy, the update body) :
+        # the journal is replayed once, after the first model (and snapshot)
+        def replaying_body(session: Session):
+            body(session)
+            if not self._replayed and session.get("policies") is not None:
+                self._replayed = True
+                interaction = session.get("interactions")
+                self.replay(session, bodies, getattr(interaction, "journal_position", None))
+                if compact:
+                    self.compact(interaction)
+        return replaying_body
+
+    def compact(self, interaction: Interaction) -> tuple[int, int]:
+        # Drops the records of the completed collaborations, the journal starts a new generation
+        completed = {collab._id for collab in interaction.collaborations.values()
+                     if collab.scope is not None and collab.scope.status == StatusEnum.COMPLETED}
+        with self._lock:
+            self._file.flush()
+            archive = getattr(interaction, "_archive", None)
+            if archive is not None:
+                # Archived collaborations were completed too
+                journaled = {collab_id for _, collab_id, _ in self.records(HEADER.size) if collab_id is not None}
+                completed |= archive.archived(journaled - interaction.collaborations.keys())
+            temporary = self._path + ".tmp"
+            kept = 0
+            with open(temporary, "wb") as compacted:
+                compacted.write(HEADER.pack(MAGIC, self._generation + 1))
+                for _, collab_id, payload in self.records(HEADER.size):
+                    if collab_id is not None and collab_id in completed:
+                        continue
+                    compacted.write(RECORD.pack(len(payload), -1 if collab_id is None else collab_id))
+                    compacted.write(payload)
+                    kept += 1
+                compacted.flush()
+                os.fsync(compacted.fileno())
+            self._file.close()
+            os.replace(temporary, self._path)
+            self._generation += 1
+            self._file = open(self._path, "r+b")
+            self._file.seek(0, os.SEEK_END)
+            logger.info(f"Journal compacted, {kept} records kept")
+            return self._generation, self._file.tell()
+
+    def _sync(self):
+        while not self._closed:
+            self._dirty.wait()
+            # Group commit : everything appended during the interval is synced at once
+            time.sleep(self._fsync_interval)
+            self._dirty.clear()
+            with self._lock:
+                if self._closed:
+                    return
+                os.fsync(self._file.fileno())
+                self._fsyncs += 1
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        self._dirty.set()
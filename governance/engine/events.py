@@ -69,6 +69,16 @@ class UpdatePolicyEvent(EngineEvent):
         self.text = text
 
 
+class SnapshotEvent(EngineEvent):
+    def __init__(self):
+        super().__init__('SnapshotEvent')
+
+
+class ArchiveEvent(EngineEvent):
+    def __init__(self):
+        super().__init__('ArchiveEvent')
+
+
 class UserRegistrationEvent(EngineEvent):
     def __init__(self, payload=None):
         super().__init__('UserRegistrationEvent',  payload)
@@ -139,15 +149,9 @@ class CollaborationProposalEvent(EngineEvent):
         scope.activity.project.activities = {scope.activity}
         the_event._scope = scope
 
-        # This part account for the delay in the initialization of PR labels
-        from time import sleep
-        sleep(0.5)
-        user_repo = the_event._repoID.split('/')
-        pr = platform.get_issue(user_repo[0], user_repo[1], the_event._PR_payload["number"])
-        labels_names = {label["name"] for label in pr.labels}
-
-        for label in labels_names:
-            the_event._labels.add(label)
+        # Labels are often set right after the opening, the final ones are resolved later by the LabelResolver
+        for label in event.payload[type].get("labels") or []:
+            the_event._labels.add(label["name"])
         return the_event
 
     @classmethod
@@ -181,6 +185,62 @@ class CollaborationProposalEvent(EngineEvent):
     def scope(self):
         return self._scope
 
+    @property
+    def repo_id(self):
+        return self._repoID
+
+    @property
+    def number(self):
+        return self._PR_payload["number"] if self._PR_payload is not None else None
+
+    @property
+    def labels(self):
+        return self._labels
+
+
+class LabelsResolvedEvent(EngineEvent):
+    def __init__(self, collab_id: int = None, labels: set[str] = None):
+        super().__init__('LabelsResolvedEvent', labels)
+        self._collab_id = collab_id
+        self._labels: set[str] = labels if labels is not None else set()
+
+    @property
+    def collab_id(self):
+        return self._collab_id
+
+    @property
+    def labels(self):
+        return self._labels
+
+
+class LabelEvent(EngineEvent):
+    def __init__(self, payload=None):
+        super().__init__('LabelEvent', payload)
+        self._collab_id = None
+        self._label = None
+        self._added = True
+
+    @classmethod
+    def from_github_event(cls, event: GitHubEvent):
+        the_event = cls(payload=event.payload)
+        type = "issue" if "issue" in event.payload else "pull_request"
+        the_event._collab_id = event.payload[type]["id"]
+        the_event._label = event.payload["label"]["name"]
+        the_event._added = event.action == "labeled"
+        return the_event
+
+    @property
+    def collab_id(self):
+        return self._collab_id
+
+    @property
+    def label(self):
+        return self._label
+
+    @property
+    def added(self):
+        return self._added
+
 
 class VoteEvent(EngineEvent):
     def __init__(self, payload=None):
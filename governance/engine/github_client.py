@@ -0,0 +1,231 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+from aiohttp import ClientSession, TCPConnector
+from besser.agent.exceptions.logger import logger
+from gidgethub import sansio
+from multidict import CIMultiDict
+
+from governance.engine.response_cache import ResponseCache, response_cache
+
+GITHUB_API = "https://api.github.com"
+
+
+class TokenBucket:
+    # Client side view of the GitHub rate limit : tokens refill continuously and are
+    # re-synchronized with X-RateLimit-Remaining / X-RateLimit-Reset on every response
+    def __init__(self, capacity: int = 5000, refill_period: float = 3600.0):
+        self._capacity: float = float(capacity)
+        self._tokens: float = float(capacity)
+        self._rate: float = capacity / refill_period
+        self._updated: float = time.monotonic()
+        self._reset_at: float | None = None
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        if self._reset_at is not None and time.time() >= self._reset_at:
+            self._tokens = self._capacity
+            self._reset_at = None
+
+    def take(self) -> float:
+        # Consumes a token, or returns how long to wait before trying again
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        if self._reset_at is not None:
+            return max(0.05, self._reset_at - time.time())
+        return (1 - self._tokens) / self._rate
+
+    async def acquire(self):
+        wait = self.take()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.take()
+
+    def update(self, headers):
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        self._refill()
+        self._tokens = min(self._capacity, float(remaining))
+        reset = headers.get("X-RateLimit-Reset")
+        self._reset_at = float(reset) if reset is not None and self._tokens < 1 else None
+
+
+class AsyncGitHubClient:
+    # GitHub REST client running on its own event loop with one pooled ClientSession.
+    # The synchronous methods are meant for state bodies, enqueue() does not wait for the response.
+    def __init__(self, token: str = None, base_url: str = GITHUB_API, requester: str = "governance-decision-engine",
+                 concurrency: int = 8, bucket: TokenBucket = None, cache: ResponseCache | None = response_cache):
+        self._token: str = token
+        self._base_url: str = base_url
+        self._requester: str = requester
+        self._concurrency: int = concurrency
+        self._bucket: TokenBucket = bucket if bucket is not None else TokenBucket()
+        self._cache: ResponseCache | None = cache
+        self._session: ClientSession | None = None
+        self._requests: int = 0
+        self._failures: int = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="github-client", daemon=True)
+        self._thread.start()
+
+    @property
+    def bucket(self):
+        return self._bucket
+
+    def stats(self) -> dict:
+        return {"requests": self._requests,
+                "failures": self._failures,
+                "tokens": self._bucket.tokens}
+
+    def _submit(self, coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def _session_for_loop(self) -> ClientSession:
+        if self._session is None:
+            self._session = ClientSession(connector=TCPConnector(limit=self._concurrency))
+        return self._session
+
+    def url(self, url: str) -> str:
+        return sansio.format_url(url, {}, base_url=self._base_url)
+
+    async def send(self, method: str, url: str, data=None, headers: dict = None) -> tuple[int, CIMultiDict, bytes]:
+        request_headers = sansio.create_headers(self._requester, oauth_token=self._token)
+        if headers is not None:
+            request_headers.update(headers)
+        body = b""
+        if data is not None:
+            body = json.dumps(data).encode("utf-8")
+            request_headers["content-type"] = "application/json; charset=utf-8"
+        await self._bucket.acquire()
+        self._requests += 1
+        async with self._session_for_loop().request(method, self.url(url), headers=request_headers,
+                                                    data=body) as response:
+            response_body = await response.read()
+            response_headers = CIMultiDict(response.headers)
+        self._bucket.update(response_headers)
+        return response.status, response_headers, response_body
+
+    async def call(self, method: str, url: str, data=None):
+        if method == "GET" and self._cache is not None:
+            return await self._cached_get(url)
+        status, headers, body = await self.send(method, url, data)
+        response_data, _, _ = sansio.decipher_response(status, headers, body)
+        return response_data
+
+    async def _cached_get(self, url: str):
+        entry, fresh = self._cache.lookup(url)
+        if fresh:
+            return entry.data
+        conditional = {"If-None-Match": entry.etag} if entry is not None and entry.etag is not None else None
+        status, headers, body = await self.send("GET", url, headers=conditional)
+        if status == 304 and entry is not None:
+            self._cache.revalidated(entry)
+            return entry.data
+        response_data, _, _ = sansio.decipher_response(status, headers, body)
+        self._cache.store(url, response_data, headers.get("ETag"))
+        return response_data
+
+    async def call_all(self, method: str, urls: list[str]) -> list:
+        return await asyncio.gather(*(self.call(method, url) for url in urls))
+
+    def getitem(self, url: str):
+        return self._submit(self.call("GET", url)).result()
+
+    def getitems(self, urls: list[str]) -> list:
+        # Fans the requests out on the pooled connections
+        return self._submit(self.call_all("GET", urls)).result()
+
+    def request(self, method: str, url: str, data=None):
+        return self._submit(self.call(method, url, data)).result()
+
+    def enqueue(self, method: str, url: str, data=None) -> Future:
+        future = self._submit(self.call(method, url, data))
+
+        def report(done: Future):
+            if done.exception() is not None:
+                self._failures += 1
+                logger.error(f"GitHub {method} {url} failed: {done.exception()}")
+        future.add_done_callback(report)
+        return future
+
+    def close(self):
+        async def close_session():
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+        self._submit(close_session()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class GitHubIssue:
+    # Issue or pull request as returned by the REST API, with the accessors used by the engine
+    def __init__(self, payload: dict):
+        self._payload = payload
+
+    @property
+    def payload(self):
+        return self._payload
+
+    @property
+    def number(self):
+        return self._payload["number"]
+
+    @property
+    def labels(self):
+        return self._payload.get("labels", [])
+
+    @property
+    def repository(self) -> str:
+        return self._payload["repository_url"].split("/repos/", 1)[1]
+
+
+class AsyncGitHubPlatform:
+    # Drop-in for the platform methods called by the engine : reads wait for the response,
+    # writes (merge, close, labels) are enqueued so decision bodies never block on them
+    def __init__(self, client: AsyncGitHubClient):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client
+
+    def getitem(self, url: str):
+        return self._client.getitem(url)
+
+    def getitems(self, urls: list[str]) -> list:
+        return self._client.getitems(urls)
+
+    def put(self, url: str, data=None) -> Future:
+        return self._client.enqueue("PUT", url, data)
+
+    def patch(self, url: str, data=None) -> Future:
+        return self._client.enqueue("PATCH", url, data)
+
+    def post(self, url: str, data=None) -> Future:
+        return self._client.enqueue("POST", url, data)
+
+    def get_issue(self, user: str, repository: str, issue_number: int) -> GitHubIssue:
+        return GitHubIssue(self._client.getitem(f"/repos/{user}/{repository}/issues/{issue_number}"))
+
+    def set_label(self, issue: GitHubIssue, label: str) -> Future:
+        if self._client._cache is not None:
+            issue_path = f"/repos/{issue.repository}/issues/{issue.number}"
+            self._client._cache.invalidate(lambda key: key == issue_path)
+        return self._client.enqueue("POST", f"/repos/{issue.repository}/issues/{issue.number}/labels",
+                                    {"labels": [label]})
+
+    def close(self):
+        self._client.close()
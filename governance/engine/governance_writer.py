@@ -0,0 +1,122 @@
+import atexit
+import os
+import subprocess
+import threading
+
+from besser.agent.exceptions.logger import logger
+
+
+def flush_interval() -> float:
+    return float(os.environ.get("GOV_FILE_FLUSH_INTERVAL", 5.0))
+
+
+class GovernanceFileWriter:
+    # Write-behind queue of the role changes to push to the governance file of the playground.
+    # Changes are serialized when submitted, coalesced by individual, and a flush applies them all with a
+    # single read/write of the file and one commit and push. Flushes run on the writer thread, off the FSM.
+    def __init__(self, path: str, interval: float = 5.0, message: str = "Update roles in governance"):
+        self._path: str = path
+        self._interval: float = interval
+        self._message: str = message
+        self._pending: dict[str, str] = dict()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed: bool = False
+        self._flushes: int = 0
+        self._changes: int = 0
+
+    @property
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        return {"flushes": self._flushes,
+                "changes": self._changes,
+                "pending": self.pending}
+
+    def submit(self, name: str, block: str):
+        # block is the serialized individual, the latest one submitted for a name wins
+        with self._condition:
+            self._pending[name] = block
+            if self._interval <= 0 or self._closed:
+                synchronous = True
+            else:
+                synchronous = False
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="governance-writer", daemon=True)
+                    self._thread.start()
+                self._condition.notify()
+        if synchronous:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._condition:
+            changes = self._pending
+            self._pending = dict()
+        if len(changes) == 0:
+            return 0
+        with self._flush_lock:
+            try:
+                self._write(changes)
+            except Exception as e:
+                logger.error(f"Could not update the governance file {self._path}: {e}")
+                with self._condition:
+                    # Keep the newer changes submitted meanwhile
+                    self._pending = changes | self._pending
+                return 0
+        self._flushes += 1
+        self._changes += len(changes)
+        return len(changes)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while len(self._pending) == 0 and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                # Flush window : changes submitted meanwhile go in the same commit
+                self._condition.wait_for(lambda: self._closed, timeout=self._interval)
+            self.flush()
+
+    def _write(self, changes: dict[str, str]):
+        from governance.engine.semantics.helpers import update_individuals
+        directory, file_name = os.path.split(self._path)
+        # A failed git command raises, the changes stay pending and are retried with the next flush
+        subprocess.run(["git", "pull"], cwd=directory, check=True)
+        with open(self._path, "r") as file:
+            data = file.read()
+
+        new_version = update_individuals(data, changes)
+
+        with open(self._path, "w") as file:
+            file.write(new_version)
+
+        subprocess.run(["git", "add", file_name], cwd=directory, check=True)
+        if subprocess.run(["git", "diff", "--cached", "--quiet"], cwd=directory).returncode != 0:
+            # Nothing is staged when a retried flush was already committed, only its push failed
+            subprocess.run(["git", "commit", "-m", self._message], cwd=directory, check=True)
+        subprocess.run(["git", "push"], cwd=directory, check=True)
+
+
+_writers: dict[str, GovernanceFileWriter] = dict()
+_writers_lock = threading.Lock()
+
+def governance_writer(path: str) -> GovernanceFileWriter:
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = GovernanceFileWriter(path, flush_interval())
+            _writers[path] = writer
+            atexit.register(writer.close)
+        return writer
@@ -0,0 +1,62 @@
+import os
+import queue
+import threading
+import time
+
+from besser.agent.exceptions.logger import logger
+
+from governance.engine.events import LabelsResolvedEvent
+
+
+class LabelResolver:
+    # Fetches the labels of newly opened PRs/issues off the agent's event path.
+    # Labels set by bots right after the opening are picked up by waiting `delay` before the first fetch,
+    # failed fetches are retried with an exponential backoff, at most `max_attempts` times.
+    def __init__(self, agent, delay: float = None, max_attempts: int = 4, backoff: float = 2.0, workers: int = 4):
+        self._agent = agent
+        self._delay: float = delay if delay is not None else float(os.environ.get("LABEL_RESOLUTION_DELAY", 0.5))
+        self._max_attempts: int = max_attempts
+        self._backoff: float = backoff
+        self._requests: queue.Queue = queue.Queue()
+        self._workers: int = workers
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def resolve(self, collab_id: int, repo_id: str, number: int, platform):
+        with self._lock:
+            while len(self._threads) < self._workers:
+                thread = threading.Thread(target=self._run, name=f"label-resolver-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self._requests.put((time.monotonic() + self._delay, collab_id, repo_id, number, platform))
+
+    def _run(self):
+        while True:
+            due, collab_id, repo_id, number, platform = self._requests.get()
+            labels = set()
+            try:
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                labels = self._fetch(repo_id, number, platform)
+            except Exception as e:
+                # The collaboration must not wait for its labels forever, the webhook ones are already known
+                logger.warning(f"Could not resolve the labels of {repo_id}#{number}, "
+                               f"matching with the webhook labels only: {e}")
+            self._agent.receive_event(LabelsResolvedEvent(collab_id, labels))
+
+    def _fetch(self, repo_id: str, number: int, platform) -> set[str]:
+        user, repository = repo_id.split('/')
+        retry_in = self._delay if self._delay > 0 else 0.1
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                issue = platform.get_issue(user, repository, number)
+                return {label["name"] for label in issue.labels}
+            except Exception as e:
+                if attempt == self._max_attempts:
+                    logger.warning(f"Could not fetch the labels of {repo_id}#{number}, "
+                                   f"matching with the webhook labels only: {e}")
+                    break
+                time.sleep(retry_in)
+                retry_in *= self._backoff
+        return set()
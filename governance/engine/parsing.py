@@ -1,11 +1,17 @@
 import io
+import threading
 
 from antlr4.CommonTokenStream import CommonTokenStream
 from antlr4.InputStream import InputStream
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
 from antlr4.tree.Tree import ParseTreeWalker
+from besser.agent.exceptions.logger import logger
 
 from grammar import PolicyCreationListener, govdslParser, govdslLexer
 from grammar.govErrorListener import govErrorListener
+from governance.engine.policy_cache import policy_cache
 
 
 def setup_parser(text):
@@ -21,15 +27,85 @@ def setup_parser(text):
 
     return parser
 
-def parse_text(text):
-        parser = setup_parser(text)
-        tree = parser.governance()
 
-        listener = PolicyCreationListener()
-        walker = ParseTreeWalker()
-        walker.walk(listener, tree)
-        return listener.get_policies()
+class ReusableParser:
+    # Keeps one lexer/parser pair alive so the prediction DFA stays warm between reloads
+    def __init__(self):
+        self._lexer = govdslLexer(InputStream(""))
+        self._stream = CommonTokenStream(self._lexer)
+        self._parser = govdslParser(self._stream)
+        self._lock = threading.Lock()
+        self._sll_parses: int = 0
+        self._ll_fallbacks: int = 0
 
-def parse(path):
+    @property
+    def sll_parses(self):
+        return self._sll_parses
+
+    @property
+    def ll_fallbacks(self):
+        return self._ll_fallbacks
+
+    def parse_tree(self, text):
+        with self._lock:
+            self._lexer.inputStream = InputStream(text)
+            self._stream.setTokenSource(self._lexer)
+            self._parser.setTokenStream(self._stream)
+
+            # Stage 1 : SLL prediction, bail out on the first syntax error
+            self._parser.removeErrorListeners()
+            self._parser._errHandler = BailErrorStrategy()
+            self._parser._interp.predictionMode = PredictionMode.SLL
+            try:
+                tree = self._parser.governance()
+                self._sll_parses += 1
+                return tree
+            except ParseCancellationException:
+                pass
+
+            # Stage 2 : full LL prediction with the usual error reporting
+            self._ll_fallbacks += 1
+            self._stream.seek(0)
+            self._parser.reset()
+            self._parser.addErrorListener(govErrorListener(io.StringIO()))
+            self._parser._errHandler = DefaultErrorStrategy()
+            self._parser._interp.predictionMode = PredictionMode.LL
+            return self._parser.governance()
+
+
+reusable_parser = None
+reusable_parser_lock = threading.Lock()
+
+def get_reusable_parser() -> ReusableParser:
+    global reusable_parser
+    with reusable_parser_lock:
+        if reusable_parser is None:
+            reusable_parser = ReusableParser()
+        return reusable_parser
+
+def build_model(text, fast: bool = True):
+    if fast:
+        tree = get_reusable_parser().parse_tree(text)
+    else:
+        tree = setup_parser(text).governance()
+
+    listener = PolicyCreationListener()
+    walker = ParseTreeWalker()
+    walker.walk(listener, tree)
+    return listener.get_policies()
+
+def parse_text(text, use_cache: bool = True, fast: bool = True):
+    def build(policy_text):
+        return build_model(policy_text, fast)
+
+    if not use_cache:
+        return build(text)
+    hits = policy_cache.hits + policy_cache.disk_hits
+    model = policy_cache.get_or_parse(text, build)
+    if policy_cache.hits + policy_cache.disk_hits > hits:
+        logger.info(f"Policy model served from cache {policy_cache.stats()}")
+    return model
+
+def parse(path, fast: bool = True):
     with open(path, "r") as file:
-        return parse_text(file.read())
\ No newline at end of file
+        return parse_text(file.read(), fast=fast)
@@ -0,0 +1,87 @@
+import json
+import os
+import pickle
+import struct
+import sys
+import time
+import zlib
+
+from governance.engine.policy_cache import model_version, policy_text_key
+
+# Layout : magic | format version (u16) | metadata length (u32) | metadata (json) | zlib(pickle(model))
+ARTIFACT_MAGIC = b"GOVC"
+ARTIFACT_VERSION = 1
+ARTIFACT_EXTENSION = ".govc"
+HEADER = struct.Struct(">4sHI")
+
+
+class PolicyArtifactError(Exception):
+    pass
+
+
+def dump_model(model, source_text: str = None, source_path: str = None) -> bytes:
+    metadata = {
+        "source_key": policy_text_key(source_text) if source_text is not None else None,
+        "source_path": os.path.abspath(source_path) if source_path is not None else None,
+        "created": time.time(),
+        "python": list(sys.version_info[:2]),
+        "model_version": model_version(),
+    }
+    metadata_bytes = json.dumps(metadata).encode("utf-8")
+    payload = zlib.compress(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL), 9)
+    return HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(metadata_bytes)) + metadata_bytes + payload
+
+def _split(data: bytes) -> tuple[dict, memoryview]:
+    if len(data) < HEADER.size:
+        raise PolicyArtifactError("Truncated policy artifact")
+    magic, version, metadata_length = HEADER.unpack_from(data)
+    if magic != ARTIFACT_MAGIC:
+        raise PolicyArtifactError("Not a compiled policy artifact")
+    if version != ARTIFACT_VERSION:
+        raise PolicyArtifactError(f"Unsupported policy artifact version {version} (expected {ARTIFACT_VERSION})")
+    metadata_end = HEADER.size + metadata_length
+    metadata = json.loads(bytes(data[HEADER.size:metadata_end]).decode("utf-8"))
+    return metadata, memoryview(data)[metadata_end:]
+
+def load_model(data: bytes):
+    metadata, payload = _split(data)
+    if metadata.get("model_version") != model_version():
+        # The pickled classes may have changed with the GovernanceDSL metamodel or grammar
+        raise PolicyArtifactError("Policy artifact built with another version of the GovernanceDSL, rebuild it")
+    try:
+        return pickle.loads(zlib.decompress(payload))
+    except Exception as e:
+        raise PolicyArtifactError(f"Corrupted policy artifact: {e}") from e
+
+def read_metadata(path: str) -> dict:
+    with open(path, "rb") as file:
+        return _split(file.read())[0]
+
+def is_artifact(path: str) -> bool:
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(ARTIFACT_MAGIC)) == ARTIFACT_MAGIC
+    except OSError:
+        return False
+
+def write_artifact(model, path: str, source_text: str = None, source_path: str = None):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(dump_model(model, source_text, source_path))
+    os.replace(tmp_path, path)
+
+def read_artifact(path: str):
+    with open(path, "rb") as file:
+        return load_model(file.read())
+
+def compile_policy_file(source_path: str, artifact_path: str = None) -> str:
+    # Only the compilation needs the grammar, loading an artifact does not
+    from governance.engine.parsing import parse_text
+
+    if artifact_path is None:
+        artifact_path = os.path.splitext(source_path)[0] + ARTIFACT_EXTENSION
+    with open(source_path, "r") as file:
+        text = file.read()
+    model = parse_text(text, use_cache=False)
+    write_artifact(model, artifact_path, text, source_path)
+    return artifact_path
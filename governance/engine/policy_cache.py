@@ -0,0 +1,153 @@
+import functools
+import hashlib
+import importlib.util
+import os
+import threading
+from collections import OrderedDict
+
+from besser.agent.exceptions.logger import logger
+
+
+def normalize_policy_text(text: str) -> str:
+    # Line endings and trailing blanks carry no meaning in the DSL
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+def policy_text_key(text: str) -> str:
+    return hashlib.sha256(normalize_policy_text(text).encode("utf-8")).hexdigest()
+
+@functools.cache
+def model_version() -> str:
+    # Fingerprint of the GovernanceDSL sources (metamodel and grammar) the pickled models depend on.
+    # The modules are located without being imported, loading an artifact does not need the grammar.
+    digest = hashlib.sha256()
+    for name in ("metamodel", "grammar"):
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            digest.update(f"{name}:missing".encode("utf-8"))
+            continue
+        if spec.submodule_search_locations:
+            paths = sorted(os.path.join(directory, file_name)
+                           for location in spec.submodule_search_locations
+                           for directory, _, file_names in os.walk(location)
+                           for file_name in file_names if file_name.endswith(".py"))
+        else:
+            paths = [spec.origin]
+        for path in paths:
+            digest.update(f"{name}:{os.path.basename(path)}".encode("utf-8"))
+            with open(path, "rb") as file:
+                digest.update(file.read())
+    return digest.hexdigest()
+
+
+class PolicyCache:
+    def __init__(self, max_entries: int = 16, cache_dir: str = None):
+        self._entries: OrderedDict[str, object] = OrderedDict()
+        self._max_entries: int = max_entries
+        self._cache_dir: str = cache_dir
+        self._lock = threading.Lock()
+        self._hits: int = 0
+        self._disk_hits: int = 0
+        self._misses: int = 0
+
+    @property
+    def cache_dir(self):
+        # The on-disk tier is optional, it can be enabled with POLICY_CACHE_DIR
+        if self._cache_dir is not None:
+            return self._cache_dir
+        return os.environ.get("POLICY_CACHE_DIR") or None
+
+    @cache_dir.setter
+    def cache_dir(self, cache_dir: str):
+        self._cache_dir = cache_dir
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def disk_hits(self):
+        return self._disk_hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def stats(self) -> dict:
+        return {"hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "entries": len(self._entries)}
+
+    def get_or_parse(self, text: str, parse_function):
+        key = policy_text_key(text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+
+        model = self._read_from_disk(key)
+        if model is not None:
+            with self._lock:
+                self._disk_hits += 1
+                self._store(key, model)
+            return model
+
+        model = parse_function(text)
+        with self._lock:
+            self._misses += 1
+            self._store(key, model)
+        self._write_to_disk(key, model)
+        return model
+
+    def clear(self, memory_only: bool = True):
+        with self._lock:
+            self._entries.clear()
+        cache_dir = self.cache_dir
+        if not memory_only and cache_dir is not None and os.path.isdir(cache_dir):
+            for file_name in os.listdir(cache_dir):
+                if file_name.endswith(".govc"):
+                    os.remove(os.path.join(cache_dir, file_name))
+
+    def _store(self, key: str, model):
+        self._entries[key] = model
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str):
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            return None
+        return os.path.join(cache_dir, key + ".govc")
+
+    def _read_from_disk(self, key: str):
+        path = self._disk_path(key)
+        if path is None or not os.path.isfile(path):
+            return None
+        from governance.engine.policy_artifact import read_artifact
+        try:
+            return read_artifact(path)
+        except Exception as e:
+            # A stale or truncated entry is only a miss
+            logger.warning(f"Discarding unreadable policy cache entry {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _write_to_disk(self, key: str, model):
+        from governance.engine.policy_artifact import write_artifact
+        path = self._disk_path(key)
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_artifact(model, path)
+        except Exception as e:
+            logger.warning(f"Could not persist policy cache entry {path}: {e}")
+
+
+policy_cache = PolicyCache()
@@ -0,0 +1,158 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a response is served without asking GitHub again, webhooks invalidate them earlier.
+# Past that age, responses with an ETag are revalidated with If-None-Match (a 304 is not rate limited).
+DEFAULT_TTLS = {
+    "status": 30.0,
+    "commits": 60.0,
+    "issue": 60.0,
+    "reactions": 0.0,
+    "other": 0.0,
+}
+
+_ENDPOINTS = [
+    ("status", re.compile(r"/commits/[^/]+/status$")),
+    ("commits", re.compile(r"/pulls/\d+/commits$")),
+    ("reactions", re.compile(r"/issues/\d+/reactions$")),
+    ("issue", re.compile(r"/issues/\d+$")),
+]
+
+
+def path_of(url: str) -> str:
+    # Without the query, nor the fragment marking a local variant of a resource
+    return re.split(r"[?#]", url, maxsplit=1)[0]
+
+def endpoint_of(url: str) -> str:
+    for endpoint, pattern in _ENDPOINTS:
+        if pattern.search(path_of(url)):
+            return endpoint
+    return "other"
+
+def repository_path(url: str) -> str:
+    # Pages of a list are distinct resources with their own ETag, the query stays in the key
+    return url.removeprefix("https://api.github.com")
+
+
+class CachedResponse:
+    __slots__ = ("data", "etag", "stored_at", "endpoint")
+
+    def __init__(self, data, etag: str | None, endpoint: str):
+        self.data = data
+        self.etag: str | None = etag
+        self.stored_at: float = time.monotonic()
+        self.endpoint: str = endpoint
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 4096, ttls: dict[str, float] = None):
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._max_entries: int = max_entries
+        self._ttls: dict[str, float] = DEFAULT_TTLS | (ttls or {})
+        self._lock = threading.Lock()
+        self._hits: int = 0
+        self._not_modified: int = 0
+        self._misses: int = 0
+        self._invalidations: int = 0
+
+    def stats(self) -> dict:
+        return {"hits": self._hits,
+                "not_modified": self._not_modified,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "entries": len(self._entries)}
+
+    def lookup(self, url: str) -> tuple[CachedResponse | None, bool]:
+        # Returns the entry and whether it can be served without asking GitHub
+        key = repository_path(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = time.monotonic() - entry.stored_at < self._ttls.get(entry.endpoint, 0.0)
+            if fresh:
+                self._hits += 1
+            return entry, fresh
+
+    def store(self, url: str, data, etag: str | None = None):
+        key = repository_path(url)
+        with self._lock:
+            self._misses += 1
+            self._entries[key] = CachedResponse(data, etag, endpoint_of(key))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def revalidated(self, entry: CachedResponse):
+        # GitHub answered 304 Not Modified
+        with self._lock:
+            self._not_modified += 1
+            entry.stored_at = time.monotonic()
+
+    def invalidate(self, matches) -> int:
+        with self._lock:
+            stale = [key for key in self._entries if matches(key)]
+            for key in stale:
+                del self._entries[key]
+            self._invalidations += len(stale)
+            return len(stale)
+
+    def invalidate_for_webhook(self, name: str, payload: dict) -> int:
+        repository = (payload.get("repository") or {}).get("full_name")
+        if repository is None:
+            return 0
+        prefix = f"/repos/{repository}/"
+        if name == "push":
+            # New commits : commit lists and statuses of the repository changed
+            return self.invalidate(lambda key: key.startswith(prefix) and endpoint_of(key) in ("commits", "status"))
+        if name == "status":
+            status = f"{prefix}commits/{payload.get('sha')}/status"
+            return self.invalidate(lambda key: path_of(key) == status)
+        if name.endswith("labeled"):
+            element = payload.get("pull_request") or payload.get("issue") or {}
+            issue = f"{prefix}issues/{element.get('number')}"
+            return self.invalidate(lambda key: path_of(key) == issue)
+        return 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedPlatform:
+    # Read cache for platforms without conditional requests (besser GitHubPlatform) : only the TTLs apply,
+    # an expired entry is read again in full
+    def __init__(self, platform, cache: ResponseCache):
+        self._platform = platform
+        self._cache = cache
+
+    def getitem(self, url: str):
+        entry, fresh = self._cache.lookup(url)
+        if fresh:
+            return entry.data
+        data = self._platform.getitem(url)
+        self._cache.store(url, data)
+        return data
+
+    def get_issue(self, user: str, repository: str, issue_number: int):
+        # Issue objects of the platform are kept apart from the payloads getitem stores for the same URL
+        url = f"/repos/{user}/{repository}/issues/{issue_number}#issue"
+        entry, fresh = self._cache.lookup(url)
+        if fresh:
+            return entry.data
+        issue = self._platform.get_issue(user, repository, issue_number)
+        self._cache.store(url, issue)
+        return issue
+
+    def set_label(self, issue, label: str):
+        self._cache.invalidate(lambda key: endpoint_of(key) == "issue" and path_of(key).endswith(f"/issues/{issue.number}"))
+        return self._platform.set_label(issue, label)
+
+    def __getattr__(self, name):
+        return getattr(self._platform, name)
+
+
+response_cache = ResponseCache()
@@ -1,8 +1,9 @@
 import os
 import re
-import subprocess
 
-from governance.engine.semantics.helpers import update_individual
+from governance.engine.governance_writer import governance_writer
+from governance.engine.policy_cache import policy_cache
+from governance.engine.semantics.helpers import serialize_individual
 from governance.engine.semantics.runtime_metamodel import Collaboration
 from metamodel import SinglePolicy, StringList, Individual, Role
 from utils.chp_extension import Patch, PatchAction, PullRequest, MemberLifecycle, MemberAction
@@ -69,8 +70,14 @@ def promote(collab: Collaboration, policy: SinglePolicy):
         if indiv.name == dyn_indiv.name:
             return
 
-    role.individuals.add(dyn_indiv._base_individual)
-    update_indiv_in_gov_file(dyn_indiv._base_individual, collab._interaction._roles.values())
+    with collab._interaction._lock:
+        # Other shards iterate the members while building electorates, the set is replaced, never changed in place
+        role.individuals = role.individuals | {dyn_indiv._base_individual}
+        collab._interaction.eligibility.invalidate()
+    # Cached models share their roles with the running engine
+    policy_cache.clear()
+    if not getattr(collab._platform, "replaying", False):
+        update_indiv_in_gov_file(dyn_indiv._base_individual, collab._interaction._roles.values())
 
 
 def demote(collab: Collaboration, policy: SinglePolicy):
@@ -94,23 +101,15 @@ def demote(collab: Collaboration, policy: SinglePolicy):
     for indiv in role.individuals:
         if indiv.name == dyn_indiv.name:
             real_indiv = indiv
-    role.individuals.remove(real_indiv)
-    update_indiv_in_gov_file(real_indiv, collab._interaction._roles.values())
+    if real_indiv is None:
+        return
+    with collab._interaction._lock:
+        role.individuals = role.individuals - {real_indiv}
+        collab._interaction.eligibility.invalidate()
+    policy_cache.clear()
+    if not getattr(collab._platform, "replaying", False):
+        update_indiv_in_gov_file(real_indiv, collab._interaction._roles.values())
 
 def update_indiv_in_gov_file(indiv: Individual, roles: set[Role]):
-    dir, file_name = os.path.split(os.environ["PLAYGROUND_POLICY"])
-    subprocess.run(["git", "pull"], cwd=dir)
-    with open(os.environ["PLAYGROUND_POLICY"], "r") as file:
-        data = file.read()
-
-    new_version = update_individual(data, indiv, roles)
-
-    with open(os.environ["PLAYGROUND_POLICY"], "w") as file:
-        file.write(new_version)
-
-    subprocess.run(["git", "add", file_name], cwd=dir)
-    subprocess.run(["git", "commit", "-m", "Update roles in governance"], cwd=dir)
-    subprocess.run(["git", "push"], cwd=dir)
-
-
-
+    # Serialized now, written back by the write-behind queue with the other changes of the flush window
+    governance_writer(os.environ["PLAYGROUND_POLICY"]).submit(indiv.name, serialize_individual(indiv, roles))
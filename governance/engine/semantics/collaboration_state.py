@@ -0,0 +1,118 @@
+import time
+
+SUCCESS = "success"
+PENDING = "pending"
+FAILURE = "failure"
+
+_SUCCESSFUL_CONCLUSIONS = {"success", "neutral", "skipped"}
+
+# Seconds a state read from the REST API is trusted while no webhook confirmed it
+SEED_TTL = 60.0
+
+
+class CollaborationState:
+    # Materialized view of the head commit CI state, kept up to date by status/check_suite webhooks.
+    # Until the first webhook, the state seeded from the REST API expires after SEED_TTL and is read again.
+    # Labels live on the scope element, labels_known tells whether they were resolved (see LabelResolver).
+    # Reactions already turned into votes are remembered by their highest id and the page to resume from.
+    __slots__ = ("_head_sha", "_statuses", "_check_suites", "_ci_known", "_labels_known", "_reaction_mark",
+                 "_reaction_page", "_seeded_at")
+
+    def __init__(self, head_sha: str = None):
+        self._head_sha: str | None = head_sha
+        self._statuses: dict[str, str] = dict()
+        self._check_suites: dict[str, str] = dict()
+        self._ci_known: bool = False
+        self._labels_known: bool = False
+        self._reaction_mark: int = 0
+        self._reaction_page: int = 1
+        self._seeded_at: float | None = None
+
+    @property
+    def head_sha(self):
+        return self._head_sha
+
+    @head_sha.setter
+    def head_sha(self, sha: str):
+        if sha != self._head_sha:
+            # New commits, the previous CI results do not apply anymore and the next ones come by webhooks
+            replaced = self._head_sha is not None
+            self._head_sha = sha
+            self._statuses = dict()
+            self._check_suites = dict()
+            self._ci_known = replaced and sha is not None
+            self._seeded_at = None
+
+    @property
+    def labels_known(self):
+        return self._labels_known
+
+    @labels_known.setter
+    def labels_known(self, known: bool):
+        self._labels_known = known
+
+    @property
+    def reaction_mark(self):
+        return self._reaction_mark
+
+    @property
+    def reaction_page(self):
+        return self._reaction_page
+
+    def advance_reactions(self, mark: int, page: int):
+        self._reaction_mark = max(self._reaction_mark, mark)
+        self._reaction_page = max(1, page)
+
+    def record_status(self, context: str, state: str):
+        self._statuses[context] = state
+        self._ci_known = True
+        self._seeded_at = None
+
+    def record_check_suite(self, suite: str, status: str, conclusion: str | None):
+        if status != "completed" or conclusion is None:
+            self._check_suites[suite] = PENDING
+        elif conclusion in _SUCCESSFUL_CONCLUSIONS:
+            self._check_suites[suite] = SUCCESS
+        else:
+            self._check_suites[suite] = FAILURE
+        self._ci_known = True
+        self._seeded_at = None
+
+    def seed(self, statuses: list[dict]):
+        # Baseline read from the REST API, webhooks keep it current afterwards
+        for status in statuses:
+            self._statuses[status["context"]] = status["state"]
+        self._ci_known = True
+        self._seeded_at = time.time()
+
+    @property
+    def ci_state(self) -> str | None:
+        # Same combination as GitHub's combined status, None when nothing is known yet
+        if not self._ci_known:
+            return None
+        if self._seeded_at is not None and time.time() - self._seeded_at > SEED_TTL:
+            return None
+        states = list(self._statuses.values()) + list(self._check_suites.values())
+        if any(state in (FAILURE, "error") for state in states):
+            return FAILURE
+        if len(states) == 0 or any(state == PENDING for state in states):
+            return PENDING
+        return SUCCESS
+
+
+def apply_status_webhook(interaction, payload: dict):
+    repository = payload["repository"]["full_name"]
+    for collab in interaction.collaborations_at(repository, payload["sha"]):
+        collab.state.record_status(payload["context"], payload["state"])
+
+def apply_check_suite_webhook(interaction, payload: dict):
+    suite = payload["check_suite"]
+    repository = payload["repository"]["full_name"]
+    app = (suite.get("app") or {}).get("slug") or str(suite["id"])
+    for collab in interaction.collaborations_at(repository, suite["head_sha"]):
+        collab.state.record_check_suite(app, suite["status"], suite.get("conclusion"))
+
+def apply_synchronize_webhook(interaction, payload: dict):
+    collab = interaction.collaborations.get(payload["pull_request"]["id"])
+    if collab is not None:
+        interaction.track_head(collab, payload["repository"]["full_name"], payload["pull_request"]["head"]["sha"])
@@ -0,0 +1,203 @@
+import os
+from fractions import Fraction
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from governance.engine.semantics.runtime_metamodel import Vote, Decision
+
+OBJECT_BACKEND = "object"
+COLUMNAR_BACKEND = "columnar"
+
+def ballot_backend() -> str:
+    return os.environ.get("BALLOT_BACKEND", OBJECT_BACKEND).lower()
+
+def ballot_box_class(backend: str = None):
+    from governance.engine.semantics.runtime_metamodel import BallotBox
+    backend = ballot_backend() if backend is None else backend
+    if backend == OBJECT_BACKEND:
+        return BallotBox
+    if backend == COLUMNAR_BACKEND:
+        if np is None:
+            raise ImportError("The columnar ballot backend requires numpy (pip install numpy)")
+        return ColumnarBallotBox
+    raise ValueError(f"Unknown ballot backend '{backend}', expected '{OBJECT_BACKEND}' or '{COLUMNAR_BACKEND}'")
+
+
+class ColumnarBallotBox:
+    # Same contract as BallotBox, the counts are reductions over NumPy columns.
+    # Weights are running Fraction sums like in BallotBox, reading them does not scan the columns.
+    # Voters are found by their row (login -> row), no id outlives the box.
+    __slots__ = ("_rows", "_votes", "_agreement", "_weights", "_timestamps", "_alive", "_size",
+                 "_decided_by", "_agree_weight", "_against_weight")
+
+    def __init__(self, votes=(), capacity: int = 16):
+        self._rows: dict[str, int] = dict()
+        self._votes: list[Vote | None] = []
+        self._agreement = np.zeros(capacity, dtype=bool)
+        self._weights = np.zeros(capacity, dtype=np.float64)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._size: int = 0
+        self._decided_by: Decision | None = None
+        self._agree_weight: Fraction = Fraction(0)
+        self._against_weight: Fraction = Fraction(0)
+        for vote in votes:
+            self.add(vote)
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        # Snapshots of older versions also have a voter id column, it is not used anymore
+        state.pop("_voters", None)
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def _grow(self):
+        capacity = max(16, 2 * len(self._alive))
+        for column in ("_agreement", "_weights", "_timestamps", "_alive"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, column, new)
+
+    def _compact(self):
+        # Removed rows are only dropped once they are the majority, casting order is kept
+        keep = np.flatnonzero(self._alive[:self._size])
+        for column in ("_agreement", "_weights", "_timestamps", "_alive"):
+            old = getattr(self, column)
+            new = np.zeros(len(old), dtype=old.dtype)
+            new[:len(keep)] = old[keep]
+            setattr(self, column, new)
+        self._votes = [self._votes[row] for row in keep]
+        self._rows = {vote.voted_by.name: row for row, vote in enumerate(self._votes)}
+        self._size = len(keep)
+
+    def _count(self, row: int, sign: int):
+        weight = Fraction(float(self._weights[row]))
+        if self._agreement[row]:
+            self._agree_weight += sign * weight
+        else:
+            self._against_weight += sign * weight
+
+    def _write(self, row: int, vote: Vote):
+        self._agreement[row] = vote._agreement
+        self._weights[row] = vote._vote_value
+        self._timestamps[row] = vote._timestamp
+
+    def get(self, login: str) -> Vote | None:
+        row = self._rows.get(login)
+        return None if row is None else self._votes[row]
+
+    def add(self, vote: Vote):
+        # A voter has a single vote per box, a new one replaces the previous
+        login = vote.voted_by.name
+        row = self._rows.get(login)
+        if row is None:
+            if self._size == len(self._alive):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[login] = row
+            self._votes.append(vote)
+            self._alive[row] = True
+        elif self._votes[row] is vote:
+            return
+        else:
+            self._votes[row] = vote
+            self._count(row, -1)
+        self._write(row, vote)
+        self._count(row, 1)
+
+    def remove(self, vote: Vote):
+        if vote not in self:
+            raise KeyError(vote)
+        row = self._rows.pop(vote.voted_by.name)
+        self._count(row, -1)
+        self._votes[row] = None
+        self._alive[row] = False
+        if len(self._rows) < self._size // 2:
+            self._compact()
+
+    def discard(self, vote: Vote):
+        if vote in self:
+            self.remove(vote)
+
+    def update(self, vote: Vote, agreement: bool, vote_value: float, rationale: str, timestamp: float):
+        from governance.engine.semantics.runtime_metamodel import intern_rationale
+        row = self._rows[vote.voted_by.name]
+        self._count(row, -1)
+        vote._agreement = agreement
+        vote._vote_value = vote_value
+        vote._rationale = intern_rationale(rationale)
+        vote._timestamp = timestamp
+        self._write(row, vote)
+        self._count(row, 1)
+
+    def union(self, other) -> 'ColumnarBallotBox':
+        merged = ColumnarBallotBox(self, capacity=max(16, len(self) + len(other)))
+        for vote in other:
+            merged.add(vote)
+        return merged
+
+    @property
+    def decided_by(self) -> 'Decision | None':
+        return self._decided_by
+
+    @decided_by.setter
+    def decided_by(self, decision: 'Decision'):
+        self._decided_by = decision
+
+    def _mask(self, agreement: bool | None = None):
+        alive = self._alive[:self._size]
+        if agreement is None:
+            return alive
+        agreements = self._agreement[:self._size]
+        return alive & agreements if agreement else alive & ~agreements
+
+    def voted_by_any(self, logins, agreement: bool | None = None) -> bool:
+        rows = [self._rows[login] for login in logins if login in self._rows]
+        if len(rows) == 0:
+            return False
+        if agreement is None:
+            return True
+        agreements = self._agreement[np.asarray(rows, dtype=np.int64)]
+        return bool(agreements.any() if agreement else (~agreements).any())
+
+    def __iter__(self):
+        return (vote for vote in self._votes if vote is not None)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, vote):
+        row = self._rows.get(vote.voted_by.name)
+        return row is not None and self._votes[row] is vote
+
+    @property
+    def agree_weight(self) -> float:
+        return float(self._agree_weight)
+
+    @property
+    def against_weight(self) -> float:
+        return float(self._against_weight)
+
+    @property
+    def total_weight(self) -> float:
+        return float(self._agree_weight + self._against_weight)
+
+    @property
+    def agree_count(self) -> int:
+        return int(np.count_nonzero(self._mask(True)))
+
+    @property
+    def against_count(self) -> int:
+        return int(np.count_nonzero(self._mask(False)))
+
+    @property
+    def voter_count(self) -> int:
+        # One row per login
+        return len(self._rows)
@@ -0,0 +1,140 @@
+import threading
+
+import metamodel
+from metamodel import Policy, Role, Individual, SinglePolicy
+
+
+def agent_vote_value(agent: metamodel.Agent) -> float:
+    return (0.5 * agent.confidence +
+            0.3 * agent.autonomy_level +
+            0.2 * agent.explainability)
+
+
+class Eligibility:
+    # What a login brings to one policy : its best vote value, the roles it enacts and its Agent profile
+    def __init__(self):
+        self._vote_value: float = 0.0
+        self._roles: list[Role] = []
+        self._agent: metamodel.Agent | None = None
+        self._agent_vote_value: float | None = None
+
+    @property
+    def vote_value(self):
+        return self._vote_value
+
+    @property
+    def roles(self):
+        return self._roles
+
+    @property
+    def agent(self):
+        return self._agent
+
+    @property
+    def agent_vote_value(self):
+        # Computed once so that every vote of this agent shares the same value object
+        if self._agent is not None and self._agent_vote_value is None:
+            self._agent_vote_value = agent_vote_value(self._agent)
+        return self._agent_vote_value if self._agent is not None else None
+
+
+class Electorate:
+    def __init__(self, policy: SinglePolicy):
+        self._voters: dict[str, Eligibility] = dict()
+        self._participants: set[Individual] = set()
+
+        roles = {part for part in policy.participants if isinstance(part, Role)}
+        individuals = {part for part in policy.participants if not isinstance(part, Role)}
+        for role in roles:
+            # Read once : role changes replace the set of members (see actions.py)
+            members = role.individuals
+            self._participants = self._participants.union(members)
+            for registered in members:
+                entry = self._entry(registered)
+                entry._vote_value = max(entry._vote_value, role.vote_value)
+                entry._roles.append(role)
+        for part_indiv in individuals:
+            self._participants.add(part_indiv)
+            entry = self._entry(part_indiv)
+            entry._vote_value = max(entry._vote_value, part_indiv.vote_value)
+            role_assignement = part_indiv.role_assignement
+            if role_assignement is not None:
+                entry._roles.append(role_assignement.role)
+
+    def _entry(self, individual: Individual) -> Eligibility:
+        entry = self._voters.get(individual.name)
+        if entry is None:
+            entry = Eligibility()
+            self._voters[individual.name] = entry
+        # The last matching participant decides whether the vote is weighted as an Agent
+        entry._agent = individual if isinstance(individual, metamodel.Agent) else None
+        return entry
+
+    def get(self, login: str) -> Eligibility | None:
+        return self._voters.get(login)
+
+    def __contains__(self, login: str):
+        return login in self._voters
+
+    @property
+    def logins(self):
+        return self._voters.keys()
+
+    @property
+    def size(self) -> int:
+        return len(self._participants)
+
+
+class EligibilityIndex:
+    def __init__(self):
+        self._electorates: dict[Policy, Electorate] = dict()
+        self._roles: dict[str, Role] = dict()
+        self._memberships: dict[str, set[str]] | None = None
+        self._generation: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def register_roles(self, roles):
+        with self._lock:
+            for role in roles:
+                self._roles[role.name] = role
+            self._memberships = None
+
+    def track(self, policy: SinglePolicy):
+        unknown = [part for part in policy.participants
+                   if isinstance(part, Role) and self._roles.get(part.name) is not part]
+        if len(unknown) > 0:
+            self.register_roles(unknown)
+
+    def memberships(self, login: str) -> set[str]:
+        # Names of the roles a login is a member of
+        memberships = self._memberships
+        if memberships is None:
+            memberships = dict()
+            with self._lock:
+                for role in self._roles.values():
+                    for member in role.individuals:
+                        memberships.setdefault(member.name, set()).add(role.name)
+                self._memberships = memberships
+        return memberships.get(login, set())
+
+    def electorate(self, policy: SinglePolicy) -> Electorate:
+        electorate = self._electorates.get(policy)
+        if electorate is None:
+            generation = self._generation
+            electorate = Electorate(policy)
+            with self._lock:
+                # Not kept when the roles changed while it was built
+                if generation == self._generation:
+                    self._electorates[policy] = electorate
+        return electorate
+
+    def invalidate(self):
+        # Role membership changed (promote/demote) or new policies were loaded
+        with self._lock:
+            self._electorates.clear()
+            self._memberships = None
+            self._generation += 1
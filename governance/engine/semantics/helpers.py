@@ -5,17 +5,54 @@ from typing import TYPE_CHECKING
 from governance.engine.semantics.scope_comparator import compare_scopes, MatchingType
 
 if TYPE_CHECKING:
+    from governance.engine.semantics.policy_index import PolicyIndex
     from governance.engine.semantics.runtime_metamodel import Collaboration, Vote
 from governance.engine.events import DeadlineEvent, DecideEvent, VoteEvent
 from metamodel import Policy, ComposedPolicy, Role, Deadline, Project, Activity, Task, SinglePolicy, EvaluationMode, \
-    hasRole, Individual, Human, Agent
+    Individual, Human, Agent
 
 
+REACTIONS_PER_PAGE = 100
+REACTION_PAGES_FANOUT = 4
+
+def fetch_reaction_pages(platform, url: str, first_page: int) -> list[list[dict]]:
+    # The resume page is read alone, it is usually the last one. When it is full, the next pages are requested
+    # REACTION_PAGES_FANOUT at a time (concurrently when the platform supports it) until a page is not full
+    pages = [platform.getitem(f"{url}?per_page={REACTIONS_PER_PAGE}&page={first_page}")]
+    if len(pages[0]) < REACTIONS_PER_PAGE:
+        return pages
+    page = first_page + 1
+    while True:
+        urls = [f"{url}?per_page={REACTIONS_PER_PAGE}&page={n}" for n in range(page, page + REACTION_PAGES_FANOUT)]
+        if hasattr(platform, "getitems"):
+            batch = platform.getitems(urls)
+        else:
+            batch = []
+            for page_url in urls:
+                batch.append(platform.getitem(page_url))
+                if len(batch[-1]) < REACTIONS_PER_PAGE:
+                    break
+        for reactions in batch:
+            pages.append(reactions)
+            if len(reactions) < REACTIONS_PER_PAGE:
+                return pages
+        page += REACTION_PAGES_FANOUT
+
 def get_reaction_for(agent, collab: 'Collaboration'):
-    reactions = collab._platform.getitem(
-        f"/repos/{collab.scope.activity.project.repo_id}/issues/{collab.scope.element.payload["number"]}/reactions"
-    )
-    for reaction in reactions:
+    url = f"/repos/{collab.scope.activity.project.repo_id}/issues/{collab.scope.element.payload["number"]}/reactions"
+    state = collab.state
+    first_page = state.reaction_page
+    pages = fetch_reaction_pages(collab._platform, url, first_page)
+    if first_page > 1 and (len(pages[0]) == 0 or pages[0][0]["id"] > state.reaction_mark):
+        # Reactions were deleted since the last read and the pages shifted, read them all again
+        first_page = 1
+        pages = fetch_reaction_pages(collab._platform, url, first_page)
+    mark = state.reaction_mark
+    for reaction in (reaction for reactions in pages for reaction in reactions):
+        # Reactions are listed by increasing id, the ones up to the mark were already voted
+        if reaction["id"] <= state.reaction_mark:
+            continue
+        mark = max(mark, reaction["id"])
         if reaction["content"] != "+1" and reaction["content"] != "-1":
             continue
         evt = VoteEvent()
@@ -24,15 +61,30 @@ def get_reaction_for(agent, collab: 'Collaboration'):
         evt._user_login = reaction["user"]["login"]
         evt._rationale = ""
         agent.receive_event(evt)
+    # Resume from the last page that was not empty
+    last_page = first_page + len(pages) - 1
+    if len(pages[-1]) == 0 and len(pages) > 1:
+        last_page -= 1
+    state.advance_reactions(mark, last_page)
 
-def serialize_individual(indiv: Individual, roles: set[Role]):
-    indiv_roles = []
-    real_indiv = None
+def individual_roles(roles: set[Role]) -> dict[str, tuple[list[Role], Individual]]:
+    # One scan of the roles : name -> (roles of the individual, individual declared in the policy)
+    index = dict()
     for role in roles:
         for i in role.individuals:
-            if i.name == indiv.name:
-                indiv_roles.append(role)
-                real_indiv = i
+            indiv_roles, _ = index.get(i.name, ([], None))
+            indiv_roles.append(role)
+            index[i.name] = (indiv_roles, i)
+    return index
+
+def serialize_individual(indiv: Individual, roles: set[Role]):
+    return serialize_declaration(indiv, *individual_roles(roles).get(indiv.name, ([], None)))
+
+def serialize_individuals(indivs: list[Individual], roles: set[Role]) -> dict[str, str]:
+    index = individual_roles(roles)
+    return {indiv.name: serialize_declaration(indiv, *index.get(indiv.name, ([], None))) for indiv in indivs}
+
+def serialize_declaration(indiv: Individual, indiv_roles: list[Role], real_indiv: Individual | None):
     roles = ", ".join({role.name for role in indiv_roles})
     role_section = "" if len(indiv_roles) == 0 else f", role : {roles}"
     if real_indiv is not None and isinstance(real_indiv, Agent):
@@ -44,8 +96,34 @@ def serialize_individual(indiv: Individual, roles: set[Role]):
     return f"{indiv.name} {{ vote value : {indiv.vote_value}{role_section} }}"
 
 def update_individual(text: str, indiv: Individual, roles: set[Role]):
-    regex = re.compile(rf"(\(Agent\)\s*)?{indiv.name}\s*({{[^}}]*}})?")
-    return re.sub(regex, serialize_individual(indiv, roles), text, count=1)
+    return update_individuals(text, {indiv.name: serialize_individual(indiv, roles)})
+
+# A declaration : optional agent marker, name and optional block. Tokenizing with it skips over the blocks.
+DECLARATION = re.compile(r"(\(Agent\)\s*)?(?<![\w-])([A-Za-z0-9_][A-Za-z0-9_-]*)(?![\w-])\s*(\{[^}]*\})?")
+
+def update_individuals(text: str, blocks: dict[str, str]):
+    # blocks maps the name of an individual to its serialized declaration.
+    # The text is tokenized once and the first declaration of each name is replaced.
+    replaced = set()
+
+    def replace(match: re.Match):
+        name = match.group(2)
+        if name not in blocks or name in replaced:
+            return match.group(0)
+        replaced.add(name)
+        return blocks[name]
+    text = DECLARATION.sub(replace, text)
+    for name in blocks.keys() - replaced:
+        # Names the tokenizer cannot match as a whole : whole words only, blocks are skipped as by the tokenizer
+        regex = re.compile(rf"(\{{[^}}]*}})|(\(Agent\)\s*)?(?<![\w-]){re.escape(name)}(?![\w-])\s*(\{{[^}}]*}})?")
+
+        def replace_once(match: re.Match, name=name):
+            if match.group(1) is not None or name in replaced:
+                return match.group(0)
+            replaced.add(name)
+            return blocks[name]
+        text = regex.sub(replace_once, text)
+    return text
 
 def get_all_roles(policy):
     roles: set[Role]= set()
@@ -73,10 +151,11 @@ def get_all_individuals(policy):
 
     return individuals
 
-def find_policy_for(policies: set[Policy], collab: 'Collaboration'):
+def find_policy_for(policies: set[Policy], collab: 'Collaboration', index: 'PolicyIndex' = None):
     matching_policies: list[Policy] = []
     include_policies: list[Policy] = []
-    for policy in policies:
+    candidates = policies if index is None else index.candidates(collab.scope)
+    for policy in candidates:
         expected_scope = policy.scope
         received_scope = collab.scope
         matching = compare_scopes(expected_scope, received_scope)
@@ -131,50 +210,48 @@ def find_policies_in(policy: ComposedPolicy, collab: 'Collaboration') -> list[Po
     # else:  Parallel does not need anything as all the direct child are already started
     return []
 
+def carry_over_votes(collab: 'Collaboration', policy: SinglePolicy) -> bool:
+    from governance.engine.semantics.runtime_metamodel import Vote, BallotBox
+    prev_policy_index = policy.parent.phases.index(policy) - 1
+    if prev_policy_index < 0:
+        return False
+
+    prev_policy = policy.parent.phases[prev_policy_index]
+    electorate = collab._interaction.eligibility.electorate(policy)
+    box: BallotBox = collab.ballot_boxes[policy]
+    for vote in collab.ballot_boxes[prev_policy]:
+        individual = vote.voted_by
+        eligibility = electorate.get(individual.name)
+        if eligibility is None:
+            continue
+        for role in eligibility.roles:
+            individual.enacted_roles.add(collab._interaction.enact(individual, role, collab.scope))
+        vote_copy = Vote(vote._agreement, vote._timestamp, vote._rationale, vote._voted_by)
+        vote_copy._vote_value = vote._vote_value
+        box.add(vote_copy)
+        individual.votes.add(vote_copy)
+    return True
+
 def start_policies(agent: Agent, policies: list[Policy], collab: 'Collaboration') -> None:
     from governance.engine.semantics.policy_visitor import check_conditions
     for starting_policy in policies:
-        collab.ballot_boxes[starting_policy] = set()
+        collab.open_ballot_box(starting_policy)
         if isinstance(starting_policy, ComposedPolicy):
             continue
 
         # Nested SinglePolicy carry over
         if starting_policy.parent is not None and starting_policy.parent.carry_over:
-            prev_policy_index = starting_policy.parent.phases.index(starting_policy) - 1
-            if prev_policy_index >= 0:
-                prev_policy = starting_policy.parent.phases[prev_policy_index]
-                for vote in collab.ballot_boxes[prev_policy]:
-                    individual = vote.voted_by
-                    valid_vote = False
-                    for participant in starting_policy.participants:
-                        if isinstance(participant, Role):
-                            for registered in participant.individuals:
-                                if individual.name == registered.name:
-                                    valid_vote = True
-                                    individual.enacted_roles.add(
-                                        hasRole(individual.name, participant, individual, collab.scope))
-                        elif individual == participant:
-                            valid_vote = True
-                            part_indiv: Individual = participant  # if not a role it is an individual
-                            role = part_indiv.role_assignement.role
-                            individual.enacted_roles.add(hasRole(individual.name, role, individual, collab.scope))
-                    if valid_vote:
-                        box: set[Vote] = collab._ballot_boxes[starting_policy]
-                        vote_copy = Vote(vote._agreement, vote._timestamp, vote._rationale, vote._voted_by)
-                        vote_copy._vote_value = vote._vote_value
-                        box.add(vote_copy)
-                        individual.votes.add(vote_copy)
-
+            if carry_over_votes(collab, starting_policy):
                 # Can we decide
                 if check_conditions(collab, starting_policy, starting_policy.conditions):
-                    agent.receive_event(DecideEvent(collab, starting_policy))
+                    collab._interaction.post(agent, DecideEvent(collab, starting_policy))
 
         # Find deadlines and send the associated events
         deadlines = [d for d in starting_policy.conditions if isinstance(d, Deadline)]
         for deadline in deadlines:
             if deadline.date is not None:
                 timestamp = deadline.date.timestamp()
-                agent.receive_event(DeadlineEvent(collab, starting_policy, timestamp))
+                collab._interaction.deadlines.schedule(agent, DeadlineEvent(collab, starting_policy, timestamp))
             else:
                 timestamp = (datetime.now() + deadline.offset).timestamp()
-                agent.receive_event(DeadlineEvent(collab, starting_policy, timestamp))
\ No newline at end of file
+                collab._interaction.deadlines.schedule(agent, DeadlineEvent(collab, starting_policy, timestamp))
\ No newline at end of file
@@ -0,0 +1,217 @@
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import TYPE_CHECKING
+
+from besser.agent.core.agent import Agent
+from besser.agent.exceptions.logger import logger
+
+from governance.engine.events import DeadlineEvent, DecideEvent
+from governance.engine.semantics.helpers import find_starting_policies_in, find_policy_for
+from metamodel import Policy, ComposedPolicy, LeaderDrivenPolicy, Scope, Role, Individual
+
+if TYPE_CHECKING:
+    from governance.engine.semantics.policy_index import PolicyIndex
+    from governance.engine.semantics.runtime_metamodel import Collaboration, Interaction
+
+# Links between policies are compared through the paths, not through the node signatures
+STRUCTURAL_ATTRIBUTES = {"parent", "phases", "default"}
+MAX_FREEZE_DEPTH = 4
+
+
+def policy_children(policy: Policy) -> list[Policy]:
+    children = []
+    if isinstance(policy, ComposedPolicy):
+        children.extend(policy.phases)
+    if isinstance(policy, LeaderDrivenPolicy) and policy.default is not None:
+        children.append(policy.default)
+    return children
+
+def index_policy_paths(model) -> dict[tuple, Policy]:
+    paths: dict[tuple, Policy] = dict()
+
+    def visit(policy: Policy, path: tuple):
+        paths[path] = policy
+        for child in policy_children(policy):
+            visit(child, path + (child.name,))
+
+    for policy in model:
+        visit(policy, (policy.name,))
+    return paths
+
+def policy_path(policy: Policy) -> tuple:
+    path = []
+    while policy is not None:
+        path.insert(0, policy.name)
+        policy = getattr(policy, "parent", None)
+    return tuple(path)
+
+
+def _freeze(value, depth: int = 0):
+    if value is None or isinstance(value, (bool, int, float, str, date, datetime, timedelta)):
+        return value
+    if isinstance(value, Enum):
+        return type(value).__name__, value.name
+    # Referenced model elements are identified by name, their content is compared on their own
+    if isinstance(value, (Policy, Scope, Role, Individual)):
+        return type(value).__name__, value.name
+    if isinstance(value, dict):
+        return tuple(sorted(((repr(_freeze(k, depth)), _freeze(v, depth)) for k, v in value.items()), key=repr))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_freeze(v, depth) for v in value), key=repr))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v, depth) for v in value)
+    attributes = getattr(value, "__dict__", None)
+    if attributes is None or depth >= MAX_FREEZE_DEPTH:
+        return type(value).__name__, repr(value)
+    return type(value).__name__, tuple((key, _freeze(attr, depth + 1)) for key, attr in sorted(attributes.items()))
+
+def policy_signature(policy: Policy):
+    attributes = []
+    for key, value in sorted(vars(policy).items()):
+        if key.lstrip("_") in STRUCTURAL_ATTRIBUTES:
+            continue
+        attributes.append((key, _freeze(value)))
+    children = tuple(child.name for child in policy_children(policy))
+    return type(policy).__name__, tuple(attributes), children
+
+
+class PolicyDiff:
+    def __init__(self, old_model, new_model):
+        old_paths = index_policy_paths(old_model)
+        new_paths = index_policy_paths(new_model)
+        # old node -> new node, for nodes found at the same path
+        self._unchanged: dict[Policy, Policy] = dict()
+        self._changed: dict[Policy, Policy] = dict()
+        self._removed: set[Policy] = set()
+        self._added: set[Policy] = set()
+
+        for path, old_policy in old_paths.items():
+            new_policy = new_paths.get(path)
+            if new_policy is None:
+                self._removed.add(old_policy)
+            elif new_policy is old_policy or policy_signature(old_policy) == policy_signature(new_policy):
+                self._unchanged[old_policy] = new_policy
+            else:
+                self._changed[old_policy] = new_policy
+        for path, new_policy in new_paths.items():
+            if path not in old_paths:
+                self._added.add(new_policy)
+
+    @property
+    def unchanged(self):
+        return self._unchanged
+
+    @property
+    def changed(self):
+        return self._changed
+
+    @property
+    def removed(self):
+        return self._removed
+
+    @property
+    def added(self):
+        return self._added
+
+    def counterpart(self, old_policy: Policy) -> Policy | None:
+        if old_policy in self._unchanged:
+            return self._unchanged[old_policy]
+        return self._changed.get(old_policy)
+
+    def is_empty(self):
+        return len(self._changed) == 0 and len(self._removed) == 0 and len(self._added) == 0
+
+
+def _phases_to_resume(policy: ComposedPolicy, collab: 'Collaboration', decided: set[Policy],
+                      restarting: list[Policy]) -> list[Policy]:
+    def is_running(phase):
+        return phase in restarting or (phase in collab.ballot_boxes and phase not in decided)
+
+    out = []
+    if policy.sequential:
+        if any(is_running(phase) for phase in policy.phases):
+            return out
+        for phase in policy.phases:
+            if phase not in collab.ballot_boxes:
+                return find_starting_policies_in(phase, collab)
+    else:
+        for phase in policy.phases:
+            if phase not in collab.ballot_boxes and phase not in restarting:
+                out.extend(find_starting_policies_in(phase, collab))
+    return out
+
+def migrate_collaboration(collab: 'Collaboration', diff: PolicyDiff, decided: set[Policy]) -> list[Policy]:
+    migrated: dict[Policy, object] = dict()
+    migrated_decided: set[Policy] = set()
+    restarting: list[Policy] = []
+
+    for old_policy, box in collab.ballot_boxes.items():
+        new_policy = diff.counterpart(old_policy)
+        if new_policy is None:
+            continue
+        if old_policy in decided:
+            migrated_decided.add(new_policy)
+        # Decided phases are history, and compositions only gather the votes of their phases
+        if old_policy in diff.unchanged or old_policy in decided or isinstance(new_policy, ComposedPolicy):
+            migrated[new_policy] = box
+        else:
+            restarting.append(new_policy)
+
+    collab.ballot_boxes.clear()
+    collab.ballot_boxes.update(migrated)
+    collab.reindex_voters()
+
+    for new_policy in list(migrated):
+        if isinstance(new_policy, ComposedPolicy) and new_policy not in migrated_decided:
+            restarting.extend(_phases_to_resume(new_policy, collab, migrated_decided, restarting))
+    return restarting
+
+def remap_event(event, diff: PolicyDiff) -> bool:
+    # False when the event belongs to a rebuilt policy and must be dropped
+    if not isinstance(event, (DeadlineEvent, DecideEvent)) or event.policy is None:
+        return True
+    if event.policy in diff.unchanged:
+        event._policy = diff.unchanged[event.policy]
+        return True
+    # The policy was rebuilt, the restart emits its own events
+    return event.collab is None
+
+def remap_pending_events(pending_events, diff: PolicyDiff):
+    if pending_events is None:
+        return
+    for event in list(pending_events):
+        if not remap_event(event, diff):
+            pending_events.remove(event)
+
+def migrate_interaction(agent: Agent, interaction: 'Interaction', old_model, new_model,
+                        start_function, pending_events=None, policy_index: 'PolicyIndex' = None) -> PolicyDiff:
+    diff = PolicyDiff(old_model, new_model)
+
+    decided: dict[int, set[Policy]] = dict()
+    for decision in interaction.decisions:
+        decided.setdefault(decision._decides._id, set()).add(decision._rule)
+        new_rule = diff.counterpart(decision._rule)
+        if new_rule is not None:
+            decision._rule = new_rule
+
+    remap_pending_events(pending_events, diff)
+    interaction.deadlines.retain(lambda event: remap_event(event, diff))
+    migrated = 0
+    for collab in list(interaction.collaborations.values()):
+        if collab._is_decided is not None:
+            continue
+        had_policies = len(collab.ballot_boxes) > 0
+        restarting = migrate_collaboration(collab, diff, decided.get(collab._id, set()))
+        if len(restarting) > 0:
+            start_function(agent, restarting, collab)
+        elif had_policies and len(collab.ballot_boxes) == 0:
+            # The governing policy disappeared, look for a new one as on proposal
+            applicable_policy, starting_policies = find_policy_for(new_model, collab, policy_index)
+            if applicable_policy is not None:
+                start_function(agent, find_starting_policies_in(applicable_policy, collab), collab)
+        migrated += 1
+
+    logger.info(f"Policy reload: {len(diff.unchanged)} unchanged, {len(diff.changed)} changed, "
+                f"{len(diff.removed)} removed, {len(diff.added)} added policies, "
+                f"{migrated} open collaborations migrated")
+    return diff
@@ -0,0 +1,65 @@
+from metamodel import Policy, Scope
+from utils.chp_extension import Patch, Repository, PatchAction
+
+
+def scope_repository(scope: Scope) -> str | None:
+    while scope is not None:
+        if isinstance(scope, Repository):
+            return scope.repo_id
+        next_scope = getattr(scope, "activity", None)
+        if next_scope is None:
+            next_scope = getattr(scope, "project", None)
+        scope = next_scope
+    return None
+
+def _is_any_action(action) -> bool:
+    return action is None or action is PatchAction.ALL
+
+
+class PolicyIndex:
+    # Pre-filter for find_policy_for : a bucket only drops policies compare_scopes would reject,
+    # the remaining candidates are still compared and keep the order of the policy model.
+    def __init__(self, policies):
+        self._policies: list[Policy] = list(policies)
+        self._buckets: dict[tuple, dict] = dict()
+        for order, policy in enumerate(self._policies):
+            repo_id, element_type, action, labels = self._keys_of(policy.scope)
+            by_action = self._buckets.setdefault((repo_id, element_type), dict())
+            by_action.setdefault(action, []).append((order, policy, labels))
+
+    @property
+    def policies(self):
+        return self._policies
+
+    @staticmethod
+    def _keys_of(scope: Scope) -> tuple:
+        repo_id = scope_repository(scope)
+        if not isinstance(scope, Patch):
+            return repo_id, None, None, None
+        action = None if _is_any_action(scope.action) else scope.action
+        labels = None
+        if scope.element is not None and scope.element.labels is not None:
+            labels = frozenset(label.name for label in scope.element.labels)
+        return repo_id, type(scope.element), action, labels
+
+    def candidates(self, scope: Scope) -> list[Policy]:
+        repo_id = scope_repository(scope)
+        if not isinstance(scope, Patch) or scope.element is None or repo_id is None:
+            return self._policies
+
+        element_type = type(scope.element)
+        received_labels = scope.element.labels if scope.element.labels is not None else set()
+        found = []
+        for bucket_key in ((repo_id, element_type), (repo_id, None), (None, element_type), (None, None)):
+            by_action = self._buckets.get(bucket_key)
+            if by_action is None:
+                continue
+            if _is_any_action(scope.action):
+                entries = [entry for action_entries in by_action.values() for entry in action_entries]
+            else:
+                entries = by_action.get(scope.action, []) + by_action.get(None, [])
+            for order, policy, labels in entries:
+                if labels is None or labels.issubset(received_labels):
+                    found.append((order, policy))
+        found.sort(key=lambda entry: entry[0])
+        return [policy for order, policy in found]
@@ -34,11 +34,9 @@ def visitConsensusPolicy(collab: 'Collaboration', rule:ConsensusPolicy) -> bool:
     if not check_conditions(collab, rule, rule.conditions):
         return False
 
-    vote_count: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    total_count: float = box.total_weight
 
     if total_count == 0:
         return False
@@ -50,18 +48,9 @@ def visitLazyConsensusPolicy(collab: 'Collaboration', rule:LazyConsensusPolicy)
     if not check_conditions(collab, rule, rule.conditions):
         return False
 
-    potential_participant = set()
-    for p in rule.participants:
-        if isinstance(p, Role):
-            potential_participant = potential_participant.union(p.individuals)
-        else:  # is individual
-            potential_participant.add(p)
-
-    vote_count: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    total_count: float = box.total_weight
 
     if total_count == 0.0:
         return True
@@ -73,11 +62,9 @@ def visitVotingPolicy(collab: 'Collaboration', rule:VotingPolicy) -> bool:
     if not check_conditions(collab, rule, rule.conditions):
         return False
 
-    vote_count: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    total_count: float = box.total_weight
     ratio = rule.ratio if rule.ratio is not None else 0.5
     if total_count == 0:
         return False
@@ -88,11 +75,9 @@ def visitMajorityPolicy(collab: 'Collaboration', rule:MajorityPolicy) -> bool:
     if not check_conditions(collab, rule, rule.conditions):
         return False
 
-    vote_count: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    total_count: float = box.total_weight
     ratio = rule.ratio if rule.ratio is not None else 0.5
     if total_count == 0:
         return False
@@ -103,20 +88,13 @@ def visitAbsoluteMajorityPolicy(collab: 'Collaboration', rule:AbsoluteMajorityPo
     if not check_conditions(collab, rule, rule.conditions):
         return False
 
-    potential_participant = set()
-    for p in rule.participants:
-        if isinstance(p, Role):
-            potential_participant = potential_participant.union(p.individuals)
-        else:  # is individual
-            potential_participant.add(p)
+    electorate_size = collab._interaction.eligibility.electorate(rule).size
 
-    vote_count: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    total_count: float = box.total_weight
 
-    abstention = len(potential_participant) - len(collab.ballot_boxes[rule])
+    abstention = electorate_size - box.voter_count
     ratio = rule.ratio if rule.ratio is not None else 0.5
     percentage = vote_count / (total_count + abstention)
     return percentage > ratio or percentage == 1.0
@@ -139,14 +117,9 @@ def visitComposedPolicy(collab: 'Collaboration', rule:ComposedPolicy) -> bool |
     finished = True
     for phase in rule.phases:
         if phase in collab.ballot_boxes:
-            box = collab.ballot_boxes[phase]
-            if len(box) == 0:
-                finished = False
-                continue
-            vote = box.pop()
-            box.add(vote)
-            if vote._part_of is not None:
-                decision = vote._part_of._accepted
+            decided_by = collab.ballot_boxes[phase].decided_by
+            if decided_by is not None:
+                decision = decided_by._accepted
                 if rule.require_all != decision:
                     return decision
             else:
@@ -189,17 +162,16 @@ def visitCondition(collab: 'Collaboration', rule: Policy, cond: Condition) -> bo
     return True
 
 def visitParticipantExclusion(collab: 'Collaboration', rule: Policy, cond: ParticipantExclusion) -> bool:
-    to_remove = set()
-    for vote in collab.ballot_boxes[rule]:
-        if vote.voted_by in cond.excluded:
-            vote.voted_by.votes.remove(vote)
-            to_remove.add(vote)
-    collab.ballot_boxes[rule] = collab.ballot_boxes[rule] - to_remove
+    box = collab.ballot_boxes[rule]
+    to_remove = [vote for vote in box if vote.voted_by in cond.excluded]
+    for vote in to_remove:
+        vote.voted_by.votes.remove(vote)
+        box.remove(vote)
     return True
 
 
 def visitMinimumParticipant(collab: 'Collaboration', rule: Policy, cond: MinimumParticipant) -> bool:
-    return len(collab.ballot_boxes[rule]) >= cond.min_participants
+    return collab.ballot_boxes[rule].voter_count >= cond.min_participants
 
 def visitVetoRight(collab: 'Collaboration', rule: Policy, cond: VetoRight) -> bool:
     vetoers = set()
@@ -208,40 +180,54 @@ def visitVetoRight(collab: 'Collaboration', rule: Policy, cond: VetoRight) -> bo
             vetoers = vetoers.union(vetoer.individuals)
         else:
             vetoers.add(vetoer)
-    for vote in collab.ballot_boxes[rule]:
-        if vote.voted_by in vetoers:
-            if not vote._agreement:
-                return False
-
-    return True
+    return not collab.ballot_boxes[rule].voted_by_any({vetoer.name for vetoer in vetoers}, agreement=False)
 
 def visitCheckCiCd(collab: 'Collaboration', rule: Policy, cond: CheckCiCd) -> bool:
+    state = collab.state.ci_state
+    if state is None:
+        state = fetch_ci_state(collab)
+    return state == "success"
+
+def fetch_ci_state(collab: 'Collaboration') -> str:
+    # Until the first status/check_suite webhook (or when the seed expired), the state is then maintained locally.
+    # Reads go through the response cache. With the async client an expired seed is revalidated with its ETag
+    # (a 304 when nothing changed), the default platform reads it again once its TTL is over
     gh_platform: GitHubPlatform = collab._platform
     pr_payload = collab.scope.element.payload
-    commits = gh_platform.getitem(pr_payload["commits_url"].removeprefix('https://api.github.com'))
-    status_url = commits[0]["url"].removeprefix('https://api.github.com') + '/status'
+    if collab.state.head_sha is not None:
+        status_url = f"/repos/{collab.scope.activity.project.repo_id}/commits/{collab.state.head_sha}/status"
+    else:
+        commits = gh_platform.getitem(pr_payload["commits_url"].removeprefix('https://api.github.com'))
+        status_url = commits[0]["url"].removeprefix('https://api.github.com') + '/status'
     status_payload = gh_platform.getitem(status_url)
-    return status_payload["state"] == "success"
+    collab.state.seed(status_payload.get("statuses", []))
+    if len(status_payload.get("statuses", [])) == 0:
+        return status_payload["state"]
+    return collab.state.ci_state
 
 def visitLabelCondition(collab: 'Collaboration', rule: Policy, cond: LabelCondition) -> bool:
-    gh_platform: GitHubPlatform = collab._platform
-    pr_id = collab.scope.element.payload["number"]
-    project: Repository = collab.scope
-    if isinstance(collab.scope, Activity):
-        project = collab.scope.project
-    elif isinstance(collab.scope, Task):
-        project = collab.scope.activity.project
-    user_repo = project.repo_id.split('/')
-    pr = gh_platform.get_issue(user_repo[0], user_repo[1], pr_id)
-    if cond.evaluation_mode == EvaluationMode.POST:
-        for label in cond.labels:
-            gh_platform.set_label(pr, label.name)
+    if cond.evaluation_mode != EvaluationMode.POST and collab.state.labels_known:
+        labels_name = set(collab.scope.element.labels)
     else:
+        gh_platform: GitHubPlatform = collab._platform
+        pr_id = collab.scope.element.payload["number"]
+        project: Repository = collab.scope
+        if isinstance(collab.scope, Activity):
+            project = collab.scope.project
+        elif isinstance(collab.scope, Task):
+            project = collab.scope.activity.project
+        user_repo = project.repo_id.split('/')
+        pr = gh_platform.get_issue(user_repo[0], user_repo[1], pr_id)
+        if cond.evaluation_mode == EvaluationMode.POST:
+            for label in cond.labels:
+                gh_platform.set_label(pr, label.name)
+                collab.scope.element.labels.add(label.name)
+            return
         labels_name = {label["name"] for label in pr.labels}
-        for label in cond.labels:
-            if (label.name not in labels_name) == cond.inclusion:
-                return False
-        return True
+    for label in cond.labels:
+        if (label.name not in labels_name) == cond.inclusion:
+            return False
+    return True
 
 
 
@@ -266,73 +252,49 @@ def isDecidableConsensusPolicy(collab: 'Collaboration', rule:ConsensusPolicy) ->
     # if not check_conditions(collab, rule, rule.conditions):
     #     return False
 
-    potential_participant = set()
-    for p in rule.participants:
-        if isinstance(p, Role):
-            potential_participant = potential_participant.union(p.individuals)
-        else:  # is individual
-            potential_participant.add(p)
+    electorate_size = collab._interaction.eligibility.electorate(rule).size
 
-    vote_count: float = 0
-    vote_against: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        vote_against += vote._vote_value if not vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    vote_against: float = box.against_weight
+    total_count: float = box.total_weight
 
     if total_count == 0.0:
         return False
 
-    return vote_count / len(potential_participant) == 1.0
+    return vote_count / electorate_size == 1.0
 
 def isDecidableLazyConsensusPolicy(collab: 'Collaboration', rule:LazyConsensusPolicy) -> bool:
     # if not check_conditions(collab, rule, rule.conditions):
     #     return False
 
-    potential_participant = set()
-    for p in rule.participants:
-        if isinstance(p, Role):
-            potential_participant = potential_participant.union(p.individuals)
-        else:  # is individual
-            potential_participant.add(p)
+    electorate_size = collab._interaction.eligibility.electorate(rule).size
 
-    vote_count: float = 0
-    vote_against: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        vote_against += vote._vote_value if not vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    vote_against: float = box.against_weight
+    total_count: float = box.total_weight
 
     if total_count == 0.0:
         return False
 
-    return vote_count / len(potential_participant) == 1.0
+    return vote_count / electorate_size == 1.0
 
 def isDecidableVotingPolicy(collab: 'Collaboration', rule:VotingPolicy) -> bool:
     # if not check_conditions(collab, rule, rule.conditions):
     #     return False
 
-    potential_participant = set()
-    for p in rule.participants:
-        if isinstance(p, Role):
-            potential_participant = potential_participant.union(p.individuals)
-        else:  # is individual
-            potential_participant.add(p)
+    electorate_size = collab._interaction.eligibility.electorate(rule).size
 
-    vote_count: float = 0
-    vote_against: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        vote_against += vote._vote_value if not vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    vote_against: float = box.against_weight
+    total_count: float = box.total_weight
 
     if total_count == 0.0:
         return False
 
-    abstention = len(potential_participant) - len(collab.ballot_boxes[rule])
+    abstention = electorate_size - box.voter_count
     ratio = rule.ratio if rule.ratio is not None else 0.5
     inv_ratio = 1 - ratio
 
@@ -351,25 +313,17 @@ def isDecidableMajorityPolicy(collab: 'Collaboration', rule:MajorityPolicy) -> b
     # if not check_conditions(collab, rule, rule.conditions):
     #     return False
 
-    potential_participant = set()
-    for p in rule.participants:
-        if isinstance(p, Role):
-            potential_participant = potential_participant.union(p.individuals)
-        else:  # is individual
-            potential_participant.add(p)
+    electorate_size = collab._interaction.eligibility.electorate(rule).size
 
-    vote_count: float = 0
-    vote_against: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        vote_against += vote._vote_value if not vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    vote_against: float = box.against_weight
+    total_count: float = box.total_weight
 
     if total_count == 0.0:
         return False
 
-    abstention = len(potential_participant) - len(collab.ballot_boxes[rule])
+    abstention = electorate_size - box.voter_count
     ratio = rule.ratio if rule.ratio is not None else 0.5
     inv_ratio = 1 - ratio
 
@@ -388,25 +342,17 @@ def isDecidableAbsoluteMajorityPolicy(collab: 'Collaboration', rule:AbsoluteMajo
     # if not check_conditions(collab, rule, rule.conditions):
     #     return False
 
-    potential_participant = set()
-    for p in rule.participants:
-        if isinstance(p, Role):
-            potential_participant = potential_participant.union(p.individuals)
-        else:  # is individual
-            potential_participant.add(p)
+    electorate_size = collab._interaction.eligibility.electorate(rule).size
 
-    vote_count: float = 0
-    vote_against: float = 0
-    total_count: float = 0
-    for vote in collab.ballot_boxes[rule]:
-        vote_count += vote._vote_value if vote._agreement else 0
-        vote_against += vote._vote_value if not vote._agreement else 0
-        total_count += vote._vote_value
+    box = collab.ballot_boxes[rule]
+    vote_count: float = box.agree_weight
+    vote_against: float = box.against_weight
+    total_count: float = box.total_weight
 
     if total_count == 0.0:
         return False
 
-    abstention = len(potential_participant) - len(collab.ballot_boxes[rule])
+    abstention = electorate_size - box.voter_count
     ratio = rule.ratio if rule.ratio is not None else 0.5
     inv_ratio = 1 - ratio
     return (vote_count / (total_count + abstention) > ratio or    # still true if all abstentionists vote false
@@ -431,11 +377,9 @@ def isDecidableComposedPolicy(collab: 'Collaboration', rule:ComposedPolicy) -> b
     finished = True
     for phase in rule.phases:
         if phase in collab.ballot_boxes:
-            box = collab.ballot_boxes[phase]
-            vote = box.pop()
-            box.add(vote)
-            if vote._part_of is not None:
-                decision = vote._part_of._accepted
+            decided_by = collab.ballot_boxes[phase].decided_by
+            if decided_by is not None:
+                decision = decided_by._accepted
                 if rule.require_all != decision:
                     return True
             else:
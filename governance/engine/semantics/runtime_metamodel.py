@@ -1,16 +1,35 @@
+import sys
+import threading
 import time
+from fractions import Fraction
 
 from besser.agent.core.agent import Agent
 from nltk.sem.relextract import roles_demo
 
-import metamodel
+from governance.engine.deadline_scheduler import DeadlineScheduler
+from governance.engine.semantics.collaboration_state import CollaborationState
+from governance.engine.semantics.eligibility import EligibilityIndex
 from governance.engine.semantics.policy_visitor import visitPolicy, visitComposedPolicy, visitCondition, \
     check_conditions, isDecidablePolicy
 from metamodel import Role, Policy, Scope, Individual, StatusEnum, ComposedPolicy, hasRole, SinglePolicy, EvaluationMode
 
 
+def intern_rationale(rationale: str | None) -> str | None:
+    # Rationales repeat a lot (empty, canned bot messages), a single copy is kept
+    return sys.intern(rationale) if isinstance(rationale, str) else rationale
+
+
+def restore_individual(name: str) -> 'DynamicIndividual':
+    # Named before the rest of its state is restored, sets of individuals hash them by name
+    individual = DynamicIndividual.__new__(DynamicIndividual)
+    Individual.__init__(individual, name)
+    return individual
+
+
 # Modification for the Individual class
 class DynamicIndividual(Individual):
+    __slots__ = ("_interaction", "_proposes", "_leads", "_votes", "_enacted_roles", "_base_individual")
+
     def __init__(self, individual: Individual, interaction):
         super().__init__(individual.name, individual.vote_value)
         self._interaction: Interaction = interaction
@@ -28,6 +47,14 @@ class DynamicIndividual(Individual):
     def __hash__(self):
         return hash(self.name)
 
+    def __reduce__(self):
+        return restore_individual, (self.name,), self.__getstate__()
+
+    def refresh(self, individual: Individual):
+        # A new version of the policies was loaded, the runtime history is kept
+        self._base_individual = individual
+        self.vote_value = individual.vote_value
+
     @property
     def votes(self):
         return self._votes
@@ -50,11 +77,82 @@ class Interaction:
         self._roles: dict[str, Role] = dict()
         self._collaborations: dict[int,Collaboration] = dict()
         self._decisions: set[Decision] = set()
+        self._eligibility: EligibilityIndex = EligibilityIndex()
+        self._deadlines: DeadlineScheduler = DeadlineScheduler()
+        # collaboration id -> DecideEvents sent to the agent and not handled yet
+        self._pending_events: dict[int, list] = dict()
+        self._role_records: dict[tuple, hasRole] = dict()
+        # collaborations proposed but not matched with a policy yet -> events received in the meantime
+        self._awaiting_labels: dict[int, list] = dict()
+        # (repository, head commit sha) -> ids of the collaborations it is the head of
+        self._commits: dict[tuple[str, str], set[int]] = dict()
+        # Ballot box implementation of this engine, selected with BALLOT_BACKEND
+        from governance.engine.semantics.columnar_ballot import ballot_box_class
+        self._ballot_box_class = ballot_box_class()
+        # Shared registries are guarded, collaborations are owned by a single shard (see sharding.py)
+        self._lock = threading.RLock()
+        # (generation, offset) of the event journal this state includes, set when a snapshot is taken
+        self._journal_position: tuple[int, int] | None = None
+        # Decided collaborations are moved there after the grace period (see archive.py)
+        from governance.engine.archive import collaboration_archive
+        self._archive = collaboration_archive()
+
+    # Runtime helpers are not part of a snapshot, they are rebuilt by resume()
+    TRANSIENT = ("_eligibility", "_deadlines", "_pending_events", "_ballot_box_class", "_lock", "_archive")
+
+    def __getstate__(self):
+        state = {key: value for key, value in self.__dict__.items() if key not in self.TRANSIENT}
+        state["_pending_decisions"] = [(event.collab, event.policy)
+                                       for events in self._pending_events.values() for event in events]
+        state["_pending_deadlines"] = [(event.collab, event.policy, event._timestamp)
+                                       for event in self._deadlines.events()]
+        return state
+
+    def __setstate__(self, state):
+        from governance.engine.archive import collaboration_archive
+        from governance.engine.semantics.columnar_ballot import ballot_box_class
+        self._pending_decisions = state.pop("_pending_decisions")
+        self._pending_deadlines = state.pop("_pending_deadlines")
+        self._journal_position = None
+        self.__dict__.update(state)
+        self._eligibility = EligibilityIndex()
+        self._deadlines = DeadlineScheduler()
+        self._pending_events = dict()
+        self._ballot_box_class = ballot_box_class()
+        self._lock = threading.RLock()
+        self._archive = collaboration_archive()
+
+    def resume(self, agent: Agent):
+        # Restored from a snapshot : rebuilds the indexes and hands the pending work back to the agent
+        from governance.engine.events import DeadlineEvent, DecideEvent, LabelsResolvedEvent
+        self.register_roles(set(self._roles.values()))
+        for collab in self._collaborations.values():
+            if collab._is_decided is None:
+                collab.reindex_voters()
+        for collab, policy, timestamp in self._pending_deadlines:
+            self._deadlines.schedule(agent, DeadlineEvent(collab, policy, timestamp))
+        for collab, policy in self._pending_decisions:
+            self.post(agent, DecideEvent(collab, policy))
+        for collab_id in self.awaiting_labels():
+            # The resolution was lost with the previous process, matching goes on with the labels known so far
+            collab = self._collaborations.get(collab_id)
+            labels = set(collab.scope.element.labels) if collab is not None else set()
+            agent.receive_event(LabelsResolvedEvent(collab_id, labels))
+        del self._pending_decisions
+        del self._pending_deadlines
 
     @property
     def individuals(self):
         return self._individuals
 
+    @property
+    def journal_position(self):
+        return self._journal_position
+
+    @journal_position.setter
+    def journal_position(self, position: tuple[int, int]):
+        self._journal_position = position
+
     @property
     def collaborations(self):
         return self._collaborations
@@ -63,23 +161,184 @@ class Interaction:
     def decisions(self):
         return self._decisions
 
+    @property
+    def eligibility(self):
+        return self._eligibility
+
+    @property
+    def deadlines(self):
+        return self._deadlines
+
+    def close(self):
+        self._deadlines.close()
+
+    def post(self, agent: Agent, event):
+        with self._lock:
+            self._pending_events.setdefault(event.collab._id, []).append(event)
+        agent.receive_event(event)
+
+    def delivered(self, event):
+        with self._lock:
+            pending = self._pending_events.get(event.collab._id)
+            if pending is not None:
+                if event in pending:
+                    pending.remove(event)
+                if len(pending) == 0:
+                    del self._pending_events[event.collab._id]
+
+    def pending_events(self, collab_id: int) -> list:
+        with self._lock:
+            return list(self._pending_events.get(collab_id, []))
+
+    def drop_pending_events(self, collab_id: int, queue) -> int:
+        # The collaboration is decided, what is still queued for it would only re-decide it
+        with self._lock:
+            stale = self._pending_events.pop(collab_id, [])
+        dropped = 0
+        for event in stale if queue is not None else []:
+            try:
+                queue.remove(event)
+                dropped += 1
+            except ValueError:
+                pass
+        return dropped + self._deadlines.cancel(collab_id)
+
+    def find_collaboration(self, collab_id: int, model=None) -> 'Collaboration | None':
+        # Late events of archived collaborations load them back, without keeping them in the Interaction
+        collab = self._collaborations.get(collab_id)
+        if collab is None and self._archive is not None:
+            loaded = self._archive.load(collab_id, self, model)
+            collab = loaded[0] if loaded is not None else None
+        return collab
+
+    def decision_for(self, policy_name: str, model=None) -> 'Decision | None':
+        for decision in self._decisions:
+            if decision._rule.name == policy_name:
+                return decision
+        if self._archive is not None:
+            collab_id = self._archive.latest_decision_of(policy_name)
+            loaded = self._archive.load(collab_id, self, model) if collab_id is not None else None
+            for decision in loaded[1] if loaded is not None else []:
+                if decision._rule.name == policy_name:
+                    return decision
+        return None
+
+    def archive_decided(self, decided_before: float, model=None) -> int:
+        # Collaborations decided before the timestamp leave the Interaction for the archive
+        if self._archive is None:
+            return 0
+        with self._lock:
+            collabs = [collab for collab in self._collaborations.values()
+                       if collab._is_decided is not None and collab._is_decided._timestamp < decided_before]
+            if len(collabs) == 0:
+                return 0
+            archived = {collab._id for collab in collabs}
+            decisions: dict[int, list[Decision]] = {collab_id: [] for collab_id in archived}
+            for decision in self._decisions:
+                if decision._decides._id in archived:
+                    decisions[decision._decides._id].append(decision)
+        stored = self._archive.store(collabs, decisions, model)
+        collabs = [collab for collab in collabs if collab._id in stored]
+        archived = stored
+        with self._lock:
+            scopes = {id(collab.scope) for collab in collabs}
+            stale_roles = [key for key in self._role_records if id(key[2]) in scopes]
+            stale_records = {self._role_records.pop(key) for key in stale_roles}
+            voters: set[DynamicIndividual] = set()
+            for collab in collabs:
+                del self._collaborations[collab._id]
+                self._decisions.difference_update(decisions[collab._id])
+                collab._proposed_by.proposes.discard(collab)
+                collab._leader.leads.discard(collab)
+                for box in collab.ballot_boxes.values():
+                    for vote in box:
+                        vote.voted_by.votes.discard(vote)
+                        voters.add(vote.voted_by)
+            for voter in voters:
+                voter._enacted_roles = {record for record in voter.enacted_roles if record not in stale_records}
+            for key, ids in list(self._commits.items()):
+                ids.difference_update(archived)
+                if len(ids) == 0:
+                    del self._commits[key]
+        return len(collabs)
+
     def register_individuals(self, individuals: set[Individual]):
         for individual in individuals:
-            self._individuals[individual.name] = DynamicIndividual(individual, self)
+            known = self._individuals.get(individual.name)
+            if known is None:
+                self._individuals[individual.name] = DynamicIndividual(individual, self)
+            else:
+                known.refresh(individual)
 
     def register_roles(self, roles: set[Role]):
         for role in roles:
             self._roles[role.name] = role
+        self._eligibility.invalidate()
+        self._eligibility.register_roles(roles)
+
+    def await_labels(self, collab_id: int):
+        with self._lock:
+            self._awaiting_labels[collab_id] = []
+
+    def is_awaiting_labels(self, collab_id: int) -> bool:
+        return collab_id in self._awaiting_labels
+
+    def awaiting_labels(self) -> list[int]:
+        with self._lock:
+            return list(self._awaiting_labels)
+
+    def defer(self, collab_id: int, event):
+        with self._lock:
+            self._awaiting_labels[collab_id].append(event)
+
+    def labels_resolved(self, collab_id: int) -> list:
+        with self._lock:
+            return self._awaiting_labels.pop(collab_id, [])
+
+    def track_head(self, collab: 'Collaboration', repository: str, sha: str):
+        with self._lock:
+            previous = collab.state.head_sha
+            if previous is not None:
+                ids = self._commits.get((repository, previous))
+                if ids is not None:
+                    ids.discard(collab._id)
+                    if len(ids) == 0:
+                        del self._commits[(repository, previous)]
+            collab.state.head_sha = sha
+            if sha is not None:
+                self._commits.setdefault((repository, sha), set()).add(collab._id)
+
+    def collaborations_at(self, repository: str, sha: str) -> list['Collaboration']:
+        with self._lock:
+            ids = list(self._commits.get((repository, sha), ()))
+        return [self._collaborations[id] for id in ids if id in self._collaborations]
+
+    def new_ballot_box(self):
+        return self._ballot_box_class()
+
+    def enact(self, individual: DynamicIndividual, role: Role, scope: Scope) -> hasRole:
+        # Every vote of an individual in a scope enacts the same role, the record is shared
+        key = (individual.name, role, scope)
+        record = self._role_records.get(key)
+        if record is None:
+            with self._lock:
+                record = self._role_records.get(key)
+                if record is None:
+                    record = hasRole(individual.name, role, individual, scope)
+                    self._role_records[key] = record
+        return record
 
     def get_or_create_dynamic_individual(self, id: str) -> DynamicIndividual:
-        if id not in self._individuals:
-            u = Individual(id)
-            self._individuals[id] = DynamicIndividual(u, self)
-        return self._individuals[id]
+        with self._lock:
+            if id not in self._individuals:
+                u = Individual(id)
+                self._individuals[id] = DynamicIndividual(u, self)
+            return self._individuals[id]
 
     def propose(self, individual: DynamicIndividual, id: int, scope: Scope, rationale: str, platform)-> 'Collaboration':
-        collab = Collaboration(self, id, scope, rationale, individual, platform)
-        self._collaborations[id] = collab
+        with self._lock:
+            collab = Collaboration(self, id, scope, rationale, individual, platform)
+            self._collaborations[id] = collab
         return collab
 
     def make_decision(self, collab: 'Collaboration', rule: SinglePolicy, agent: Agent) -> 'Decision':
@@ -95,12 +354,15 @@ class Interaction:
             if collab.scope.status == StatusEnum.ACCEPTED:
                 collab.scope.status = StatusEnum.PARTIAL
 
+            collab.ballot_boxes[rule].decided_by = decision
             for vote in collab.ballot_boxes[rule]:
                 vote._part_of = decision
-            self._decisions.add(decision)
+            with self._lock:
+                self._decisions.add(decision)
             if rule.parent is None:
                 collab._is_decided = decision
                 collab.scope.status = StatusEnum.COMPLETED
+                self._deadlines.cancel(collab._id)
             return decision
         return None
 
@@ -121,89 +383,98 @@ class Interaction:
         if decision._accepted:
             collab.scope.status = StatusEnum.PARTIAL
 
+        collab.ballot_boxes[rule].decided_by = decision
         for vote in collab.ballot_boxes[rule]:
             vote._part_of = decision
-        self._decisions.add(decision)
+        with self._lock:
+            self._decisions.add(decision)
         if rule.parent is None:
             collab._is_decided = decision
             collab.scope.status = StatusEnum.COMPLETED
+            self._deadlines.cancel(collab._id)
         return decision
 
 
 class Collaboration:
+    __slots__ = ("_interaction", "_id", "_scope", "_rationale", "_proposed_by", "_leader", "_is_decided",
+                 "_ballot_boxes", "_voter_index", "_platform", "_state")
+
     def __init__(self, interaction: Interaction, id: int, scope: Scope, rationale: str, creator: DynamicIndividual, platform):
         self._interaction: Interaction = interaction
         self._id: int = id
         self._scope: Scope = scope
-        self._rationale: str = rationale
+        self._rationale: str = intern_rationale(rationale)
         self._proposed_by: DynamicIndividual = creator
         self._leader: DynamicIndividual = creator
         self._is_decided: Decision = None
-        self._ballot_boxes: dict[Policy, set[Vote]] = dict()
+        self._ballot_boxes: dict[Policy, BallotBox] = dict()
+        # login or role name -> single policies of the ballot boxes it can vote in
+        self._voter_index: dict[tuple[str, str], dict[Policy, None]] = dict()
         self._platform = platform
+        self._state: CollaborationState = CollaborationState()
         creator.proposes.add(self)
         creator.leads.add(self)
 
+    def open_ballot_box(self, policy: Policy) -> 'BallotBox':
+        box = self._interaction.new_ballot_box()
+        self._ballot_boxes[policy] = box
+        if isinstance(policy, SinglePolicy):
+            self._index_voters(policy)
+        return box
+
+    def _index_voters(self, policy: SinglePolicy):
+        self._interaction.eligibility.track(policy)
+        for participant in policy.participants:
+            key = ("role", participant.name) if isinstance(participant, Role) else ("login", participant.name)
+            self._voter_index.setdefault(key, dict())[policy] = None
+
+    def reindex_voters(self):
+        self._voter_index = dict()
+        for policy in self._ballot_boxes:
+            if isinstance(policy, SinglePolicy):
+                self._index_voters(policy)
+
+    def policies_open_to(self, login: str) -> list[Policy]:
+        keys = [("login", login)] + [("role", role) for role in self._interaction.eligibility.memberships(login)]
+        candidates: set[Policy] = set()
+        for key in keys:
+            candidates.update(self._voter_index.get(key, ()))
+        return [policy for policy in self._ballot_boxes if policy in candidates]
+
     def vote(self, individual: DynamicIndividual, agreement: bool, rationale: str):
         vote = Vote(agreement, time.time(), rationale, individual)
-        decidable: set[Policy] = set()
-        for policy in self._ballot_boxes:
+        eligible: list[Policy] = []
+        for policy in self.policies_open_to(individual.name):
             if isinstance(policy, SinglePolicy):
-                valid_vote = False
-                roles = {part for part in policy.participants if isinstance(part, Role)}
-                individuals = {part for part in policy.participants if not isinstance(part, Role)}
-                the_indiv = None
-                for role in roles:
-                    for registered in role.individuals:
-                        if individual.name == registered.name:
-                            the_indiv = registered
-                            valid_vote = True
-                            if role.vote_value > vote._vote_value:
-                                vote._vote_value = role.vote_value
-                            individual.enacted_roles.add(hasRole(individual.name, role, individual, self.scope))
-                for part_indiv in individuals:
-                    if individual.name == part_indiv.name:
-                        the_indiv = part_indiv
-                        valid_vote = True
-                        if part_indiv.vote_value > vote._vote_value:
-                            vote._vote_value = part_indiv.vote_value
-                        role_assignement = part_indiv.role_assignement
-                        if role_assignement is not None:
-                            individual.enacted_roles.add(hasRole(individual.name, role_assignement.role, individual, self.scope))
-
-                if valid_vote:
-                    if isinstance(the_indiv, metamodel.Agent):
-                        vote._vote_value = (
-                                0.5 * the_indiv.confidence +
-                                0.3 * the_indiv.autonomy_level +
-                                0.2 * the_indiv.explainability
-                        )
-
-                    box: set[Vote] = self._ballot_boxes[policy]
-                    add_vote = False
-                    if len(box) > 0:
-                        prev_vote = next(iter(box))
-                        add_vote = prev_vote._part_of is None
-                    else:
-                        add_vote = True
-
-                    if add_vote:
-                        has_voted = False
-                        for existing_vote in box:
-                            if existing_vote.voted_by is individual:
-                                has_voted = True
-                                existing_vote._vote_value = vote._vote_value
-                                existing_vote._agreement = vote._agreement
-                                existing_vote._rationale = vote._rationale
-                                existing_vote._timestamp = vote._timestamp
-                        if not has_voted:
-                            box.add(vote)
-                            individual.votes.add(vote)
-
-                        # Can we decide
-                        isDecidable = isDecidablePolicy(self, policy)
-                        if isDecidable:
-                            decidable.add(policy)
+                eligibility = self._interaction.eligibility.electorate(policy).get(individual.name)
+                if eligibility is None:
+                    continue
+                if eligibility.vote_value > vote._vote_value:
+                    vote._vote_value = eligibility.vote_value
+                for role in eligibility.roles:
+                    individual.enacted_roles.add(self._interaction.enact(individual, role, self.scope))
+                if eligibility.agent is not None:
+                    vote._vote_value = eligibility.agent_vote_value
+                eligible.append(policy)
+
+        # Each box counts its own copy of the vote, so updating one box never skews the tallies of another
+        decidable: set[Policy] = set()
+        for policy in eligible:
+            box: BallotBox = self._ballot_boxes[policy]
+            if box.decided_by is None:
+                existing_vote = box.get(individual.name)
+                if existing_vote is not None:
+                    box.update(existing_vote, vote._agreement, vote._vote_value, vote._rationale, vote._timestamp)
+                else:
+                    box_vote = Vote(vote._agreement, vote._timestamp, vote._rationale, individual)
+                    box_vote._vote_value = vote._vote_value
+                    box.add(box_vote)
+                    individual.votes.add(box_vote)
+
+                # Can we decide
+                isDecidable = isDecidablePolicy(self, policy)
+                if isDecidable:
+                    decidable.add(policy)
         return decidable
 
 
@@ -225,11 +496,17 @@ class Collaboration:
     def ballot_boxes(self):
         return self._ballot_boxes
 
+    @property
+    def state(self):
+        return self._state
+
 class Vote:
+    __slots__ = ("_agreement", "_timestamp", "_rationale", "_voted_by", "_part_of", "_vote_value")
+
     def __init__(self, agreement: bool, timestamp: float, rationale: str, voted_by: DynamicIndividual):
         self._agreement: bool = agreement
         self._timestamp: float = timestamp
-        self._rationale: str = rationale
+        self._rationale: str = intern_rationale(rationale)
         self._voted_by: DynamicIndividual = voted_by
         self._part_of: Decision = None
         self._vote_value: float = 0.0
@@ -238,13 +515,123 @@ class Vote:
     def voted_by(self):
         return self._voted_by
 
+class BallotBox:
+    # Votes of one policy keyed by voter login in casting order, with running tallies.
+    # Weights are summed exactly so removals never drift.
+    __slots__ = ("_votes", "_decided_by", "_agree_weight", "_against_weight", "_agree_count")
+
+    def __init__(self, votes=()):
+        self._votes: dict[str, Vote] = dict()
+        self._decided_by: Decision | None = None
+        self._agree_weight: Fraction = Fraction(0)
+        self._against_weight: Fraction = Fraction(0)
+        self._agree_count: int = 0
+        for vote in votes:
+            self.add(vote)
+
+    def _count(self, vote: Vote, sign: int):
+        weight = Fraction(vote._vote_value)
+        if vote._agreement:
+            self._agree_weight += sign * weight
+            self._agree_count += sign
+        else:
+            self._against_weight += sign * weight
+
+    def get(self, login: str) -> Vote | None:
+        return self._votes.get(login)
+
+    def add(self, vote: Vote):
+        # A voter has a single vote per box, a new one replaces the previous
+        login = vote.voted_by.name
+        previous = self._votes.get(login)
+        if previous is vote:
+            return
+        if previous is not None:
+            self._count(previous, -1)
+        self._votes[login] = vote
+        self._count(vote, 1)
+
+    def remove(self, vote: Vote):
+        if vote not in self:
+            raise KeyError(vote)
+        del self._votes[vote.voted_by.name]
+        self._count(vote, -1)
+
+    def discard(self, vote: Vote):
+        if vote in self:
+            self.remove(vote)
+
+    def update(self, vote: Vote, agreement: bool, vote_value: float, rationale: str, timestamp: float):
+        self._count(vote, -1)
+        vote._agreement = agreement
+        vote._vote_value = vote_value
+        vote._rationale = intern_rationale(rationale)
+        vote._timestamp = timestamp
+        self._count(vote, 1)
+
+    def union(self, other: 'BallotBox') -> 'BallotBox':
+        merged = BallotBox(self)
+        for vote in other:
+            merged.add(vote)
+        return merged
+
+    @property
+    def decided_by(self) -> 'Decision | None':
+        return self._decided_by
+
+    @decided_by.setter
+    def decided_by(self, decision: 'Decision'):
+        self._decided_by = decision
+
+    def voted_by_any(self, logins, agreement: bool | None = None) -> bool:
+        for login in logins:
+            vote = self._votes.get(login)
+            if vote is not None and (agreement is None or vote._agreement == agreement):
+                return True
+        return False
+
+    def __iter__(self):
+        return iter(self._votes.values())
+
+    def __len__(self):
+        return len(self._votes)
+
+    def __contains__(self, vote):
+        return self._votes.get(vote.voted_by.name) is vote
+
+    @property
+    def agree_weight(self) -> float:
+        return float(self._agree_weight)
+
+    @property
+    def against_weight(self) -> float:
+        return float(self._against_weight)
+
+    @property
+    def total_weight(self) -> float:
+        return float(self._agree_weight + self._against_weight)
+
+    @property
+    def agree_count(self) -> int:
+        return self._agree_count
+
+    @property
+    def against_count(self) -> int:
+        return len(self._votes) - self._agree_count
+
+    @property
+    def voter_count(self) -> int:
+        return len(self._votes)
+
 class Decision:
-    def __init__(self, interaction: Interaction, accepted: bool, timestamp: float, collab: Collaboration, votes: set[Vote], rule: Policy):
+    __slots__ = ("_interaction", "_accepted", "_timestamp", "_decides", "_votes", "_rule")
+
+    def __init__(self, interaction: Interaction, accepted: bool, timestamp: float, collab: Collaboration, votes: BallotBox, rule: Policy):
         self._interaction: Interaction = interaction
         self._accepted: bool = accepted
         self._timestamp: float = timestamp
         self._decides: Collaboration = collab
-        self._votes: set[Vote] = votes
+        self._votes: BallotBox = votes
         self._rule: Policy = rule
 
 
@@ -0,0 +1,87 @@
+import os
+import queue
+import threading
+import traceback
+
+from besser.agent.core.session import Session
+from besser.agent.exceptions.logger import logger
+
+
+def engine_shards() -> int:
+    return int(os.environ.get("ENGINE_SHARDS", 1))
+
+
+class EventSession:
+    # What a state body sees when it runs on a shard : the event it was dispatched for,
+    # everything else is read from the agent session
+    def __init__(self, session: Session, event):
+        self._session = session
+        self._event = event
+
+    @property
+    def event(self):
+        return self._event
+
+    @property
+    def events(self):
+        # The pending queue belongs to the FSM thread, shards never edit it
+        return None
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class ShardedExecutor:
+    # One worker thread per shard, work is routed by collaboration id so that the events of a
+    # collaboration keep their order while independent collaborations are processed in parallel
+    def __init__(self, shards: int):
+        self._queues: list[queue.Queue] = [queue.Queue() for _ in range(shards)]
+        self._threads: list[threading.Thread] = []
+        for index, work_queue in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(work_queue,), name=f"engine-shard-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def shards(self) -> int:
+        return len(self._queues)
+
+    def backlog(self) -> list[int]:
+        return [work_queue.qsize() for work_queue in self._queues]
+
+    def shard_of(self, key) -> int:
+        return hash(key) % len(self._queues)
+
+    def submit(self, key, function, *args):
+        self._queues[self.shard_of(key)].put((function, args))
+
+    def barrier(self):
+        # Waits until every shard processed what was submitted before, used before touching shared state
+        done = [threading.Event() for _ in self._queues]
+        for work_queue, event in zip(self._queues, done):
+            work_queue.put((event.set, ()))
+        for event in done:
+            event.wait()
+
+    def sharded(self, body, key_of):
+        # Wraps a state body : the FSM thread only routes the event, the body runs on the shard
+        def sharded_body(session: Session):
+            event = session.event
+            self.submit(key_of(event), body, EventSession(session, event))
+        return sharded_body
+
+    def synchronized(self, body):
+        def synchronized_body(session: Session):
+            self.barrier()
+            body(session)
+        return synchronized_body
+
+    @staticmethod
+    def _run(work_queue: queue.Queue):
+        while True:
+            function, args = work_queue.get()
+            try:
+                function(*args)
+            except Exception as e:
+                logger.error(f"Error in engine shard {threading.current_thread().name}: {e}")
+                logger.error(traceback.format_exc())
@@ -0,0 +1,164 @@
+import atexit
+import os
+import pickle
+import threading
+import time
+
+from besser.agent.core.session import Session
+from besser.agent.exceptions.logger import logger
+
+from governance.engine.events import SnapshotEvent
+from governance.engine.semantics.helpers import get_all_individuals, get_all_roles
+from governance.engine.semantics.policy_diff import index_policy_paths
+from governance.engine.semantics.runtime_metamodel import Interaction
+
+
+def snapshot_path() -> str | None:
+    return os.environ.get("ENGINE_SNAPSHOT_PATH") or None
+
+def snapshot_interval() -> float:
+    return float(os.environ.get("ENGINE_SNAPSHOT_INTERVAL", 300))
+
+def model_references(model, platform=None) -> dict[tuple, object]:
+    # Objects of the loaded policies are not written in a snapshot, only their stable key
+    objects: dict[tuple, object] = dict()
+    for path, policy in index_policy_paths(model).items():
+        objects[("policy",) + path] = policy
+    for policy in model:
+        for role in get_all_roles(policy):
+            objects[("role", role.name)] = role
+        for individual in get_all_individuals(policy):
+            objects[("individual", individual.name)] = individual
+    if platform is not None:
+        objects[("platform",)] = platform
+    return objects
+
+
+class SnapshotPickler(pickle.Pickler):
+    def __init__(self, file, references: dict[tuple, object]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._keys: dict[int, tuple] = {id(obj): key for key, obj in references.items()}
+
+    def persistent_id(self, obj):
+        return self._keys.get(id(obj))
+
+
+class SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, references: dict[tuple, object]):
+        super().__init__(file)
+        self._references = references
+
+    def persistent_load(self, key):
+        obj = self._references.get(key)
+        if obj is None:
+            raise pickle.UnpicklingError(f"{key} is not part of the loaded policies")
+        return obj
+
+
+def save_snapshot(interaction: Interaction, model, path: str, platform=None) -> int:
+    temporary = path + ".tmp"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(temporary, "wb") as file:
+        SnapshotPickler(file, model_references(model, platform)).dump(interaction)
+        file.flush()
+        os.fsync(file.fileno())
+        size = file.tell()
+    os.replace(temporary, path)
+    return size
+
+def load_snapshot(model, path: str, platform=None) -> Interaction:
+    with open(path, "rb") as file:
+        return SnapshotUnpickler(file, model_references(model, platform)).load()
+
+
+class Snapshotter:
+    # Saves the runtime state (Interaction) every interval and at exit, and restores it once the policies are loaded.
+    # Periodic snapshots go through a SnapshotEvent so that they are taken by the agent, between two events.
+    def __init__(self, path: str, interval: float = 300.0, platform=None, journal=None):
+        self._path: str = path
+        self._journal = journal
+        self._interval: float = interval
+        self._platform = platform
+        self._session: Session | None = None
+        self._restored: bool = False
+        self._lock = threading.Lock()
+        self._timer: threading.Thread | None = None
+        self._closed = threading.Event()
+        atexit.register(self.close)
+
+    @property
+    def path(self):
+        return self._path
+
+    def restoring(self, body):
+        # Wraps the bodies installing the policies (init with a base policy, update_policy_body),
+        # the snapshot is restored after the first model
+        def restoring_body(session: Session):
+            body(session)
+            if not self._restored and session.get("policies") is not None:
+                self._restored = True
+                self.restore(session)
+        return restoring_body
+
+    def restore(self, session: Session) -> bool:
+        self._session = session
+        if not os.path.isfile(self._path):
+            return False
+        start = time.perf_counter()
+        try:
+            interaction = load_snapshot(session.get("policies"), self._path, self._platform)
+        except Exception as e:
+            logger.warning(f"Snapshot {self._path} could not be restored, starting empty: {e}")
+            return False
+        model = session.get("policies")
+        individuals = set()
+        roles = set()
+        for policy in model:
+            individuals = individuals.union(get_all_individuals(policy))
+            roles = roles.union(get_all_roles(policy))
+        # Members added to the policies since the snapshot
+        interaction.register_individuals(individuals)
+        interaction.register_roles(roles)
+        session.get("interactions").close()
+        session.set("interactions", interaction)
+        interaction.resume(session._agent)
+        logger.info(f"Restored {len(interaction.collaborations)} collaborations from {self._path} "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def save(self, session: Session = None):
+        session = session if session is not None else self._session
+        # Never overwrite a snapshot that was not restored yet
+        if not self._restored or session is None or session.get("policies") is None:
+            return
+        self._session = session
+        with self._lock:
+            start = time.perf_counter()
+            if self._journal is not None:
+                # Replay will start after what this snapshot contains
+                session.get("interactions").journal_position = self._journal.compact(session.get("interactions"))
+            size = save_snapshot(session.get("interactions"), session.get("policies"), self._path, self._platform)
+        logger.info(f"Snapshot of {len(session.get('interactions').collaborations)} collaborations "
+                    f"({size} bytes) saved in {time.perf_counter() - start:.2f}s")
+
+    def snapshot_body(self, session: Session):
+        self.save(session)
+
+    def start(self, agent):
+        def run():
+            while not self._closed.wait(self._interval):
+                agent.receive_event(SnapshotEvent())
+        self._timer = threading.Thread(target=run, name="snapshotter", daemon=True)
+        self._timer.start()
+
+    def close(self):
+        # Last snapshot on shutdown
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        try:
+            self.save()
+        except Exception as e:
+            logger.error(f"Could not save the snapshot {self._path}: {e}")
@@ -9,11 +9,17 @@ from besser.agent.exceptions.logger import logger
 from besser.agent.library.transition.events.gitlab_webhooks_events import GitLabEvent
 from gidgethub.aiohttp import GitHubAPI
 
-from governance.engine.parsing import parse_text
+from governance.engine.label_resolver import LabelResolver
+from governance.engine.response_cache import response_cache
+from governance.engine.sharding import EventSession
 from governance.engine.semantics.actions import resolve_action, close_PR, close_issue
+from governance.engine.semantics.collaboration_state import apply_status_webhook, apply_check_suite_webhook, \
+    apply_synchronize_webhook
+from governance.engine.semantics.policy_diff import migrate_interaction
+from governance.engine.semantics.policy_index import PolicyIndex
 from governance.engine.semantics.runtime_metamodel import Interaction
 from governance.engine.events import DeadlineEvent, VoteEvent, CollaborationProposalEvent, UserRegistrationEvent, \
-    UpdatePolicyEvent, DecideEvent
+    UpdatePolicyEvent, DecideEvent, LabelsResolvedEvent, LabelEvent
 from governance.engine.semantics.helpers import find_policies_in, find_starting_policies_in, start_policies, \
     find_policy_for, get_all_individuals, get_all_roles, get_reaction_for
 from governance.engine.testing.helpers import start_testing_policies, start_playground_policies
@@ -21,8 +27,16 @@ from metamodel import ComposedPolicy, Individual, BooleanDecision
 from utils.chp_extension import Patch, PullRequest, PatchAction, Issue
 
 
+def select_start_function():
+    if os.environ.get("ENGINE_PLAYGROUND") == "True":
+        return start_playground_policies
+    if os.environ.get("ENGINE_TESTING") == "True":
+        return start_testing_policies
+    return start_policies
+
 def init_body(session: Session):
     session.set("policies", None)
+    session.set("policy_index", None)
     session.set("interactions", Interaction())
 
 def read_policy_bodybuilder(agent):
@@ -33,6 +47,7 @@ def read_policy_bodybuilder(agent):
     return read_policy_body
 
 def update_policy_body(session: Session):
+    from governance.engine.parsing import parse_text
     update_event: UpdatePolicyEvent = session.event
     model = parse_text(update_event.text)
     interact = session.get("interactions")
@@ -46,17 +61,34 @@ def update_policy_body(session: Session):
     interact.register_individuals(individuals)
     interact.register_roles(roles)
 
+    old_model = session.get("policies")
+    policy_index = PolicyIndex(model)
     session.set("policies", model)
+    session.set("policy_index", policy_index)
+    if old_model is not None and old_model is not model:
+        # Keep the open collaborations running on the new version of the policies
+        migrate_interaction(session._agent, interact, old_model, model, select_start_function(), session.events,
+                            policy_index)
 
 def gh_webhooks_bodybuilder(agent, platform):
     def gh_webhooks_body(session: Session):
         event: GitHubEvent = session.event
-        if event.action == "assigned":
+        if event.payload is not None:
+            response_cache.invalidate_for_webhook(event.name, event.payload)
+        if event.name == "status":
+            apply_status_webhook(session.get("interactions"), event.payload)
+        elif event.name.startswith("check_suite"):
+            apply_check_suite_webhook(session.get("interactions"), event.payload)
+        elif event.action == "synchronize":
+            apply_synchronize_webhook(session.get("interactions"), event.payload)
+        elif event.action == "assigned":
             agent.receive_event(UserRegistrationEvent.from_github_event(event))
         elif event.action == "opened":
             agent.receive_event(CollaborationProposalEvent.from_github_event(event,platform))
         elif event.action == "submitted":
             agent.receive_event(VoteEvent.from_github_event(event))
+        elif event.action == "labeled" or event.action == "unlabeled":
+            agent.receive_event(LabelEvent.from_github_event(event))
         elif event.action == "update":
             agent.receive_event(UpdatePolicyEvent(event.payload["file_content"]))
     return gh_webhooks_body
@@ -81,66 +113,125 @@ def individual_body(session: Session):
     # for role in individual_event.roles:
     #     if policy_roles[role.lower()]:
     #         effective_roles.add(policy_roles[role.lower()])
-    session.get("interactions").get_or_create_dynamic_individual(individual_event.login, effective_roles)
+    session.get("interactions").get_or_create_dynamic_individual(individual_event.login)
+
+def match_collaboration(agent, session: Session, collab, start_function):
+    applicable_policy, starting_policies = find_policy_for(session.get("policies"), collab,
+                                                           session.get("policy_index"))
+
+    if applicable_policy is not None:
+        starting_policies = find_starting_policies_in(applicable_policy, collab)
+        start_function(agent, starting_policies, collab)
 
 def collab_bodybuilder(agent):
-    start_function = start_policies
-    if os.environ.get("ENGINE_TESTING") == "True":
-        start_function = start_testing_policies
-    if os.environ.get("ENGINE_PLAYGROUND") == "True":
-        start_function = start_playground_policies
+    start_function = select_start_function()
+    label_resolver = LabelResolver(agent)
     def collab_body(session: Session):
         collab_event: CollaborationProposalEvent = session.event
-        creator = session.get("interactions").get_or_create_dynamic_individual(collab_event.creator)
-        collab = session.get("interactions").propose(creator,
-                                      collab_event.id,
-                                      collab_event.scope,
-                                      collab_event.rationale,
-                                      collab_event._platform)
-
-        applicable_policy, starting_policies = find_policy_for(session.get("policies"), collab)
-
-        if applicable_policy is not None:
-            starting_policies = find_starting_policies_in(applicable_policy, collab)
-            start_function(agent, starting_policies, collab)
+        interact = session.get("interactions")
+        creator = interact.get_or_create_dynamic_individual(collab_event.creator)
+        collab = interact.propose(creator,
+                                  collab_event.id,
+                                  collab_event.scope,
+                                  collab_event.rationale,
+                                  collab_event._platform)
+
+        head_sha = (collab_event._PR_payload or {}).get("head", {}).get("sha")
+        if head_sha is not None:
+            interact.track_head(collab, collab_event.repo_id, head_sha)
+
+        if collab_event.repo_id is not None and collab_event.number is not None:
+            # Policies can depend on labels, matching waits for them (see labels_bodybuilder)
+            interact.await_labels(collab._id)
+            if not getattr(collab_event._platform, "replaying", False):
+                # When replayed, the journal has the resolved labels too
+                label_resolver.resolve(collab._id, collab_event.repo_id, collab_event.number, collab_event._platform)
+        else:
+            match_collaboration(agent, session, collab, start_function)
     return collab_body
 
+def labels_bodybuilder(agent):
+    start_function = select_start_function()
+    def labels_body(session: Session):
+        labels_event: LabelsResolvedEvent = session.event
+        interact = session.get("interactions")
+        collab = interact.collaborations.get(labels_event.collab_id)
+        if collab is None or not interact.is_awaiting_labels(collab._id):
+            return
+        collab.scope.element.labels.update(labels_event.labels)
+        collab.state.labels_known = True
+        deferred = interact.labels_resolved(collab._id)
+        match_collaboration(agent, session, collab, start_function)
+        # Votes cast while the labels were fetched, in their order and before anything queued since
+        for event in deferred:
+            vote_body(EventSession(session, event))
+    return labels_body
+
+def label_body(session: Session):
+    label_event: LabelEvent = session.event
+    collab = session.get("interactions").collaborations.get(label_event.collab_id)
+    if collab is None or collab.scope is None:
+        return
+    if label_event.added:
+        collab.scope.element.labels.add(label_event.label)
+    else:
+        collab.scope.element.labels.discard(label_event.label)
+
 
 def vote_body(session: Session):
     vote: VoteEvent = session.event
+    if session.get("interactions").is_awaiting_labels(vote.pull_request_id):
+        session.get("interactions").defer(vote.pull_request_id, vote)
+        return
     individual = session.get("interactions").get_or_create_dynamic_individual(vote.user_login)
-    collaboration = session.get("interactions").collaborations[vote.pull_request_id] or None
+    collaboration = session.get("interactions").find_collaboration(vote.pull_request_id, session.get("policies"))
     if collaboration is not None:
         decidables = collaboration.vote(individual, vote.agreement, vote.rationale)
         for decidable in decidables:
-            session._agent.receive_event(DecideEvent(collaboration, decidable))
+            session.get("interactions").post(session._agent, DecideEvent(collaboration, decidable))
+
+def is_stale(collab, policy) -> bool:
+    # Events of a decided collaboration or of an already decided phase are not processed
+    if collab._is_decided is not None:
+        return True
+    box = collab.ballot_boxes.get(policy)
+    return box is not None and box.decided_by is not None
 
 def deadline_body(session: Session):
     deadline_event: DeadlineEvent = session.event
+    if is_stale(deadline_event.collab, deadline_event.policy):
+        return
     if not isinstance(deadline_event.policy.decision_type, BooleanDecision) or \
             (isinstance(deadline_event.policy.scope, Patch) and isinstance(deadline_event.policy.scope.element, Issue)):
         pass
-        get_reaction_for(session._agent, deadline_event.collab)
-    session._agent.receive_event(DecideEvent(deadline_event._collab, deadline_event._policy))
+        if not getattr(deadline_event.collab._platform, "replaying", False):
+            # Replayed deadlines find the reaction votes in the journal
+            get_reaction_for(session._agent, deadline_event.collab)
+    session.get("interactions").post(session._agent, DecideEvent(deadline_event._collab, deadline_event._policy))
 
 def decide_bodybuilder(agent):
-    start_function = start_policies
-    if os.environ.get("ENGINE_TESTING") == "True":
-        start_function = start_testing_policies
-    if os.environ.get("ENGINE_PLAYGROUND") == "True":
-        start_function = start_playground_policies
+    start_function = select_start_function()
     def decide_body(session: Session):
         decide_event: DecideEvent = session.event
-        result = session.get("interactions").make_decision(decide_event.collab, decide_event.policy, agent)
+        interact = session.get("interactions")
+        interact.delivered(decide_event)
+        if is_stale(decide_event.collab, decide_event.policy):
+            return
+        result = interact.make_decision(decide_event.collab, decide_event.policy, agent)
+        if result is None:
+            return
 
         parent: ComposedPolicy = decide_event.policy.parent
         while parent is not None:
             known_result = result._accepted if parent.require_all != result._accepted else None
-            result = session.get("interactions").compose_decision(decide_event.collab, parent, known_result)
+            result = interact.compose_decision(decide_event.collab, parent, known_result)
             if result is None:
                 break
             parent = parent.parent
 
+        if decide_event.collab._is_decided is not None:
+            interact.drop_pending_events(decide_event.collab._id, session.events)
+
         if result is None:
             to_start = find_policies_in(parent, decide_event.collab)
             start_function(agent, to_start, decide_event.collab)
@@ -3,12 +3,16 @@ import json
 from besser.agent.core.session import Session
 from besser.agent.library.transition.events.github_webhooks_events import GitHubEvent
 
+from governance.engine.archive import collaboration_archive
 from governance.engine.semantics.runtime_metamodel import Interaction, Decision, Vote
 from governance.engine.testing.platform_mock import PlatformMock
 
 
 def clear_body(session: Session):
     session.events.clear()
+    session.get("interactions").close()
+    if collaboration_archive() is not None:
+        collaboration_archive().clear()
     session.set("interactions", Interaction())
     session.delete("test_result_path")
 
@@ -17,11 +21,7 @@ def result_body(session: Session):
     policy_name = event.payload["name"]
 
     interactions: Interaction = session.get("interactions")
-    result: Decision = None
-    for decision in interactions.decisions:
-        if decision._rule.name == policy_name:
-            result = decision
-            break
+    result: Decision = interactions.decision_for(policy_name, session.get("policies"))
 
     def get_login(vote: Vote):
         return vote.voted_by.name
@@ -46,7 +46,7 @@ def mock_bodybuilder(platform: PlatformMock):
         platform.payload = platform.payload | event.payload
     return mock_body
 
-def add_testing_hooks(agent, idle, platform: PlatformMock):
+def add_testing_hooks(agent, idle, platform: PlatformMock, executor=None):
     # STATES
     clear = agent.new_state('clear')
     result = agent.new_state('result')
@@ -58,8 +58,8 @@ def add_testing_hooks(agent, idle, platform: PlatformMock):
     link_event = GitHubEvent("link", "link", None)
     mock_event = GitHubEvent("mock", "mock", None)
     # BODIES
-    clear.set_body(clear_body)
-    result.set_body(result_body)
+    clear.set_body(clear_body if executor is None else executor.synchronized(clear_body))
+    result.set_body(result_body if executor is None else executor.synchronized(result_body))
     link.set_body(link_body)
     mock.set_body(mock_bodybuilder(platform))
     # TRANSITIONS
@@ -0,0 +1,46 @@
+import argparse
+import re
+import time
+from types import SimpleNamespace
+
+from governance.engine.semantics.helpers import serialize_individuals, update_individuals
+from metamodel import Individual
+
+
+def synthetic_governance(members: int) -> tuple[str, list[Individual], list]:
+    individuals = [Individual(f"member{i}") for i in range(members)]
+    maintainers = SimpleNamespace(name="Maintainer", individuals=set(individuals[::10]))
+    contributors = SimpleNamespace(name="Contributor", individuals=set(individuals))
+    declarations = "\n".join(f"    member{i} {{ vote value : 1.0 }}" for i in range(members))
+    return f"Project Synthetic {{\n  Participants :\n{declarations}\n}}\n", individuals, [maintainers, contributors]
+
+def sequential_update(text: str, indivs: list[Individual], roles) -> str:
+    # Previous implementation : roles scanned and the whole text rewritten once per individual
+    for indiv in indivs:
+        block = serialize_individuals([indiv], roles)[indiv.name]
+        regex = re.compile(rf"(\(Agent\)\s*)?{indiv.name}\s*({{[^}}]*}})?")
+        text = re.sub(regex, lambda match: block, text, count=1)
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewriting role changes in a large governance file")
+    parser.add_argument("--members", type=int, default=10_000)
+    parser.add_argument("--changes", type=int, default=500)
+    args = parser.parse_args()
+
+    text, individuals, roles = synthetic_governance(args.members)
+    changed = individuals[::max(1, args.members // args.changes)][:args.changes]
+
+    start = time.perf_counter()
+    sequential_update(text, changed, roles)
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    update_individuals(text, serialize_individuals(changed, roles))
+    after = time.perf_counter() - start
+    print(f"{len(changed)} changes over {args.members} members : {before * 1000:8.1f} ms before, "
+          f"{after * 1000:8.1f} ms after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from governance.engine.semantics.runtime_metamodel import Interaction, Collaboration, Vote, BallotBox
+
+# Same classes with a __dict__ again, i.e. the layout before __slots__
+DictVote = type("DictVote", (Vote,), {})
+DictBallotBox = type("DictBallotBox", (BallotBox,), {})
+DictCollaboration = type("DictCollaboration", (Collaboration,), {})
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+def payload_text(i: int) -> str:
+    # Webhook payloads hand over a fresh string for every event
+    return "".join(["LGTM", "!" * (i % 3)])
+
+def build_votes(vote_class, interaction: Interaction, count: int, interned: bool):
+    voters = [interaction.get_or_create_dynamic_individual(f"user{i}") for i in range(100)]
+    votes = []
+    for i in range(count):
+        rationale = payload_text(i)
+        vote = vote_class(i % 3 != 0, time.time(), rationale, voters[i % 100])
+        if not interned:
+            vote._rationale = rationale
+        vote._vote_value = 1.0
+        votes.append(vote)
+    return votes
+
+def build_collaborations(collab_class, box_class, interaction: Interaction, count: int, interned: bool):
+    creator = interaction.get_or_create_dynamic_individual("creator")
+    collabs = []
+    for i in range(count):
+        rationale = payload_text(i)
+        collab = collab_class(interaction, i, None, rationale, creator, None)
+        if not interned:
+            collab._rationale = rationale
+        collab.ballot_boxes["policy"] = box_class()
+        collabs.append(collab)
+    return collabs
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per vote and per collaboration of the runtime model")
+    parser.add_argument("--votes", type=int, default=100_000)
+    parser.add_argument("--collaborations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    interaction = Interaction()
+    before = measure(lambda: build_votes(DictVote, interaction, args.votes, False))
+    after = measure(lambda: build_votes(Vote, interaction, args.votes, True))
+    print(f"vote          : {before / args.votes:8.1f} B before, {after / args.votes:8.1f} B after")
+
+    interaction = Interaction()
+    before = measure(lambda: build_collaborations(DictCollaboration, DictBallotBox, interaction,
+                                                  args.collaborations, False))
+    interaction = Interaction()
+    after = measure(lambda: build_collaborations(Collaboration, BallotBox, interaction, args.collaborations, True))
+    print(f"collaboration : {before / args.collaborations:8.1f} B before, "
+          f"{after / args.collaborations:8.1f} B after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import io
+import time
+from types import SimpleNamespace
+
+from governance.engine.snapshot import SnapshotPickler, SnapshotUnpickler
+from governance.engine.semantics.runtime_metamodel import Interaction, Vote
+
+
+class Named:
+    # Stand-in for the policies and platforms of a loaded model, hashed by identity like them
+    def __init__(self, name: str):
+        self.name = name
+
+
+def build_interaction(collaborations: int, votes: int) -> tuple[Interaction, dict]:
+    interaction = Interaction()
+    policy = Named("TestPolicy")
+    platform = Named("platform")
+    voters = [interaction.get_or_create_dynamic_individual(f"user{i}") for i in range(1000)]
+    for i in range(collaborations):
+        scope = SimpleNamespace(name=f"Pull Request #{i}", labels={"lgtm"},
+                                payload={"number": i, "title": "Update dependencies", "body": ""})
+        collab = interaction.propose(voters[i % 1000], i, scope, "Update dependencies", platform)
+        box = interaction.new_ballot_box()
+        collab.ballot_boxes[policy] = box
+        for j in range(votes):
+            vote = Vote(j % 2 == 0, time.time(), "", voters[(i + j) % 1000])
+            vote._vote_value = 1.0
+            box.add(vote)
+    # Policies and platforms are referenced by key, as with model_references()
+    return interaction, {("policy", "TestPolicy"): policy, ("platform",): platform}
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot and restore time of the runtime state")
+    parser.add_argument("--collaborations", type=int, default=100_000)
+    parser.add_argument("--votes", type=int, default=3)
+    args = parser.parse_args()
+
+    interaction, references = build_interaction(args.collaborations, args.votes)
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    SnapshotPickler(buffer, references).dump(interaction)
+    saved = time.perf_counter() - start
+
+    buffer.seek(0)
+    start = time.perf_counter()
+    restored = SnapshotUnpickler(buffer, references).load()
+    loaded = time.perf_counter() - start
+    assert len(restored.collaborations) == args.collaborations
+    print(f"{args.collaborations} collaborations : {buffer.getbuffer().nbytes / 2**20:.1f} MiB, "
+          f"saved in {saved:.2f}s, restored in {loaded:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import time
+
+from governance.engine.archive import CollaborationArchive, configure_archive
+from governance.engine.semantics.runtime_metamodel import Decision
+from governance.tests.benchmarks.snapshot_benchmark import build_interaction
+
+
+def test_decided_collaborations_are_archived_and_loaded_back(tmp_path):
+    archive = CollaborationArchive(str(tmp_path / "archive.sqlite"), grace_period=60)
+    configure_archive(archive)
+    try:
+        interaction, references = build_interaction(20, 3)
+        policy = references[("policy", "TestPolicy")]
+        for collab in interaction.collaborations.values():
+            interaction.track_head(collab, "owner/repo", f"sha{collab._id % 3}")
+            for vote in collab.ballot_boxes[policy]:
+                vote.voted_by.votes.add(vote)
+        decided = list(interaction.collaborations.values())[:10]
+        for collab in decided:
+            box = collab.ballot_boxes[policy]
+            decision = Decision(interaction, True, time.time() - 3600, collab, box, policy)
+            box.decided_by = decision
+            collab._is_decided = decision
+            interaction.decisions.add(decision)
+        decided_votes = {vote for collab in decided for vote in collab.ballot_boxes[policy]}
+
+        assert interaction.archive_decided(time.time() - archive.grace_period) == 10
+        assert len(interaction.collaborations) == 10
+        assert len(interaction.decisions) == 0
+        for voter in interaction.individuals.values():
+            assert voter.proposes.isdisjoint(decided)
+            assert voter.votes.isdisjoint(decided_votes)
+        tracked = set().union(*interaction._commits.values())
+        assert tracked == set(interaction.collaborations)
+
+        archived = interaction.find_collaboration(3)
+        assert archived is not None and len(archived.ballot_boxes) == 1
+        voter = next(iter(next(iter(archived.ballot_boxes.values())))).voted_by
+        assert voter is interaction.individuals[voter.name]
+        assert interaction.decision_for("TestPolicy")._accepted
+    finally:
+        configure_archive(None)
+        archive.close()
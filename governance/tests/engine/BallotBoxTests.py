@@ -0,0 +1,65 @@
+from fractions import Fraction
+
+import pytest
+
+from governance.engine.semantics.columnar_ballot import ballot_box_class
+from governance.engine.semantics.runtime_metamodel import BallotBox, Vote, Interaction, Decision
+
+
+def make_vote(interaction, login, agreement, value=1.0):
+    voter = interaction.get_or_create_dynamic_individual(login)
+    vote = Vote(agreement, 0.0, "", voter)
+    vote._vote_value = value
+    return vote
+
+def test_new_vote_replaces_previous_one():
+    interaction = Interaction()
+    box = BallotBox()
+    box.add(make_vote(interaction, "gwendal", True))
+    box.add(make_vote(interaction, "adem", False))
+    box.add(make_vote(interaction, "gwendal", False, 2.0))
+    assert len(box) == 2
+    assert box.agree_count == 0
+    assert box.against_weight == 3.0
+    assert [vote.voted_by.name for vote in box] == ["gwendal", "adem"]
+
+def test_decided_by():
+    interaction = Interaction()
+    box = BallotBox()
+    assert box.decided_by is None
+    box.add(make_vote(interaction, "gwendal", True))
+    decision = Decision(interaction, True, 0.0, None, box, None)
+    box.decided_by = decision
+    assert box.get("gwendal")._agreement
+    assert box.decided_by is decision
+
+def test_columnar_backend_matches_object_backend():
+    pytest.importorskip("numpy")
+    interaction = Interaction()
+    boxes = [BallotBox(), ballot_box_class("columnar")()]
+    for box in boxes:
+        for i in range(50):
+            box.add(make_vote(interaction, f"user{i}", i % 3 != 0, 0.1 * (i % 7)))
+        box.remove(box.get("user4"))
+        existing = box.get("user5")
+        box.update(existing, True, 0.3, "", 1.0)
+    object_box, columnar_box = boxes
+    for tally in ("agree_weight", "against_weight", "total_weight", "agree_count", "against_count", "voter_count"):
+        assert getattr(object_box, tally) == getattr(columnar_box, tally)
+    assert [vote.voted_by.name for vote in object_box] == [vote.voted_by.name for vote in columnar_box]
+    for logins in ({"user3", "user9"}, {"user4", "unknown"}, {"user5"}):
+        for agreement in (True, False, None):
+            assert object_box.voted_by_any(logins, agreement) == columnar_box.voted_by_any(logins, agreement)
+
+def test_columnar_weights_follow_replacements_and_removals():
+    pytest.importorskip("numpy")
+    interaction = Interaction()
+    box = ballot_box_class("columnar")()
+    votes = [make_vote(interaction, f"user{i}", True, 0.1) for i in range(30)]
+    for vote in votes:
+        box.add(vote)
+    for vote in votes[:20]:
+        box.remove(vote)
+    box.add(make_vote(interaction, "user25", False, 0.2))
+    assert box.agree_weight == float(sum(Fraction(0.1) for _ in range(9)))
+    assert box.against_weight == 0.2 and box.voter_count == 10
@@ -0,0 +1,111 @@
+from governance.engine.semantics.collaboration_state import CollaborationState, SUCCESS, PENDING, FAILURE
+
+
+def test_ci_state_follows_webhooks():
+    state = CollaborationState()
+    state.head_sha = "abc"
+    assert state.ci_state is None
+    state.record_status("ci/build", "pending")
+    assert state.ci_state == PENDING
+    state.record_status("ci/build", "success")
+    state.record_check_suite("github-actions", "completed", "neutral")
+    assert state.ci_state == SUCCESS
+    state.record_check_suite("github-actions", "completed", "failure")
+    assert state.ci_state == FAILURE
+
+def test_new_head_resets_ci_state():
+    state = CollaborationState()
+    state.head_sha = "abc"
+    state.seed([{"context": "ci/build", "state": "success"}])
+    assert state.ci_state == SUCCESS
+    state.head_sha = "def"
+    assert state.ci_state == PENDING
+
+def test_reactions_are_voted_once():
+    from types import SimpleNamespace
+    from governance.engine.semantics.helpers import get_reaction_for, REACTIONS_PER_PAGE
+
+    reactions = [{"id": i, "content": "+1" if i % 3 else "heart", "user": {"login": f"user{i}"}} for i in range(1, 251)]
+
+    class Platform:
+        def getitem(self, url):
+            page = int(url.rsplit("page=", 1)[1])
+            return reactions[(page - 1) * REACTIONS_PER_PAGE:page * REACTIONS_PER_PAGE]
+
+    votes = []
+    agent = SimpleNamespace(receive_event=votes.append)
+    scope = SimpleNamespace(activity=SimpleNamespace(project=SimpleNamespace(repo_id="owner/repo")),
+                            element=SimpleNamespace(payload={"number": 1}))
+    collab = SimpleNamespace(_id=1, _platform=Platform(), scope=scope, state=CollaborationState())
+    get_reaction_for(agent, collab)
+    assert len(votes) == len([r for r in reactions if r["content"] == "+1"])
+    assert collab.state.reaction_page == 3
+    reactions.append({"id": 251, "content": "-1", "user": {"login": "late"}})
+    get_reaction_for(agent, collab)
+    assert votes[-1]._user_login == "late" and not votes[-1]._agreement
+    assert len(votes) == len([r for r in reactions if r["content"] != "heart"])
+
+def test_small_reaction_lists_cost_one_request():
+    from governance.engine.semantics.helpers import fetch_reaction_pages, REACTIONS_PER_PAGE
+
+    reactions = [{"id": i, "content": "+1", "user": {"login": f"user{i}"}} for i in range(1, 131)]
+    requested = []
+
+    class PooledPlatform:
+        def getitem(self, url):
+            return self.getitems([url])[0]
+
+        def getitems(self, urls):
+            requested.extend(urls)
+            pages = [int(url.rsplit("page=", 1)[1]) for url in urls]
+            return [reactions[(page - 1) * REACTIONS_PER_PAGE:page * REACTIONS_PER_PAGE] for page in pages]
+
+    url = "/repos/owner/repo/issues/1/reactions"
+    assert len(fetch_reaction_pages(PooledPlatform(), url, 2)) == 1
+    assert len(requested) == 1
+    # A full resume page is followed by a fan-out on the next pages
+    assert [len(page) for page in fetch_reaction_pages(PooledPlatform(), url, 1)] == [100, 30]
+    assert len(requested) == 2 + 4
+
+def test_status_webhook_reaches_the_collaboration():
+    import asyncio
+    import json
+    from types import SimpleNamespace
+    from governance.engine.delivery_cache import webhook_entrypoint
+    from governance.engine.semantics.runtime_metamodel import Interaction
+    from governance.engine.state_bodies import gh_webhooks_bodybuilder
+
+    interaction = Interaction()
+    author = interaction.get_or_create_dynamic_individual("author")
+    collab = interaction.propose(author, 7, SimpleNamespace(name="Pull Request #7"), "", None)
+    interaction.track_head(collab, "owner/repo", "6dcb09b5b57875f334f61aebed695e2e4193db5e")
+    collab.state.seed([{"context": "ci/build", "state": "pending"}])
+    received = []
+    agent = SimpleNamespace(receive_event=received.append)
+    entrypoint = webhook_entrypoint(SimpleNamespace(_agent=agent, _secret=None))
+    # Status payload as sent by GitHub, it has no action
+    payload = {"id": 6805126730, "sha": "6dcb09b5b57875f334f61aebed695e2e4193db5e", "name": "owner/repo",
+               "target_url": "https://ci.example.com/build/1", "context": "ci/build", "description": "Build passed",
+               "state": "success", "commit": {"sha": "6dcb09b5b57875f334f61aebed695e2e4193db5e"},
+               "branches": [], "repository": {"id": 1296269, "full_name": "owner/repo"},
+               "sender": {"login": "ci-bot"}}
+    headers = {"content-type": "application/json", "x-github-event": "status", "x-github-delivery": "f2b5e8a0"}
+
+    async def read():
+        return json.dumps(payload).encode()
+    asyncio.run(entrypoint(SimpleNamespace(headers=headers, read=read)))
+    assert [event.name for event in received] == ["status"]
+    session = SimpleNamespace(event=received[0], get=lambda name: interaction)
+    gh_webhooks_bodybuilder(agent, None)(session)
+    assert collab.state.ci_state == SUCCESS
+
+def test_seeded_ci_state_expires(monkeypatch):
+    from governance.engine.semantics import collaboration_state
+    state = CollaborationState()
+    state.head_sha = "abc"
+    state.seed([{"context": "ci/build", "state": "pending"}])
+    assert state.ci_state == PENDING
+    monkeypatch.setattr(collaboration_state, "SEED_TTL", -1.0)
+    assert state.ci_state is None
+    state.record_status("ci/build", "success")
+    assert state.ci_state == SUCCESS
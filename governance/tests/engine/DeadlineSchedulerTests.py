@@ -0,0 +1,52 @@
+import threading
+import time
+
+from governance.engine.deadline_scheduler import DeadlineScheduler
+
+
+class Collab:
+    def __init__(self, id):
+        self._id = id
+
+
+class Deadline:
+    def __init__(self, collab_id, delay):
+        self.collab = Collab(collab_id)
+        self._timestamp = time.time() + delay
+
+
+class RecordingAgent:
+    def __init__(self):
+        self.events = []
+        self.received = threading.Event()
+
+    def receive_event(self, event):
+        self.events.append(event)
+        self.received.set()
+
+
+def test_earliest_deadline_first():
+    scheduler = DeadlineScheduler()
+    agent = RecordingAgent()
+    late = Deadline(1, 0.3)
+    early = Deadline(2, 0.1)
+    scheduler.schedule(agent, late)
+    scheduler.schedule(agent, early)
+    assert scheduler.pending == 2
+    time.sleep(0.5)
+    assert agent.events == [early, late]
+    assert scheduler.pending == 0
+    scheduler.close()
+
+def test_cancelled_deadline_is_not_delivered():
+    scheduler = DeadlineScheduler()
+    agent = RecordingAgent()
+    scheduler.schedule(agent, Deadline(1, 0.1))
+    kept = Deadline(2, 0.2)
+    scheduler.schedule(agent, kept)
+    assert scheduler.cancel(1) == 1
+    assert scheduler.pending == 1
+    assert agent.received.wait(1)
+    time.sleep(0.1)
+    assert agent.events == [kept]
+    scheduler.close()
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from besser.agent.library.transition.events.github_webhooks_events import Push
+from gidgethub import ValidationFailure
+
+from governance.engine.delivery_cache import DeliveryCache, webhook_entrypoint
+
+
+def test_duplicate_delivery_is_dropped():
+    cache = DeliveryCache()
+    assert not cache.is_duplicate("72d3162e-cc78-11e3-81ab-4c9367dc0958")
+    assert cache.is_duplicate("72d3162e-cc78-11e3-81ab-4c9367dc0958")
+    assert not cache.is_duplicate("00000000-cc78-11e3-81ab-4c9367dc0958")
+    assert cache.hits == 1 and cache.lookups == 3
+    assert cache.drops == 0
+
+def test_expired_and_evicted_deliveries():
+    cache = DeliveryCache(max_entries=2, ttl=0.1)
+    cache.is_duplicate("a")
+    cache.is_duplicate("b")
+    cache.is_duplicate("c")
+    assert not cache.is_duplicate("a")
+    time.sleep(0.2)
+    assert not cache.is_duplicate("c")
+
+def test_persisted_deliveries_survive_restart(tmp_path):
+    path = str(tmp_path / "deliveries.log")
+    cache = DeliveryCache(path=path)
+    cache.is_duplicate("a")
+    cache.close()
+    restarted = DeliveryCache(path=path)
+    assert restarted.is_duplicate("a")
+    assert not restarted.is_duplicate("b")
+
+def post_webhook(entrypoint, event: str, delivery_id: str, payload: dict | bytes, signature: str = None):
+    headers = {"content-type": "application/json", "x-github-event": event, "x-github-delivery": delivery_id}
+    if signature is not None:
+        headers["x-hub-signature"] = signature
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+
+    async def read():
+        return body
+    return asyncio.run(entrypoint(SimpleNamespace(headers=headers, read=read)))
+
+def test_redelivered_webhook_is_dropped_by_the_entrypoint():
+    received = []
+    platform = SimpleNamespace(_agent=SimpleNamespace(receive_event=received.append), _secret=None)
+    cache = DeliveryCache()
+    entrypoint = webhook_entrypoint(platform, cache)
+    payload = {"action": "submitted", "review": {"state": "approved"}}
+    assert post_webhook(entrypoint, "pull_request_review", "72d3162e", payload).status == 200
+    assert post_webhook(entrypoint, "pull_request_review", "72d3162e", payload).status == 200
+    post_webhook(entrypoint, "pull_request_review", "8a2e41f0", payload)
+    assert [event.name for event in received] == ["pull_request_reviewsubmitted"] * 2
+    assert cache.drops == 1 and cache.hits == 1
+
+def test_webhooks_without_action_reach_the_agent():
+    received = []
+    platform = SimpleNamespace(_agent=SimpleNamespace(receive_event=received.append), _secret=None)
+    entrypoint = webhook_entrypoint(platform)
+    post_webhook(entrypoint, "push", "0b9a7c1e", {"ref": "refs/heads/main", "repository": {"full_name": "owner/repo"}})
+    assert received[0].is_matching(Push())
+
+def test_redelivery_is_dropped_before_parsing():
+    received = []
+    platform = SimpleNamespace(_agent=SimpleNamespace(receive_event=received.append), _secret=None)
+    entrypoint = webhook_entrypoint(platform, DeliveryCache())
+    post_webhook(entrypoint, "pull_request_review", "72d3162e", {"action": "submitted"})
+    assert post_webhook(entrypoint, "pull_request_review", "72d3162e", b"not json").status == 200
+    assert len(received) == 1
+
+def test_unsigned_deliveries_are_not_recorded():
+    cache = DeliveryCache()
+    platform = SimpleNamespace(_agent=SimpleNamespace(receive_event=lambda event: None), _secret="secret")
+    entrypoint = webhook_entrypoint(platform, cache)
+    with pytest.raises(ValidationFailure):
+        post_webhook(entrypoint, "pull_request_review", "72d3162e", {"action": "submitted"}, "sha1=0000")
+    assert cache.stats()["entries"] == 0
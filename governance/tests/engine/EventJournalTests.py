@@ -0,0 +1,212 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from governance.engine.event_journal import EventJournal
+from governance.engine.events import CollaborationProposalEvent, DecideEvent, LabelEvent, UserRegistrationEvent, \
+    VoteEvent
+from governance.engine.semantics.runtime_metamodel import Decision, Interaction, Vote
+from governance.engine.sharding import EventSession
+from governance.engine.state_bodies import individual_body, label_body
+from metamodel import StatusEnum
+
+
+class JournaledEvent:
+    def __init__(self, collab_id: int, text: str):
+        self._id = collab_id
+        self.text = text
+
+
+def test_torn_record_is_dropped_on_open(tmp_path):
+    path = str(tmp_path / "events.journal")
+    journal = EventJournal(path, fsync_interval=0.01)
+    for i in range(3):
+        journal.append(JournaledEvent(i, f"event {i}"), None)
+    journal.close()
+    with open(path, "ab") as file:
+        file.write(b"\x00\x00\x01\x00partial")
+
+    journal = EventJournal(path, fsync_interval=0.01)
+    assert [collab_id for _, collab_id, _ in journal.records(0)] == [0, 1, 2]
+    journal.append(JournaledEvent(3, "event 3"), None)
+    assert [collab_id for _, collab_id, _ in journal.records(0)] == [0, 1, 2, 3]
+    journal.close()
+
+def test_compaction_drops_completed_collaborations(tmp_path):
+    journal = EventJournal(str(tmp_path / "events.journal"), fsync_interval=0.01)
+    for i in range(4):
+        journal.append(JournaledEvent(i % 2, f"event {i}"), None)
+    completed = SimpleNamespace(_id=0, scope=SimpleNamespace(status=StatusEnum.COMPLETED))
+    running = SimpleNamespace(_id=1, scope=SimpleNamespace(status=StatusEnum.ACCEPTED))
+    generation, offset = journal.compact(SimpleNamespace(collaborations={0: completed, 1: running}))
+    assert generation == 1
+    assert [collab_id for _, collab_id, _ in journal.records(0)] == [1, 1]
+    assert journal.position == (1, offset)
+    journal.close()
+
+
+class RecordingPlatform:
+    def __init__(self):
+        self.writes = []
+
+    def put(self, url: str, data=None):
+        self.writes.append(url)
+
+    def post(self, url: str, data=None):
+        self.writes.append(url)
+
+
+class RecordingAgent:
+    def __init__(self):
+        self.received = []
+
+    def receive_event(self, event):
+        self.received.append(event)
+
+
+def proposal_body(session):
+    # Same effects as the engine bodies : runtime state, outbound calls and follow-up events
+    event = session.event
+    interaction = session.get("interactions")
+    author = interaction.get_or_create_dynamic_individual(event._creator)
+    collab = interaction.propose(author, event._id, None, "", event._platform)
+    collab.ballot_boxes["TestPolicy"] = interaction.new_ballot_box()
+    collab._platform.post(f"/repos/owner/repo/issues/{collab._id}/comments")
+
+def vote_body(session):
+    event = session.event
+    interaction = session.get("interactions")
+    collab = interaction.collaborations[event._pull_request_id]
+    voter = interaction.get_or_create_dynamic_individual(event._user_login)
+    collab.ballot_boxes["TestPolicy"].add(Vote(event._agreement, time.time(), "", voter))
+    interaction.post(session._agent, DecideEvent(collab, "TestPolicy"))
+
+def decide_body(session):
+    event = session.event
+    interaction = session.get("interactions")
+    interaction.delivered(event)
+    collab = event.collab
+    if collab._is_decided is not None:
+        return
+    decision = Decision(interaction, True, time.time(), collab, collab.ballot_boxes["TestPolicy"], "TestPolicy")
+    collab.ballot_boxes["TestPolicy"].decided_by = decision
+    collab._is_decided = decision
+    collab._platform.put(f"/repos/owner/repo/pulls/{collab._id}/merge")
+
+def test_replay_has_no_outbound_effect(tmp_path):
+    path = str(tmp_path / "events.journal")
+    platform, agent = RecordingPlatform(), RecordingAgent()
+    journal = EventJournal(path, fsync_interval=0.01, platform=platform)
+    session = SimpleNamespace(_agent=agent, get={"interactions": Interaction(), "policies": None}.get)
+    proposal = CollaborationProposalEvent()
+    proposal._id, proposal._creator, proposal._platform = 1, "gwendal", platform
+    vote = VoteEvent()
+    vote._pull_request_id, vote._user_login, vote._agreement = 1, "adem", True
+    journal.journaled(proposal_body)(EventSession(session, proposal))
+    journal.journaled(vote_body)(EventSession(session, vote))
+    journal.journaled(decide_body)(EventSession(session, agent.received.pop()))
+    journal.close()
+    assert platform.writes == ["/repos/owner/repo/issues/1/comments", "/repos/owner/repo/pulls/1/merge"]
+
+    journal = EventJournal(path, fsync_interval=0.01, platform=platform)
+    records = len(list(journal.records(0)))
+    interaction = Interaction()
+    session = SimpleNamespace(_agent=agent, get={"interactions": interaction, "policies": None}.get)
+    bodies = {CollaborationProposalEvent: proposal_body, VoteEvent: vote_body, DecideEvent: decide_body}
+    assert journal.replay(session, bodies) == 3
+    collab = interaction.collaborations[1]
+    assert collab._is_decided is not None and collab._platform is platform
+    assert len(platform.writes) == 2
+    assert agent.received == [] and interaction.pending_events(1) == []
+    assert len(list(journal.records(0))) == records
+    journal.close()
+
+def test_archived_collaborations_are_not_proposed_again(tmp_path):
+    platform, agent = RecordingPlatform(), RecordingAgent()
+    journal = EventJournal(str(tmp_path / "events.journal"), fsync_interval=0.01, platform=platform)
+    proposal = CollaborationProposalEvent()
+    proposal._id, proposal._creator, proposal._platform = 1, "gwendal", platform
+    journal.append(proposal, None)
+    interaction = Interaction()
+    interaction._archive = SimpleNamespace(archived=lambda ids: {1} & set(ids))
+    session = SimpleNamespace(_agent=agent, get={"interactions": interaction, "policies": None}.get)
+    assert journal.replay(session, {CollaborationProposalEvent: proposal_body}) == 0
+    assert len(interaction.collaborations) == 0
+    journal.close()
+
+
+class PolicyUpload:
+    def __init__(self, text: str):
+        self.text = text
+
+def test_journal_is_replayed_when_the_first_policies_are_installed(tmp_path):
+    path = str(tmp_path / "events.journal")
+    platform, agent = RecordingPlatform(), RecordingAgent()
+    journal = EventJournal(path, fsync_interval=0.01, platform=platform)
+    proposal = CollaborationProposalEvent()
+    proposal._id, proposal._creator, proposal._platform = 1, "gwendal", platform
+    journal.append(proposal, None)
+    journal.close()
+
+    installed = []
+    def policy_body(session):
+        installed.append(session.event.text)
+        session.set("policies", [])
+    journal = EventJournal(path, fsync_interval=0.01, platform=platform)
+    interaction = Interaction()
+    values = {"interactions": interaction, "policies": None}
+    session = SimpleNamespace(_agent=agent, get=values.get, set=values.__setitem__, event=PolicyUpload("v1"))
+    body = journal.replaying(journal.journaled(policy_body),
+                             {PolicyUpload: policy_body, CollaborationProposalEvent: proposal_body})
+    body(session)
+    # The upload is replayed after the journaled events, its policies stay installed
+    assert installed == ["v1", "v1"]
+    assert 1 in interaction.collaborations and platform.writes == []
+    session.event = PolicyUpload("v2")
+    body(session)
+    assert installed == ["v1", "v1", "v2"]
+    # Bodies loading the policies share the replay : it ran already
+    session.event = PolicyUpload("v3")
+    journal.replaying(policy_body, {PolicyUpload: policy_body})(session)
+    assert installed == ["v1", "v1", "v2", "v3"]
+    journal.close()
+
+def test_label_changes_are_replayed(tmp_path):
+    journal = EventJournal(str(tmp_path / "events.journal"), fsync_interval=0.01)
+    for label, added in (("lgtm", False), ("approved", True)):
+        event = LabelEvent()
+        event._collab_id, event._label, event._added = 1, label, added
+        journal.append(event, None)
+    interaction = Interaction()
+    scope = SimpleNamespace(element=SimpleNamespace(labels={"lgtm"}))
+    interaction.propose(interaction.get_or_create_dynamic_individual("gwendal"), 1, scope, "", None)
+    session = SimpleNamespace(_agent=RecordingAgent(), get={"interactions": interaction, "policies": None}.get)
+    assert journal.replay(session, {LabelEvent: label_body}) == 2
+    assert scope.element.labels == {"approved"}
+    journal.close()
+
+def test_failing_record_does_not_stop_the_replay(tmp_path):
+    platform, agent = RecordingPlatform(), RecordingAgent()
+    journal = EventJournal(str(tmp_path / "events.journal"), fsync_interval=0.01, platform=platform)
+    registration = UserRegistrationEvent()
+    registration._login = "adem"
+    proposal = CollaborationProposalEvent()
+    proposal._id, proposal._creator, proposal._platform = 1, "gwendal", platform
+    for event in (registration, JournaledEvent(2, "failing"), proposal):
+        journal.append(event, None)
+
+    webhook = JournaledEvent(3, "webhook")
+    def failing_body(session):
+        # A webhook received meanwhile waits for the end of the replay
+        thread = threading.Thread(target=agent.receive_event, args=(webhook,))
+        thread.start()
+        thread.join()
+        raise ValueError(session.event.text)
+    interaction = Interaction()
+    session = SimpleNamespace(_agent=agent, get={"interactions": interaction, "policies": None}.get)
+    bodies = {UserRegistrationEvent: individual_body, JournaledEvent: failing_body,
+              CollaborationProposalEvent: proposal_body}
+    assert journal.replay(session, bodies) == 2
+    assert "adem" in interaction.individuals and 1 in interaction.collaborations
+    assert agent.received == [webhook]
+    journal.close()
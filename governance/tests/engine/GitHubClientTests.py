@@ -0,0 +1,107 @@
+import asyncio
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from governance.engine.github_client import AsyncGitHubClient, AsyncGitHubPlatform, TokenBucket
+from governance.engine.response_cache import CachedPlatform, ResponseCache
+
+
+def start_stand_in(routes) -> str:
+    # Local stand-in for api.github.com, served on its own loop
+    app = web.Application()
+    app.add_routes(routes)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        loop.run_forever()
+    threading.Thread(target=serve, daemon=True).start()
+    time.sleep(0.3)
+    return f"http://127.0.0.1:{port}"
+
+def test_reads_and_queued_writes():
+    merged = []
+
+    async def issue(request):
+        return web.json_response({"number": 3, "labels": [{"name": "lgtm"}],
+                                  "repository_url": "https://api.github.com/repos/owner/repo"},
+                                 headers={"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": "0"})
+
+    async def merge(request):
+        merged.append(await request.json())
+        return web.json_response({"merged": True})
+
+    base_url = start_stand_in([web.get("/repos/owner/repo/issues/{number}", issue),
+                               web.put("/repos/owner/repo/pulls/3/merge", merge)])
+    platform = AsyncGitHubPlatform(AsyncGitHubClient("token", base_url=base_url, cache=None))
+    assert {label["name"] for label in platform.get_issue("owner", "repo", 3).labels} == {"lgtm"}
+    issues = platform.getitems([f"/repos/owner/repo/issues/{n}" for n in range(5)])
+    assert len(issues) == 5
+    platform.put("/repos/owner/repo/pulls/3/merge", {"commit_title": "Validated Merge"}).result(5)
+    assert merged == [{"commit_title": "Validated Merge"}]
+    assert platform.client.stats()["requests"] == 7
+    platform.close()
+
+def test_bucket_follows_rate_limit_headers():
+    bucket = TokenBucket(capacity=10, refill_period=3600)
+    bucket.update({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 30)})
+    assert bucket.take() > 20
+    bucket.update({"X-RateLimit-Remaining": "5", "X-RateLimit-Reset": str(time.time() + 30)})
+    assert bucket.take() == 0.0
+
+def test_unchanged_resources_are_revalidated_with_etags():
+    served = []
+
+    async def status(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            served.append(304)
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        served.append(200)
+        return web.json_response({"state": "success"}, headers={"ETag": '"v1"'})
+
+    base_url = start_stand_in([web.get("/repos/owner/repo/commits/{sha}/status", status)])
+    cache = ResponseCache(ttls={"status": 0.0})
+    client = AsyncGitHubClient("token", base_url=base_url, cache=cache)
+    assert client.getitem("/repos/owner/repo/commits/abc/status") == {"state": "success"}
+    assert client.getitem("/repos/owner/repo/commits/abc/status") == {"state": "success"}
+    assert served == [200, 304]
+    assert cache.stats()["not_modified"] == 1
+    cache.invalidate_for_webhook("status", {"repository": {"full_name": "owner/repo"}, "sha": "abc"})
+    client.getitem("/repos/owner/repo/commits/abc/status")
+    assert served == [200, 304, 200]
+    client.close()
+
+def test_pages_are_cached_separately():
+    cache = ResponseCache()
+    cache.store("/repos/owner/repo/issues/3/reactions?per_page=100&page=1", ["+1"], '"p1"')
+    cache.store("/repos/owner/repo/issues/3/reactions?per_page=100&page=2", ["-1"], '"p2"')
+    assert cache.lookup("/repos/owner/repo/issues/3/reactions?per_page=100&page=1")[0].etag == '"p1"'
+    assert cache.lookup("/repos/owner/repo/issues/3/reactions?per_page=100&page=2")[0].etag == '"p2"'
+    cache.store("/repos/owner/repo/issues/3?per_page=1", {"number": 3})
+    assert cache.invalidate_for_webhook("pull_requestlabeled", {"repository": {"full_name": "owner/repo"},
+                                                                "pull_request": {"number": 3}}) == 1
+
+def test_issue_objects_and_payloads_are_cached_apart():
+    class IssuePlatform:
+        def getitem(self, url: str):
+            return {"number": 3}
+
+        def get_issue(self, user: str, repository: str, issue_number: int):
+            return SimpleNamespace(number=issue_number)
+    cache = ResponseCache()
+    platform = CachedPlatform(IssuePlatform(), cache)
+    assert platform.get_issue("owner", "repo", 3).number == 3
+    assert platform.getitem("/repos/owner/repo/issues/3") == {"number": 3}
+    assert platform.get_issue("owner", "repo", 3).number == 3
+    assert cache.invalidate_for_webhook("issueslabeled", {"repository": {"full_name": "owner/repo"},
+                                                          "issue": {"number": 3}}) == 2
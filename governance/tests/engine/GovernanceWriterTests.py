@@ -0,0 +1,63 @@
+import os
+import subprocess
+
+from governance.engine.governance_writer import GovernanceFileWriter
+from governance.engine.semantics.helpers import update_individuals
+
+
+def git(*args, cwd):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+def clone_of_bare_repository(tmp_path) -> str:
+    # Local bare repository standing in for the playground remote
+    remote, clone = tmp_path / "remote.git", tmp_path / "clone"
+    git("init", "--bare", str(remote), cwd=tmp_path)
+    git("clone", str(remote), str(clone), cwd=tmp_path)
+    git("config", "user.email", "engine@example.org", cwd=clone)
+    git("config", "user.name", "engine", cwd=clone)
+    members = "\n".join(f"member{i} {{ vote value : 1.0 }}" for i in range(30))
+    (clone / "policy.txt").write_text(f"Participants:\n{members}\n")
+    git("add", "policy.txt", cwd=clone)
+    git("commit", "-m", "Initial policy", cwd=clone)
+    git("push", "origin", "HEAD", cwd=clone)
+    return str(clone / "policy.txt")
+
+def test_role_changes_are_pushed_in_one_commit(tmp_path):
+    path = clone_of_bare_repository(tmp_path)
+    writer = GovernanceFileWriter(path, interval=0.5)
+    for i in range(30):
+        writer.submit(f"member{i}", f"member{i} {{ vote value : 1.0, role : Maintainer }}")
+    writer.submit("member0", "member0 { vote value : 1.0 }")
+    writer.close()
+    assert writer.stats()["flushes"] == 1
+    log = git("log", "--oneline", cwd=tmp_path / "remote.git").splitlines()
+    assert len(log) == 2
+    with open(path) as file:
+        data = file.read()
+    assert data.count("role : Maintainer") == 29
+    assert "member0 { vote value : 1.0 }" in data
+
+def test_rejected_push_keeps_changes_pending(tmp_path):
+    path = clone_of_bare_repository(tmp_path)
+    clone = tmp_path / "clone"
+    # Pulls still work, the push is rejected after the commit
+    git("remote", "set-url", "--push", "origin", str(tmp_path / "missing.git"), cwd=clone)
+    writer = GovernanceFileWriter(path, interval=0)
+    writer.submit("member1", "member1 { vote value : 1.0, role : Maintainer }")
+    assert writer.pending == 1 and writer.stats()["flushes"] == 0
+    git("remote", "set-url", "--push", "origin", str(tmp_path / "remote.git"), cwd=clone)
+    assert writer.flush() == 1
+    log = git("log", "--oneline", cwd=tmp_path / "remote.git").splitlines()
+    assert len(log) == 2
+
+def test_new_member_does_not_rewrite_a_longer_name():
+    text = "Individuals : joeProfile { role : Maintainers }"
+    assert update_individuals(text, {"joe": "joe { vote value : 1.0, role : Maintainers }"}) == text
+    text = "Individuals : joéProfile { role : Maintainers }, joé { role : Reviewers }"
+    assert update_individuals(text, {"joé": "joé { vote value : 1.0 }"}) == \
+           "Individuals : joéProfile { role : Maintainers }, joé { vote value : 1.0 }"
+
+def test_new_member_named_as_a_label_does_not_rewrite_the_scopes():
+    with open(os.path.join(os.path.dirname(__file__), "../policy_examples/playground.txt"), "r") as file:
+        text = file.read()
+    assert update_individuals(text, {"code": "code { vote value : 1.0, role : Reviewers }"}) == text
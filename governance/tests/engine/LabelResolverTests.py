@@ -0,0 +1,29 @@
+import queue
+from types import SimpleNamespace
+
+from governance.engine.label_resolver import LabelResolver
+
+
+def test_labels_are_resolved_after_retries():
+    received = queue.Queue()
+    attempts = []
+
+    class Platform:
+        def get_issue(self, user, repository, number):
+            attempts.append(number)
+            if len(attempts) < 2:
+                raise ConnectionError("timeout")
+            return SimpleNamespace(labels=[{"name": "dependencies"}])
+
+    resolver = LabelResolver(SimpleNamespace(receive_event=received.put), delay=0.01)
+    resolver.resolve(1, "owner/repo", 3, Platform())
+    event = received.get(timeout=5)
+    assert event.collab_id == 1 and event.labels == {"dependencies"}
+
+def test_failed_resolution_still_releases_the_collaboration():
+    received = queue.Queue()
+    resolver = LabelResolver(SimpleNamespace(receive_event=received.put), delay=0.0, workers=1)
+    # A malformed repository id fails before any request, the worker must survive it
+    resolver.resolve(1, "not-a-repository", 3, None)
+    resolver.resolve(2, "owner/repo", 4, SimpleNamespace(get_issue=lambda *args: SimpleNamespace(labels=[])))
+    assert [received.get(timeout=5).collab_id for _ in range(2)] == [1, 2]
@@ -0,0 +1,51 @@
+from governance.engine.policy_cache import PolicyCache
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return {"model": text.strip()}
+
+
+def test_identical_text_is_parsed_once():
+    cache = PolicyCache()
+    parser = CountingParser()
+    first = cache.get_or_parse("Scopes:\n    Projects:\n", parser)
+    second = cache.get_or_parse("Scopes:\r\n    Projects:   \r\n\n", parser)
+    assert first is second
+    assert parser.calls == 1
+    assert cache.hits == 1 and cache.misses == 1
+
+def test_lru_eviction():
+    cache = PolicyCache(max_entries=2)
+    parser = CountingParser()
+    cache.get_or_parse("a", parser)
+    cache.get_or_parse("b", parser)
+    cache.get_or_parse("a", parser)
+    cache.get_or_parse("c", parser)
+    cache.get_or_parse("b", parser)
+    assert parser.calls == 4
+    assert cache.stats()["entries"] == 2
+
+def test_disk_tier_survives_new_cache(tmp_path):
+    parser = CountingParser()
+    PolicyCache(cache_dir=str(tmp_path)).get_or_parse("policy", parser)
+    restarted = PolicyCache(cache_dir=str(tmp_path))
+    model = restarted.get_or_parse("policy", parser)
+    assert model == {"model": "policy"}
+    assert parser.calls == 1
+    assert restarted.disk_hits == 1
+
+def test_disk_entry_of_another_model_version_is_a_miss(tmp_path, monkeypatch):
+    from governance.engine import policy_artifact
+    parser = CountingParser()
+    PolicyCache(cache_dir=str(tmp_path)).get_or_parse("policy", parser)
+    # The GovernanceDSL metamodel or grammar changed since the entry was written
+    monkeypatch.setattr(policy_artifact, "model_version", lambda: "upgraded")
+    restarted = PolicyCache(cache_dir=str(tmp_path))
+    assert restarted.get_or_parse("policy", parser) == {"model": "policy"}
+    assert parser.calls == 2
+    assert restarted.disk_hits == 0 and restarted.misses == 1
@@ -0,0 +1,116 @@
+import os
+import threading
+from types import SimpleNamespace
+
+from governance.engine.events import DecideEvent, VoteEvent
+from governance.engine.parsing import parse_text
+from governance.engine.semantics.helpers import get_all_individuals, get_all_roles, start_policies
+from governance.engine.semantics.policy_index import PolicyIndex
+from governance.engine.semantics.runtime_metamodel import Interaction
+from governance.engine.sharding import ShardedExecutor
+from governance.engine.state_bodies import decide_bodybuilder, vote_body
+
+
+def test_same_key_keeps_order():
+    executor = ShardedExecutor(4)
+    seen = {key: [] for key in range(8)}
+    for i in range(50):
+        for key in seen:
+            executor.submit(key, seen[key].append, i)
+    executor.barrier()
+    assert all(values == list(range(50)) for values in seen.values())
+
+def test_slow_shard_does_not_block_others():
+    executor = ShardedExecutor(2)
+    slow_key = 0
+    fast_key = next(key for key in range(1, 10) if executor.shard_of(key) != executor.shard_of(slow_key))
+    release, done = threading.Event(), threading.Event()
+    executor.submit(slow_key, release.wait)
+    executor.submit(fast_key, done.set)
+    # The fast shard runs while the slow one is still blocked
+    assert done.wait(10)
+    assert not release.is_set()
+    release.set()
+    executor.barrier()
+
+def test_synchronized_body_waits_for_sharded_bodies():
+    executor = ShardedExecutor(2)
+    release, updated = threading.Event(), threading.Event()
+    executor.sharded(lambda session: release.wait(), lambda event: event)(SimpleNamespace(event=1))
+    thread = threading.Thread(target=executor.synchronized(lambda session: updated.set()), args=(None,))
+    thread.start()
+    assert not updated.wait(0.1)
+    release.set()
+    thread.join()
+    assert updated.is_set()
+
+
+class QueueAgent:
+    # Events sent by the bodies wait in a queue, as in the agent
+    def __init__(self):
+        self.queue = []
+
+    def receive_event(self, event):
+        self.queue.append(event)
+
+
+class RecordingPlatform:
+    def __init__(self):
+        self.writes = []
+
+    def put(self, url: str, data=None):
+        self.writes.append(url)
+
+    def patch(self, url: str, data=None):
+        self.writes.append(url)
+
+def run_votes(votes: list[tuple[int, str, bool]], executor: ShardedExecutor = None) -> dict:
+    with open(os.path.join(os.path.dirname(__file__), "../policy_examples/engine_testing/scope_task.txt")) as file:
+        model = parse_text(file.read(), use_cache=False)
+    policy = next(iter(model))
+    interaction = Interaction()
+    interaction.register_individuals(get_all_individuals(policy))
+    interaction.register_roles(get_all_roles(policy))
+    agent = QueueAgent()
+    values = {"interactions": interaction, "policies": model, "policy_index": PolicyIndex(model)}
+    for collab_id in {collab_id for collab_id, _, _ in votes}:
+        author = interaction.get_or_create_dynamic_individual("author")
+        start_policies(agent, [policy], interaction.propose(author, collab_id, policy.scope, "", RecordingPlatform()))
+
+    decide_body = decide_bodybuilder(agent)
+    bodies = {VoteEvent: vote_body, DecideEvent: decide_body}
+    if executor is not None:
+        bodies = {VoteEvent: executor.sharded(vote_body, lambda e: e.pull_request_id),
+                  DecideEvent: executor.sharded(decide_body, lambda e: e.collab._id)}
+    for collab_id, login, agreement in votes:
+        vote = VoteEvent()
+        vote._pull_request_id, vote._user_login, vote._agreement, vote._rationale = collab_id, login, agreement, ""
+        agent.queue.append(vote)
+    while True:
+        # Same loop as the agent : one event at a time, the queue is the pending events of the session
+        while len(agent.queue) > 0:
+            event = agent.queue.pop(0)
+            bodies[type(event)](SimpleNamespace(_agent=agent, event=event, events=agent.queue, get=values.get))
+        if executor is None:
+            break
+        executor.barrier()
+        if len(agent.queue) == 0:
+            break
+
+    results = dict()
+    for collab_id, collab in interaction.collaborations.items():
+        decisions = [decision for decision in interaction.decisions if decision._decides is collab]
+        box = collab.ballot_boxes[policy]
+        results[collab_id] = (len(decisions), collab._is_decided._accepted,
+                              sorted(vote.voted_by.name for vote in box), box.decided_by is collab._is_decided)
+    return results
+
+def test_sharded_bodies_decide_as_the_agent_does():
+    # Zoe votes before the first decision is taken : a second DecideEvent is posted for each collaboration,
+    # shards see no pending queue (session.events is None) and refuse it as stale
+    votes = [(1, "Alice", True), (2, "Bob", False), (1, "Bob", True), (2, "Alice", False),
+             (1, "Zoe", True), (2, "Zoe", True)]
+    expected = run_votes(votes)
+    assert expected == {1: (1, True, ["Alice", "Bob", "Zoe"], True),
+                        2: (1, False, ["Alice", "Bob", "Zoe"], True)}
+    assert run_votes(votes, ShardedExecutor(2)) == expected
@@ -0,0 +1,91 @@
+import base64
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from governance.engine.events import UpdatePolicyEvent
+from governance.engine.parsing import parse_text
+from governance.engine.semantics import columnar_ballot
+from governance.engine.semantics.runtime_metamodel import Interaction
+from governance.engine.snapshot import SnapshotPickler, SnapshotUnpickler, Snapshotter, save_snapshot
+from governance.engine.state_bodies import init_body, read_policy_bodybuilder, update_policy_body
+from governance.tests.benchmarks.snapshot_benchmark import build_interaction
+
+
+def test_snapshot_round_trip_keeps_references():
+    interaction, references = build_interaction(50, 3)
+    buffer = io.BytesIO()
+    SnapshotPickler(buffer, references).dump(interaction)
+    buffer.seek(0)
+    restored = SnapshotUnpickler(buffer, references).load()
+
+    policy = references[("policy", "TestPolicy")]
+    collab = restored.collaborations[7]
+    assert collab.ballot_boxes[policy].agree_count == interaction.collaborations[7].ballot_boxes[policy].agree_count
+    assert collab._platform is references[("platform",)]
+    voter = next(iter(collab.ballot_boxes[policy])).voted_by
+    assert voter is restored.individuals[voter.name]
+    assert collab in restored.individuals[collab._proposed_by.name].proposes
+
+def test_columnar_ballot_boxes_survive_a_restart(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setenv("BALLOT_BACKEND", "columnar")
+    interaction, references = build_interaction(10, 3)
+    buffer = io.BytesIO()
+    SnapshotPickler(buffer, references).dump(interaction)
+    buffer.seek(0)
+    restored = SnapshotUnpickler(buffer, references).load()
+
+    box = restored.collaborations[7].ballot_boxes[references[("policy", "TestPolicy")]]
+    assert isinstance(box, columnar_ballot.ColumnarBallotBox)
+    assert box.voted_by_any({"user8"}, agreement=False)
+    assert not box.voted_by_any({"user7", "user9"}, agreement=False)
+    assert box.voted_by_any({"user9"}, agreement=True)
+
+
+class RecordingAgent:
+    def __init__(self):
+        self.received = []
+
+    def receive_event(self, event):
+        self.received.append(event)
+
+
+class AgentSession:
+    def __init__(self, agent):
+        self._agent = agent
+        self._values = dict()
+        self.event = None
+        self.events = []
+
+    def get(self, key):
+        return self._values.get(key)
+
+    def set(self, key, value):
+        self._values[key] = value
+
+def test_snapshot_is_restored_with_a_policy_file_upload(tmp_path):
+    with open(os.path.join(os.path.dirname(__file__), "../policy_examples/majority_policy.txt"), "r") as file:
+        text = file.read()
+    model = parse_text(text)
+    interaction = Interaction()
+    collab = interaction.propose(interaction.get_or_create_dynamic_individual("gwendal"), 3, None, "", None)
+    collab.ballot_boxes[next(iter(model))] = interaction.new_ballot_box()
+    path = str(tmp_path / "runtime.snapshot")
+    save_snapshot(interaction, model, path)
+
+    agent = RecordingAgent()
+    session = AgentSession(agent)
+    snapshots = Snapshotter(path, interval=3600)
+    init_body(session)
+    # The uploaded file is only turned into an UpdatePolicyEvent
+    session.event = SimpleNamespace(file=SimpleNamespace(base64=base64.b64encode(text.encode("utf-8"))))
+    read_policy_bodybuilder(agent)(session)
+    assert session.get("policies") is None and 3 not in session.get("interactions").collaborations
+    session.event = agent.received.pop()
+    assert isinstance(session.event, UpdatePolicyEvent)
+    snapshots.restoring(update_policy_body)(session)
+    assert 3 in session.get("interactions").collaborations
+    snapshots.close()